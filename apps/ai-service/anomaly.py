@@ -0,0 +1,343 @@
+"""Columnar, grouped anomaly detection engine.
+
+Shipments are reduced once to a float matrix of metrics (NaN where a metric
+is missing) plus an integer group code per shipment. Baselines are computed
+per group with sort + ``reduceat`` segmented reductions, either mean/std or
+the robust median/MAD pair, and every shipment is scored against its own
+group in a single vectorized pass.
+"""
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Metrics scored by the detector: (column name, anomaly type, range format)
+SCORED_METRICS = (
+    ("delivery_time", "delivery_delay", "{:.1f}"),
+    ("cost", "cost_deviation", "{:.2f}"),
+)
+
+GROUP_FIELDS = ("carrier", "lane", "vehicle_type")
+
+# Scales the MAD so it estimates the standard deviation of normal data
+MAD_TO_STD = 1.4826
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse one ISO timestamp to a naive UTC datetime, None when invalid"""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_timestamps(values: Sequence[Any]) -> np.ndarray:
+    """ISO timestamps to ``datetime64[us]``; missing or invalid values become NaT"""
+    cleaned = ["NaT" if v is None else str(v).rstrip("Z") for v in values]
+    try:
+        # NumPy converts explicit UTC offsets itself but warns about doing so
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return np.array(cleaned, dtype="datetime64[us]")
+    except ValueError:
+        parsed = [parse_timestamp(v) if v is not None else None for v in values]
+        return np.array([np.datetime64("NaT") if p is None else p for p in parsed], dtype="datetime64[us]")
+
+
+def _cost(shipment: Dict[str, Any]) -> float:
+    route = shipment.get('route')
+    if isinstance(route, dict) and 'estimatedCost' in route:
+        try:
+            return float(route['estimatedCost'])
+        except (TypeError, ValueError):
+            pass
+    return np.nan
+
+
+def shipment_metrics(shipment: Dict[str, Any]) -> Tuple[float, float]:
+    """Delivery delay in hours and route cost for one shipment, NaN when missing"""
+    delivery_time = np.nan
+    if 'estimatedDelivery' in shipment and 'actualDelivery' in shipment:
+        est_delivery = parse_timestamp(shipment['estimatedDelivery'])
+        act_delivery = parse_timestamp(shipment['actualDelivery'])
+        if est_delivery is not None and act_delivery is not None:
+            delivery_time = (act_delivery - est_delivery).total_seconds() / 3600
+    return delivery_time, _cost(shipment)
+
+
+def group_key(shipment: Dict[str, Any], field: str) -> str:
+    """Grouping value of a shipment for one of GROUP_FIELDS"""
+    if field == "carrier":
+        carrier = shipment.get('carrier')
+        if isinstance(carrier, dict):
+            carrier = carrier.get('id') or carrier.get('name')
+        return str(carrier) if carrier else "unknown"
+    if field == "lane":
+        origin, destination = shipment.get('origin'), shipment.get('destination')
+        if isinstance(origin, dict) and isinstance(destination, dict):
+            return f"{origin.get('city', 'unknown')}->{destination.get('city', 'unknown')}"
+        return "unknown"
+    if field == "vehicle_type":
+        vehicle = shipment.get('vehicleType', shipment.get('vehicle_type'))
+        return str(vehicle) if vehicle else "unknown"
+    raise ValueError(f"Unknown group field: {field}")
+
+
+def extract_columns(shipments: List[Dict[str, Any]], group_by: Sequence[str] = ()) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Metric matrix (n, metrics) with NaN for missing values, group codes and labels"""
+    estimated = [s.get('estimatedDelivery') if 'actualDelivery' in s else None for s in shipments]
+    actual = [s.get('actualDelivery') if 'estimatedDelivery' in s else None for s in shipments]
+    delay = (parse_timestamps(actual) - parse_timestamps(estimated)) / np.timedelta64(1, "h")
+
+    values = np.column_stack([
+        delay.astype(float),
+        np.array([_cost(s) for s in shipments], dtype=float)
+    ]).reshape(len(shipments), len(SCORED_METRICS))
+
+    if not group_by:
+        return values, np.zeros(len(shipments), dtype=np.intp), ["all"]
+
+    keys = ["|".join(group_key(s, field) for field in group_by) for s in shipments]
+    labels, codes = np.unique(np.array(keys, dtype=str), return_inverse=True)
+    return values, codes.reshape(-1), labels.tolist()
+
+
+def _segments(sorted_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(sorted_codes)) + 1])
+    counts = np.diff(np.append(starts, len(sorted_codes)))
+    return starts, counts
+
+
+def _segment_median(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    low = sorted_values[starts + (counts - 1) // 2]
+    high = sorted_values[starts + counts // 2]
+    return (low + high) / 2
+
+
+def group_baselines(x: np.ndarray, codes: np.ndarray, n_groups: int, robust: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-group (center, scale, count) for one metric over valid values.
+
+    Groups without values get NaN baselines and a count of 0.
+    """
+    center = np.full(n_groups, np.nan)
+    scale = np.full(n_groups, np.nan)
+    count = np.zeros(n_groups, dtype=np.int64)
+    if len(x) == 0:
+        return center, scale, count
+
+    if robust:
+        order = np.lexsort((x, codes))
+        xs, cs = x[order], codes[order]
+        starts, counts = _segments(cs)
+        median = _segment_median(xs, starts, counts)
+
+        deviation = np.abs(xs - np.repeat(median, counts))
+        dev_sorted = deviation[np.lexsort((deviation, cs))]
+        mad = _segment_median(dev_sorted, starts, counts)
+
+        group_ids = cs[starts]
+        center[group_ids] = median
+        scale[group_ids] = mad * MAD_TO_STD
+        count[group_ids] = counts
+        return center, scale, count
+
+    order = np.argsort(codes, kind="stable")
+    xs, cs = x[order], codes[order]
+    starts, counts = _segments(cs)
+    mean = np.add.reduceat(xs, starts) / counts
+    variance = np.add.reduceat((xs - np.repeat(mean, counts)) ** 2, starts) / counts
+
+    group_ids = cs[starts]
+    center[group_ids] = mean
+    scale[group_ids] = np.sqrt(variance)
+    count[group_ids] = counts
+    return center, scale, count
+
+
+def score_shipments(values: np.ndarray, codes: np.ndarray, n_groups: int, threshold: float = 0.1, z_threshold: float = 2.0, robust: bool = False, min_group_size: int = 5) -> Dict[str, np.ndarray]:
+    """Score every shipment against its group baseline in one pass per metric.
+
+    A value is anomalous when its z-score exceeds `z_threshold` and it
+    deviates from the baseline center by more than `threshold` (a fraction of
+    the center). Groups with fewer than `min_group_size` values fall back to
+    the population-wide baseline so tiny groups do not produce noise.
+    """
+    n, k = values.shape
+    center = np.full((n, k), np.nan)
+    scale = np.full((n, k), np.nan)
+
+    for j in range(k):
+        valid = ~np.isnan(values[:, j])
+        x, c = values[valid, j], codes[valid]
+        g_center, g_scale, g_count = group_baselines(x, c, n_groups, robust)
+        o_center, o_scale, _ = group_baselines(x, np.zeros(len(x), dtype=np.intp), 1, robust)
+
+        small = g_count < min_group_size
+        g_center = np.where(small, o_center[0], g_center)
+        g_scale = np.where(small, o_scale[0], g_scale)
+        center[:, j] = g_center[codes]
+        scale[:, j] = g_scale[codes]
+
+    z, flagged = flag_values(values, center, scale, threshold, z_threshold)
+    return {"z": z, "center": center, "scale": scale, "flagged": flagged}
+
+
+def flag_values(values: np.ndarray, center: np.ndarray, scale: np.ndarray, threshold: float, z_threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """z-scores and anomaly flags of values against baselines they broadcast with.
+
+    Flagged values have a z-score above `z_threshold` and deviate from the
+    center by more than `threshold` (a fraction of it); missing values never are.
+    """
+    deviation = np.abs(values - center)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(scale > 0, deviation / scale, 0.0)
+    z = np.nan_to_num(z, nan=0.0)
+    relative_ok = ~(deviation <= threshold * np.abs(center))
+    flagged = (z > z_threshold) & relative_ok & ~np.isnan(values)
+    return z, flagged
+
+
+def detect_columns(shipments: List[Dict[str, Any]], threshold: float = 0.1, group_by: Sequence[str] = (), method: str = "zscore", z_threshold: float = 2.0, min_group_size: int = 5) -> Tuple[Dict[str, Any], int]:
+    """Flagged values as parallel arrays in metric-then-shipment order, plus the number of shipments flagged.
+
+    Expected ranges are numeric (`expected_low`, `expected_high`) and
+    z-scores unrounded; `group` is present only when grouping.
+    """
+    if method not in ("zscore", "robust"):
+        raise ValueError(f"Unknown method: {method}")
+    for field in group_by:
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"Unknown group field: {field}")
+
+    values, codes, labels = extract_columns(shipments, group_by)
+    scored = score_shipments(values, codes, len(labels), threshold, z_threshold, method == "robust", min_group_size)
+    z, center, scale, flagged = scored["z"], scored["center"], scored["scale"], scored["flagged"]
+
+    rows = [np.flatnonzero(flagged[:, j]) for j in range(len(SCORED_METRICS))]
+    metric_index = np.repeat(np.arange(len(SCORED_METRICS)), [len(r) for r in rows])
+    index = np.concatenate(rows)
+    z_flagged = z[index, metric_index]
+
+    columns = {
+        "type": np.array([t for _, t, _ in SCORED_METRICS])[metric_index],
+        "shipment_index": index,
+        "metric": np.array([m for m, _, _ in SCORED_METRICS])[metric_index],
+        "value": values[index, metric_index],
+        "expected_low": center[index, metric_index] - z_threshold * scale[index, metric_index],
+        "expected_high": center[index, metric_index] + z_threshold * scale[index, metric_index],
+        "z_score": z_flagged,
+        "severity": np.where(z_flagged > z_threshold + 1, "high", "medium")
+    }
+    if group_by:
+        columns["group"] = np.array(labels, dtype=str)[codes[index]]
+    return columns, int(flagged.any(axis=1).sum())
+
+
+def detect(shipments: List[Dict[str, Any]], threshold: float = 0.1, group_by: Sequence[str] = (), method: str = "zscore", z_threshold: float = 2.0, min_group_size: int = 5) -> Tuple[List[Dict[str, Any]], int]:
+    """Anomaly dicts in metric-then-shipment order, plus the number of shipments flagged"""
+    columns, flagged_count = detect_columns(shipments, threshold, group_by, method, z_threshold, min_group_size)
+    formats = {metric: fmt for metric, _, fmt in SCORED_METRICS}
+
+    anomalies = []
+    groups = columns["group"].tolist() if group_by else None
+    for i, (anomaly_type, index, metric, value, low, high, z, severity) in enumerate(zip(
+        columns["type"].tolist(),
+        columns["shipment_index"].tolist(),
+        columns["metric"].tolist(),
+        columns["value"].tolist(),
+        columns["expected_low"].tolist(),
+        columns["expected_high"].tolist(),
+        columns["z_score"].tolist(),
+        columns["severity"].tolist()
+    )):
+        fmt = formats[metric]
+        anomaly = {
+            "type": anomaly_type,
+            "shipment_index": index,
+            "metric": metric,
+            "value": value,
+            "expected_range": f"{fmt.format(low)} to {fmt.format(high)}",
+            "z_score": round(z, 2),
+            "severity": severity
+        }
+        if groups is not None:
+            anomaly["group"] = groups[i]
+        anomalies.append(anomaly)
+
+    return anomalies, flagged_count
+
+
+# Grouping available when scoring a stored daily volume series
+SERIES_GROUP_FIELDS = ("day_of_week",)
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def detect_series_columns(dates: np.ndarray, volumes: np.ndarray, threshold: float = 0.1, group_by: Sequence[str] = (), method: str = "zscore", z_threshold: float = 2.0, min_group_size: int = 5) -> Tuple[Dict[str, Any], int]:
+    """Flagged days of a daily volume series as parallel arrays, plus the number of days flagged.
+
+    Each day is scored against the whole range or, grouped by `day_of_week`,
+    against the same weekday; days above the baseline are volume spikes and
+    days below it volume drops.
+    """
+    if method not in ("zscore", "robust"):
+        raise ValueError(f"Unknown method: {method}")
+    for field in group_by:
+        if field not in SERIES_GROUP_FIELDS:
+            raise ValueError(f"Unknown group field for a volume series: {field}")
+
+    values = np.asarray(volumes, dtype=float).reshape(-1, 1)
+    if group_by:
+        # 1970-01-01 was a Thursday, day 3 counting from Monday
+        codes = (np.asarray(dates).astype("datetime64[D]").astype(np.int64) + 3) % 7
+        n_groups = len(DAY_NAMES)
+    else:
+        codes = np.zeros(len(values), dtype=np.intp)
+        n_groups = 1
+    scored = score_shipments(values, codes, n_groups, threshold, z_threshold, method == "robust", min_group_size)
+
+    index = np.flatnonzero(scored["flagged"][:, 0])
+    value = values[index, 0]
+    center = scored["center"][index, 0]
+    scale = scored["scale"][index, 0]
+    z = scored["z"][index, 0]
+    columns = {
+        "type": np.where(value > center, "volume_spike", "volume_drop"),
+        "date": np.datetime_as_string(np.asarray(dates)[index], unit="D"),
+        "metric": np.full(len(index), "volume"),
+        "value": value,
+        "expected_low": center - z_threshold * scale,
+        "expected_high": center + z_threshold * scale,
+        "z_score": z,
+        "severity": np.where(z > z_threshold + 1, "high", "medium")
+    }
+    if group_by:
+        columns["group"] = np.array(DAY_NAMES)[codes[index]]
+    return columns, len(index)
+
+
+def detect_series(dates: np.ndarray, volumes: np.ndarray, threshold: float = 0.1, group_by: Sequence[str] = (), method: str = "zscore", z_threshold: float = 2.0, min_group_size: int = 5) -> Tuple[List[Dict[str, Any]], int]:
+    """Anomaly dicts for the flagged days of a daily volume series, oldest first, plus their count"""
+    columns, flagged_count = detect_series_columns(dates, volumes, threshold, group_by, method, z_threshold, min_group_size)
+    rows = zip(*(columns[name].tolist() for name in ("type", "date", "value", "expected_low", "expected_high", "z_score", "severity")))
+    groups = columns["group"].tolist() if group_by else None
+
+    anomalies = []
+    for i, (anomaly_type, day, value, low, high, z, severity) in enumerate(rows):
+        anomaly = {
+            "type": anomaly_type,
+            "date": day,
+            "metric": "volume",
+            "value": round(value, 2),
+            "expected_range": f"{low:.2f} to {high:.2f}",
+            "z_score": round(z, 2),
+            "severity": severity
+        }
+        if groups is not None:
+            anomaly["group"] = groups[i]
+        anomalies.append(anomaly)
+
+    return anomalies, flagged_count
@@ -0,0 +1,138 @@
+"""Constant-memory anomaly detection over NDJSON shipment streams.
+
+Phase one parses the upload line by line, folds each block of metric rows
+into running Welford/Chan statistics and spools the rows (a few floats per
+shipment) to a temporary file. Phase two re-reads the spool in fixed-size
+chunks and scores every row against the final mean and standard deviation,
+yielding anomalies as they are found. Memory stays bounded by the chunk
+size however many shipments are uploaded.
+
+Scoring applies the same z-score and relative-deviation gate as the
+ungrouped ``zscore`` method of `anomaly.detect`, so both report the same
+anomalies; the stream lists them in shipment order rather than by metric.
+Median/MAD baselines would need every value in memory and are not offered.
+"""
+import json
+import tempfile
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from anomaly import SCORED_METRICS, flag_values, shipment_metrics
+
+
+class RunningStats:
+    """Per-column count, mean and M2 merged block by block (NaN = missing)"""
+
+    def __init__(self, columns: int):
+        self.count = np.zeros(columns)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+
+    def update(self, block: np.ndarray) -> None:
+        valid = ~np.isnan(block)
+        n_block = valid.sum(axis=0)
+        if not n_block.any():
+            return
+
+        safe_n = np.maximum(n_block, 1)
+        mean_block = np.where(valid, block, 0).sum(axis=0) / safe_n
+        m2_block = np.where(valid, (block - mean_block) ** 2, 0).sum(axis=0)
+
+        total = self.count + n_block
+        safe_total = np.maximum(total, 1)
+        delta = mean_block - self.mean
+        self.mean = self.mean + delta * n_block / safe_total
+        self.m2 = self.m2 + m2_block + delta ** 2 * self.count * n_block / safe_total
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / np.maximum(self.count, 1))
+
+
+class AnomalySpool:
+    """Incremental NDJSON ingestion followed by a chunked scoring pass"""
+
+    def __init__(self, chunk_rows: int = 8192):
+        self.chunk_rows = chunk_rows
+        self.stats = RunningStats(len(SCORED_METRICS))
+        self.total_shipments = 0
+        self.flagged_shipments = 0  # shipments with at least one anomaly, counted by scan()
+        self._file = tempfile.TemporaryFile()
+        self._rows: List[Tuple[float, float]] = []
+        self._pending = b""
+
+    def feed(self, data: bytes) -> None:
+        """Consume a chunk of raw NDJSON bytes; lines may span chunks"""
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._feed_line(line)
+
+    def finish(self) -> None:
+        """Flush the trailing line and any buffered rows"""
+        if self._pending:
+            self._feed_line(self._pending)
+            self._pending = b""
+        self._flush()
+
+    def _feed_line(self, line: bytes) -> None:
+        if not line.strip():
+            return
+        try:
+            shipment = json.loads(line)
+        except ValueError:
+            raise ValueError(f"Invalid JSON on shipment line {self.total_shipments + 1}")
+        if not isinstance(shipment, dict):
+            raise ValueError(f"Shipment line {self.total_shipments + 1} is not a JSON object")
+
+        self._rows.append(shipment_metrics(shipment))
+        self.total_shipments += 1
+        if len(self._rows) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        block = np.array(self._rows, dtype=np.float64)
+        self.stats.update(block)
+        block.tofile(self._file)
+        self._rows = []
+
+    def scan(self, threshold: float = 0.1, z_threshold: float = 2.0) -> Iterator[Dict[str, Any]]:
+        """Yield anomalies in shipment order against the final statistics"""
+        mean, std = self.stats.mean, self.stats.std
+        columns = len(SCORED_METRICS)
+        ranges = [
+            f"{fmt.format(mean[j] - z_threshold * std[j])} to {fmt.format(mean[j] + z_threshold * std[j])}"
+            for j, (_, _, fmt) in enumerate(SCORED_METRICS)
+        ]
+
+        self.flagged_shipments = 0
+        self._file.seek(0)
+        offset = 0
+        while True:
+            block = np.fromfile(self._file, dtype=np.float64, count=self.chunk_rows * columns)
+            if block.size == 0:
+                break
+            block = block.reshape(-1, columns)
+
+            z, flagged = flag_values(block, mean, std, threshold, z_threshold)
+            self.flagged_shipments += int(flagged.any(axis=1).sum())
+
+            for row, column in zip(*np.nonzero(flagged)):
+                metric, anomaly_type, _ = SCORED_METRICS[column]
+                yield {
+                    "type": anomaly_type,
+                    "shipment_index": offset + int(row),
+                    "metric": metric,
+                    "value": float(block[row, column]),
+                    "expected_range": ranges[column],
+                    "z_score": round(float(z[row, column]), 2),
+                    "severity": "high" if z[row, column] > z_threshold + 1 else "medium"
+                }
+            offset += len(block)
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,176 @@
+"""Seeded synthetic payloads for the AI service endpoints.
+
+Every generator takes a ``numpy.random.Generator`` so a benchmark run with the
+same seed always sends byte-identical requests.
+"""
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Rough bounding box of the EU road network the service is tuned for
+LAT_RANGE = (36.0, 60.0)
+LNG_RANGE = (-9.0, 24.0)
+COUNTRIES = ("Germany", "France", "Italy", "Spain", "Netherlands", "Belgium", "Austria", "Switzerland")
+CARRIERS = ("dhl", "dbschenker", "kuehne", "geodis", "dsv", "gls")
+CITIES = ("Berlin", "Paris", "Milan", "Madrid", "Rotterdam", "Brussels", "Vienna", "Zurich", "Hamburg", "Lyon")
+VEHICLES = ("truck", "van", "trailer")
+FUELS = ("diesel", "electric", "hybrid")
+OPTIMIZE_FOR = ("time", "cost", "emissions")
+
+
+def locations(rng: np.random.Generator, n: int) -> List[Dict[str, Any]]:
+    lats = rng.uniform(*LAT_RANGE, size=n).round(5).tolist()
+    lngs = rng.uniform(*LNG_RANGE, size=n).round(5).tolist()
+    countries = rng.choice(COUNTRIES, size=n).tolist()
+    return [
+        {"latitude": lat, "longitude": lng, "address": f"Depot {i}", "city": "Benchmark", "country": country}
+        for i, (lat, lng, country) in enumerate(zip(lats, lngs, countries))
+    ]
+
+
+def route_request(rng: np.random.Generator, waypoints: int = 0) -> Dict[str, Any]:
+    points = locations(rng, waypoints + 2)
+    return {
+        "origin": points[0],
+        "destination": points[-1],
+        "waypoints": points[1:-1],
+        "vehicle_type": str(rng.choice(VEHICLES)),
+        "optimize_for": str(rng.choice(OPTIMIZE_FOR))
+    }
+
+
+def batch_route_request(rng: np.random.Generator, routes: int) -> Dict[str, Any]:
+    return {
+        "origins": locations(rng, routes),
+        "destinations": locations(rng, routes),
+        "vehicle_type": "truck",
+        "optimize_for": "cost"
+    }
+
+
+def daily_series(rng: np.random.Generator, days: int, start: date = date(2022, 1, 1)) -> List[Dict[str, Any]]:
+    """Trend + weekly seasonality + noise, one observation per day"""
+    t = np.arange(days)
+    volumes = 200 + 0.3 * t + 25 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 10, size=days)
+    return [
+        {"date": (start + timedelta(days=i)).isoformat(), "volume": round(v, 2)}
+        for i, v in enumerate(volumes.tolist())
+    ]
+
+
+def forecast_request(rng: np.random.Generator, days: int, horizon: int, **intervals: Any) -> Dict[str, Any]:
+    """`intervals` adds prediction-interval settings (interval_method, resamples, seed, ...)"""
+    return {"historical_data": daily_series(rng, days), "forecast_horizon": horizon, **intervals}
+
+
+def batch_forecast_request(rng: np.random.Generator, series: int, days: int, horizon: int) -> Dict[str, Any]:
+    """Columnar batch of `series` series with `days` observations each"""
+    dates = np.datetime_as_string(np.datetime64("2022-01-01") + np.arange(days)).tolist()
+    t = np.arange(days)
+    levels = rng.uniform(50, 500, size=(series, 1))
+    volumes = levels + 0.2 * t + 15 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 8, size=(series, days))
+    return {
+        "series_ids": [f"series-{s}" for s in range(series) for _ in range(days)],
+        "dates": dates * series,
+        "volumes": np.round(volumes, 2).reshape(-1).tolist(),
+        "forecast_horizon": horizon
+    }
+
+
+def shipments(rng: np.random.Generator, n: int, anomaly_rate: float = 0.02) -> List[Dict[str, Any]]:
+    """Shipments with normal delays and costs plus a share of injected outliers"""
+    start = datetime(2024, 1, 1)
+    offsets = rng.uniform(0, 90 * 24, size=n)
+    delays = rng.normal(2, 1.5, size=n)
+    costs = rng.normal(800, 120, size=n)
+    outliers = rng.random(n) < anomaly_rate
+    delays[outliers] += rng.uniform(12, 48, size=int(outliers.sum()))
+    costs[outliers] *= rng.uniform(1.8, 3.0, size=int(outliers.sum()))
+    carriers = rng.choice(CARRIERS, size=n).tolist()
+    origins = rng.choice(CITIES, size=n).tolist()
+    destinations = rng.choice(CITIES, size=n).tolist()
+
+    result = []
+    for i in range(n):
+        estimated = start + timedelta(hours=offsets[i])
+        result.append({
+            "id": f"shp-{i}",
+            "carrier": {"id": carriers[i]},
+            "origin": {"city": origins[i]},
+            "destination": {"city": destinations[i]},
+            "estimatedDelivery": estimated.isoformat() + "Z",
+            "actualDelivery": (estimated + timedelta(hours=float(delays[i]))).isoformat() + "Z",
+            "route": {"estimatedCost": round(float(costs[i]), 2)}
+        })
+    return result
+
+
+def anomaly_request(rng: np.random.Generator, n: int, group_by: Sequence[str] = ()) -> Dict[str, Any]:
+    return {"shipment_data": shipments(rng, n), "group_by": list(group_by)}
+
+
+def shipment_ndjson(rng: np.random.Generator, n: int) -> bytes:
+    return "".join(json.dumps(s) + "\n" for s in shipments(rng, n)).encode()
+
+
+def event_request(rng: np.random.Generator, n: int) -> Dict[str, Any]:
+    events = shipments(rng, n)
+    for event in events:
+        event["timestamp"] = event["actualDelivery"]
+    return {"events": events}
+
+
+def co2_request(rng: np.random.Generator) -> Dict[str, Any]:
+    return {
+        "route_distance": round(float(rng.uniform(5, 1500)), 1),
+        "vehicle_type": str(rng.choice(VEHICLES)),
+        "cargo_weight": round(float(rng.uniform(0, 20000)), 1),
+        "fuel_type": str(rng.choice(FUELS))
+    }
+
+
+def bulk_co2_request(rng: np.random.Generator, legs: int) -> Dict[str, Any]:
+    return {
+        "route_distance": rng.uniform(5, 1500, size=legs).round(1).tolist(),
+        "vehicle_type": rng.choice(VEHICLES, size=legs).tolist(),
+        "cargo_weight": rng.uniform(0, 20000, size=legs).round(1).tolist(),
+        "fuel_type": rng.choice(FUELS, size=legs).tolist(),
+        "country": rng.choice(COUNTRIES, size=legs).tolist(),
+        "include_legs": True
+    }
+
+
+def bulk_co2_csv(rng: np.random.Generator, legs: int) -> bytes:
+    columns = bulk_co2_request(rng, legs)
+    rows = zip(columns["route_distance"], columns["vehicle_type"], columns["cargo_weight"], columns["fuel_type"], columns["country"])
+    lines = ["route_distance,vehicle_type,cargo_weight,fuel_type,country"]
+    lines.extend(f"{d},{v},{c},{f},{country}" for d, v, c, f, country in rows)
+    return ("\n".join(lines) + "\n").encode()
+
+
+def hub_request(rng: np.random.Generator, hubs: int) -> Dict[str, Any]:
+    """The same hub ids on every call, so repeated requests move hubs rather than add them"""
+    return {
+        "hubs": [
+            {"hub_id": f"hub-{i}", "location": location, "hub_type": "cross_dock" if i % 10 == 0 else "depot"}
+            for i, location in enumerate(locations(rng, hubs))
+        ]
+    }
+
+
+def hub_assignment_request(rng: np.random.Generator, orders: int, k: int = 1) -> Dict[str, Any]:
+    return {
+        "latitudes": rng.uniform(*LAT_RANGE, size=orders).round(5).tolist(),
+        "longitudes": rng.uniform(*LNG_RANGE, size=orders).round(5).tolist(),
+        "k": k
+    }
+
+
+def hub_radius_request(rng: np.random.Generator, orders: int, radius_km: float) -> Dict[str, Any]:
+    return {
+        "latitudes": rng.uniform(*LAT_RANGE, size=orders).round(5).tolist(),
+        "longitudes": rng.uniform(*LNG_RANGE, size=orders).round(5).tolist(),
+        "radius_km": radius_km
+    }
@@ -0,0 +1,271 @@
+"""In-process benchmark suite for the AI service.
+
+Drives the FastAPI app through httpx's ASGI transport (no sockets, no
+server) with seeded synthetic payloads, and reports throughput, latency
+percentiles and peak traced memory per endpoint and payload size. Results
+can be stored as a baseline; later runs fail when p50 latency or peak
+memory regress beyond the tolerance.
+
+    python -m benchmarks.run --save-baseline      # record this machine's numbers
+    python -m benchmarks.run                      # run and compare against baselines.json
+    python -m benchmarks.run --filter forecast    # only cases whose name contains "forecast"
+
+Baselines are machine-specific, so none is committed: record one on the
+machine that compares (git stash, save, stash pop, compare). CI records the
+base branch and compares the pull request on the same runner.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from benchmarks import generators
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# Regressions smaller than these are treated as noise whatever the tolerance
+MIN_LATENCY_DELTA_MS = 1.0
+MIN_MEMORY_DELTA_KB = 256.0
+
+JSON = "application/json"
+
+
+class Case(NamedTuple):
+    """One endpoint at one payload size"""
+    name: str
+    method: str
+    path: str
+    payload: Callable[[np.random.Generator], Tuple[Optional[bytes], str]]
+    # Build a new payload for every request, e.g. to defeat the route cache
+    fresh: bool = False
+
+
+def as_json(build: Callable[..., Any], *args: Any) -> Callable[[np.random.Generator], Tuple[bytes, str]]:
+    return lambda rng: (json.dumps(build(rng, *args)).encode(), JSON)
+
+
+def raw(build: Callable[..., bytes], *args: Any, content_type: str = JSON) -> Callable[[np.random.Generator], Tuple[bytes, str]]:
+    return lambda rng: (build(rng, *args), content_type)
+
+
+def no_body(rng: np.random.Generator) -> Tuple[None, str]:
+    return None, JSON
+
+
+CASES: List[Case] = [
+    Case("optimize-route[direct]", "POST", "/api/optimize-route", as_json(generators.route_request, 0), fresh=True),
+    Case("optimize-route[direct,cached]", "POST", "/api/optimize-route", as_json(generators.route_request, 0)),
+    Case("optimize-route[8 stops]", "POST", "/api/optimize-route", as_json(generators.route_request, 8), fresh=True),
+    Case("optimize-route[25 stops]", "POST", "/api/optimize-route", as_json(generators.route_request, 25), fresh=True),
+    Case("optimize-routes[100]", "POST", "/api/optimize-routes", as_json(generators.batch_route_request, 100)),
+    Case("optimize-routes[2000]", "POST", "/api/optimize-routes", as_json(generators.batch_route_request, 2000)),
+    Case("optimize-routes[2000,columnar]", "POST", "/api/optimize-routes?format=columnar", as_json(generators.batch_route_request, 2000)),
+    Case("forecast-demand[30d,h7]", "POST", "/api/forecast-demand", as_json(generators.forecast_request, 30, 7)),
+    Case("forecast-demand[365d,h30]", "POST", "/api/forecast-demand", as_json(generators.forecast_request, 365, 30)),
+    Case("forecast-demand[1095d,h90]", "POST", "/api/forecast-demand", as_json(generators.forecast_request, 1095, 90)),
+    Case("forecast-demand[1095d,h90,columnar]", "POST", "/api/forecast-demand?format=columnar", as_json(generators.forecast_request, 1095, 90)),
+    Case("forecast-demand[365d,h365,bootstrap 1000]", "POST", "/api/forecast-demand", as_json(lambda rng: generators.forecast_request(rng, 365, 365, interval_method="bootstrap", resamples=1000, seed=0))),
+    Case("forecast-demand/batch[50x90d,h30]", "POST", "/api/forecast-demand/batch", as_json(generators.batch_forecast_request, 50, 90, 30)),
+    Case("forecast-demand/batch[500x365d,h30]", "POST", "/api/forecast-demand/batch", as_json(generators.batch_forecast_request, 500, 365, 30)),
+    # History cases share one stored series: the ingest case must run before the references
+    Case("history/observations[1095d]", "POST", "/api/history/bench/observations", as_json(lambda rng: {"observations": generators.daily_series(rng, 1095)})),
+    Case("forecast-demand[history 1095d,h90]", "POST", "/api/forecast-demand", as_json(lambda rng: {"series_id": "bench", "forecast_horizon": 90})),
+    Case("detect-anomalies[history 1095d,day_of_week]", "POST", "/api/detect-anomalies", as_json(lambda rng: {"series_id": "bench", "group_by": ["day_of_week"]})),
+    Case("forecast-models/observations[30d]", "POST", "/api/forecast-models/bench/observations", as_json(lambda rng: {"observations": generators.daily_series(rng, 30)})),
+    Case("forecast-models/forecast[h30]", "GET", "/api/forecast-models/bench/forecast?horizon=30", no_body),
+    Case("detect-anomalies[100]", "POST", "/api/detect-anomalies", as_json(generators.anomaly_request, 100)),
+    Case("detect-anomalies[10000]", "POST", "/api/detect-anomalies", as_json(generators.anomaly_request, 10000)),
+    Case("detect-anomalies[10000,grouped]", "POST", "/api/detect-anomalies", as_json(generators.anomaly_request, 10000, ["carrier", "lane"])),
+    Case("detect-anomalies[10000,grouped,columnar]", "POST", "/api/detect-anomalies?format=columnar", as_json(generators.anomaly_request, 10000, ["carrier", "lane"])),
+    Case("detect-anomalies/stream[10000]", "POST", "/api/detect-anomalies/stream", raw(generators.shipment_ndjson, 10000, content_type="application/x-ndjson")),
+    Case("anomaly-baselines/events[10]", "POST", "/api/anomaly-baselines/events", as_json(generators.event_request, 10), fresh=True),
+    Case("anomaly-baselines/events[500]", "POST", "/api/anomaly-baselines/events", as_json(generators.event_request, 500)),
+    # Hub cases share one index: the upsert case must run before the queries
+    Case("hubs[3000]", "POST", "/api/hubs", as_json(generators.hub_request, 3000)),
+    Case("hubs/assign[100]", "POST", "/api/hubs/assign", as_json(generators.hub_assignment_request, 100)),
+    Case("hubs/assign[100000]", "POST", "/api/hubs/assign", as_json(generators.hub_assignment_request, 100000)),
+    Case("hubs/assign[10000,k5]", "POST", "/api/hubs/assign", as_json(generators.hub_assignment_request, 10000, 5)),
+    Case("hubs/within[10000,50km]", "POST", "/api/hubs/within", as_json(generators.hub_radius_request, 10000, 50.0)),
+    Case("estimate-co2[single]", "POST", "/api/estimate-co2", as_json(generators.co2_request)),
+    Case("estimate-co2/batch[1000]", "POST", "/api/estimate-co2/batch", as_json(generators.bulk_co2_request, 1000)),
+    Case("estimate-co2/batch[100000]", "POST", "/api/estimate-co2/batch", as_json(generators.bulk_co2_request, 100000)),
+    Case("estimate-co2/batch/csv[100000]", "POST", "/api/estimate-co2/batch/csv", raw(generators.bulk_co2_csv, 100000, content_type="text/csv")),
+]
+
+
+def percentile_ms(latencies: np.ndarray, q: float) -> float:
+    return round(float(np.percentile(latencies, q)) * 1000, 3)
+
+
+async def send(client, case: Case, body: Optional[bytes], content_type: str) -> int:
+    response = await client.request(case.method, case.path, content=body, headers={"content-type": content_type})
+    if response.status_code >= 400:
+        raise RuntimeError(f"{case.name}: HTTP {response.status_code} {response.text[:200]}")
+    return len(response.content)
+
+
+async def run_case(client, case: Case, seed: int, iterations: int, min_iterations: int, max_seconds: float, warmup: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    body, content_type = case.payload(rng)
+
+    for _ in range(warmup):
+        await send(client, case, body, content_type)
+
+    latencies = []
+    response_bytes = 0
+    started = time.perf_counter()
+    while len(latencies) < iterations:
+        if len(latencies) >= min_iterations and time.perf_counter() - started > max_seconds:
+            break
+        if case.fresh:
+            body, content_type = case.payload(rng)
+        start = time.perf_counter()
+        response_bytes = await send(client, case, body, content_type)
+        latencies.append(time.perf_counter() - start)
+    measured = np.array(latencies)
+
+    # Memory is traced on a separate request: tracing slows every allocation
+    if case.fresh:
+        body, content_type = case.payload(rng)
+    tracemalloc.start()
+    try:
+        await send(client, case, body, content_type)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "requests": len(measured),
+        "throughput_rps": round(len(measured) / float(measured.sum()), 2),
+        "mean_ms": round(float(measured.mean()) * 1000, 3),
+        "p50_ms": percentile_ms(measured, 50),
+        "p95_ms": percentile_ms(measured, 95),
+        "p99_ms": percentile_ms(measured, 99),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "request_bytes": len(body) if body else 0,
+        "response_bytes": response_bytes
+    }
+
+
+async def run_cases(cases: List[Case], args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    import main
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for case in cases:
+                result = await run_case(client, case, args.seed, args.iterations, args.min_iterations, args.max_seconds, args.warmup)
+                results[case.name] = result
+                print(
+                    f"{case.name:<40} {result['requests']:>5} req {result['throughput_rps']:>10.1f} req/s  "
+                    f"p50 {result['p50_ms']:>9.2f}  p95 {result['p95_ms']:>9.2f}  p99 {result['p99_ms']:>9.2f} ms  "
+                    f"peak {result['peak_memory_kb']:>10.1f} KiB"
+                )
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baselines: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions of p50 latency or peak memory beyond `tolerance` (a fraction)"""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        for metric, floor in (("p50_ms", MIN_LATENCY_DELTA_MS), ("peak_memory_kb", MIN_MEMORY_DELTA_KB)):
+            before, after = baseline[metric], result[metric]
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append(f"{name}: {metric} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"environment": {}, "results": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(path: str, results: Dict[str, Dict[str, Any]], seed: int) -> None:
+    stored = load_baselines(path)
+    stored["environment"] = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "recorded_at": datetime.utcnow().isoformat()
+    }
+    # Merge so a filtered run only refreshes the cases it measured
+    stored["results"] = {**stored.get("results", {}), **results}
+    with open(path, "w") as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark AI service endpoints in-process")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--iterations", type=int, default=50, help="maximum measured requests per case")
+    parser.add_argument("--min-iterations", type=int, default=5, help="requests measured even past --max-seconds")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="time budget per case")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured requests per case")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression as a fraction of the baseline")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    cases = [case for case in CASES if args.filter in case.name]
+    if not cases:
+        print(f"No benchmark case matches '{args.filter}'")
+        return 2
+
+    # Keep stored forecast models, hubs and history out of the working tree and warm up before measuring
+    state_dir = tempfile.mkdtemp(prefix="ai-bench-")
+    os.environ.setdefault("FORECAST_REGISTRY_PATH", os.path.join(state_dir, "registry.npz"))
+    os.environ.setdefault("HUB_INDEX_PATH", os.path.join(state_dir, "hubs.npz"))
+    os.environ.setdefault("HISTORY_STORE_PATH", os.path.join(state_dir, "history"))
+    # No road graph unless one is given: route baselines measure great-circle routing
+    os.environ.setdefault("ROAD_GRAPH_PATH", os.path.join(state_dir, "road_graph.npz"))
+    os.environ.setdefault("AI_WARMUP", "eager")
+    # Cases repeat one payload: memoized results would hide the computation being measured
+    os.environ.setdefault("COALESCE_TTL_SECONDS", "0")
+
+    results = asyncio.run(run_cases(cases, args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        save_baselines(args.baseline, results, args.seed)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baselines = load_baselines(args.baseline).get("results", {})
+    if not baselines:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+    regressions = compare(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Bounded in-process LRU + TTL cache for route optimization results"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class RouteCache:
+    """LRU cache with per-entry expiry, keyed on quantized coordinates.
+
+    Coordinates are rounded to `precision` decimal places before they become
+    part of the key (4 places is roughly 11 m), so repeat requests for the same
+    lane share an entry even when clients send slightly different floats. The
+    origin country's detour factor is part of the key too, since it scales the
+    distance, time, cost and CO2 of great-circle routes.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600.0, precision: int = 4):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_key(self, points: Iterable[Tuple[float, float]], vehicle_type: str, optimize_for: str, country_factor: float) -> Tuple:
+        """Build a cache key from (lat, lng) points, the routing options and the origin's country factor"""
+        coords = tuple((round(lat, self.precision), round(lng, self.precision)) for lat, lng in points)
+        return (coords, vehicle_type, optimize_for, float(country_factor))
+
+    @staticmethod
+    def route_id_for(key: Hashable) -> str:
+        """Deterministic route id derived from a cache key"""
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return f"route_{digest[:12]}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "precision": self.precision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
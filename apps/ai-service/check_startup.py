@@ -0,0 +1,67 @@
+"""Cold-start budget check for CI.
+
+Fails when importing the service, starting the app or warming every model
+subsystem takes longer than its budget, or when the import pulls in heavy
+libraries that only specific code paths need.
+
+    python check_startup.py
+"""
+import os
+import sys
+import time
+
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "0.5"))
+WARMUP_BUDGET_SECONDS = float(os.getenv("WARMUP_BUDGET_SECONDS", "5.0"))
+
+# Must only be imported lazily, by the code paths that use them
+DEFERRED_MODULES = ("sklearn", "scipy", "pandas", "torch", "matplotlib", "seaborn")
+
+
+def run_checks() -> int:
+    os.environ.setdefault("AI_WARMUP", "background")
+    failures = []
+
+    start = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - start
+    print(f"import: {import_seconds:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)")
+    if import_seconds > IMPORT_BUDGET_SECONDS:
+        failures.append("import time over budget")
+
+    eager = [name for name in DEFERRED_MODULES if name in sys.modules]
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+
+    from fastapi.testclient import TestClient
+
+    start = time.perf_counter()
+    with TestClient(main.app) as client:
+        # Startup hooks have run; the service must answer before warm-up ends
+        health = client.get("/health")
+        startup_seconds = time.perf_counter() - start
+        print(f"startup: {startup_seconds:.3f}s (budget {STARTUP_BUDGET_SECONDS}s)")
+        if health.status_code != 200:
+            failures.append(f"/health returned {health.status_code}")
+        if startup_seconds > STARTUP_BUDGET_SECONDS:
+            failures.append("startup time over budget")
+
+        deadline = start + WARMUP_BUDGET_SECONDS
+        ready = client.get("/health/ready")
+        while ready.status_code != 200 and time.perf_counter() < deadline:
+            time.sleep(0.02)
+            ready = client.get("/health/ready")
+        warmup_seconds = time.perf_counter() - start
+        print(f"ready: {warmup_seconds:.3f}s (budget {WARMUP_BUDGET_SECONDS}s)")
+        for name, model in ready.json()["ai_models"].items():
+            print(f"  {name}: {model['state']} {model['load_seconds']}s {model['error'] or ''}")
+        if ready.status_code != 200:
+            failures.append("model subsystems not ready within the warm-up budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_checks())
@@ -0,0 +1,114 @@
+"""Single-flight coalescing and a short-lived memo for identical model requests.
+
+Requests are keyed by operation plus a hash of their canonical JSON (sorted
+keys), so dashboards sending the same payload share one computation: the
+first caller starts it, concurrent duplicates await the same task, and
+callers arriving within `ttl_seconds` of its completion get the memoized
+result. The memo is an LRU bounded by `max_entries`.
+
+Everything runs on the event loop thread, so no locks are needed. Results
+are shared between callers and must not be mutated after they are returned.
+Failures are never memoized; concurrent duplicates see the same error.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from serialization import canonical_json
+
+OUTCOMES = ("computed", "coalesced", "memo_hit")
+
+
+def request_key(operation: str, payload: Any) -> str:
+    digest = hashlib.sha1(canonical_json(payload)).hexdigest()
+    return f"{operation}:{digest}"
+
+
+class RequestCoalescer:
+    """Deduplicates identical in-flight calls and memoizes their results briefly"""
+
+    def __init__(self, ttl_seconds: float = 10.0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (expires_at, compute seconds, result)
+        self._memo: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, "asyncio.Future"] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._saved_seconds: Dict[str, float] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def _record(self, operation: str, outcome: str, saved_seconds: float = 0.0) -> None:
+        counts = self._counts.setdefault(operation, dict.fromkeys(OUTCOMES, 0))
+        counts[outcome] += 1
+        self._saved_seconds[operation] = self._saved_seconds.get(operation, 0.0) + saved_seconds
+
+    async def run(self, operation: str, payload: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of `compute()` for this payload, shared with identical concurrent or recent calls"""
+        key = request_key(operation, payload)
+
+        entry = self._memo.get(key)
+        if entry is not None:
+            expires_at, seconds, result = entry
+            if expires_at > time.monotonic():
+                self._memo.move_to_end(key)
+                self._record(operation, "memo_hit", seconds)
+                return result
+            del self._memo[key]
+            self.expirations += 1
+
+        in_flight = self._in_flight.get(key)
+        joined = in_flight is not None
+        task = in_flight if in_flight is not None else self._start(key, compute)
+
+        result, seconds = await asyncio.shield(task)
+        self._record(operation, "coalesced" if joined else "computed", seconds if joined else 0.0)
+        return result
+
+    def _start(self, key: str, compute: Callable[[], Awaitable[Any]]) -> "asyncio.Future":
+        # A task of its own, so a leader that disconnects does not cancel the followers' result
+        task = asyncio.ensure_future(self._compute(key, compute))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return task
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = await compute()
+        seconds = time.perf_counter() - start
+        if self.ttl_seconds > 0 and self.max_entries > 0:
+            self._memo[key] = (time.monotonic() + self.ttl_seconds, seconds, result)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+                self.evictions += 1
+        return result, seconds
+
+    def _finished(self, key: str, task: "asyncio.Future") -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # Mark the error retrieved even when every caller has gone away
+            task.exception()
+
+    def clear(self) -> None:
+        self._memo.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "memo_entries": len(self._memo),
+            "in_flight": len(self._in_flight),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "operations": {
+                operation: {
+                    **counts,
+                    "suppressed": counts["coalesced"] + counts["memo_hit"],
+                    "saved_seconds": round(self._saved_seconds[operation], 4)
+                }
+                for operation, counts in self._counts.items()
+            }
+        }
@@ -0,0 +1,124 @@
+"""Bounded execution layer that keeps CPU-bound model work off the event loop"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+
+class WorkerHTTPError(Exception):
+    """Picklable stand-in for an HTTPException raised inside a worker process"""
+
+    def __init__(self, status_code: int, detail: Any, queue_wait: float = 0.0):
+        super().__init__(status_code, detail, queue_wait)
+        self.status_code = status_code
+        self.detail = detail
+        self.queue_wait = queue_wait
+
+
+def _call_in_worker(fn: Callable[..., Any], args: tuple, kwargs: dict, submitted: float) -> Any:
+    # time.monotonic is system-wide, so the wait is valid across processes too
+    queue_wait = time.monotonic() - submitted
+    try:
+        return queue_wait, fn(*args, **kwargs)
+    except HTTPException as e:
+        raise WorkerHTTPError(e.status_code, e.detail, queue_wait) from None
+
+
+class BoundedExecutor:
+    """Thread or process pool with a hard cap on in-flight jobs.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more wait
+    for a worker. Anything beyond that is rejected immediately with a 429 so
+    a burst of heavy requests cannot pile up behind the event loop; a pool that
+    is shutting down answers 503.
+
+    Process pools need picklable, module-level callables. `on_queue_wait` is
+    called with the seconds each job waited for a worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = 32, kind: str = "thread", on_queue_wait: Optional[Callable[[float], None]] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.on_queue_wait = on_queue_wait
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pool: Optional[Executor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0  # returned a result
+        self.failed = 0  # raised, in the worker or while waiting for it
+        self.rejected = 0
+
+    def _get_pool(self) -> Executor:
+        # Created on first use so importing the service stays cheap
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ai-worker")
+            return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn` in the pool, failing fast when the service is saturated"""
+        if self._closed:
+            raise HTTPException(status_code=503, detail="Service is shutting down")
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many concurrent model jobs, retry later",
+                headers={"Retry-After": "1"}
+            )
+
+        with self._lock:
+            self.in_flight += 1
+        succeeded = False
+        try:
+            loop = asyncio.get_running_loop()
+            queue_wait, result = await loop.run_in_executor(self._get_pool(), _call_in_worker, fn, args, kwargs, time.monotonic())
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(queue_wait)
+            succeeded = True
+            return result
+        except WorkerHTTPError as e:
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(e.queue_wait)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        self._closed = True
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
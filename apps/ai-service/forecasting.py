@@ -0,0 +1,321 @@
+"""Vectorized demand forecasting engine.
+
+Everything works on whole arrays: dates are parsed straight into
+``datetime64`` values, calendar features come from integer arithmetic on
+those values, and the full forecast horizon is scaled and predicted in a
+single matrix product. Prediction intervals come from `intervals`, for every
+horizon day (and every series of a batch) at once.
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from intervals import IntervalBasis, IntervalOptions, fit_basis, prediction_bounds
+
+# Below this many training rows the closed-form solver is used and sklearn is
+# never touched; above it the sklearn pipeline is used.
+CLOSED_FORM_MAX_SAMPLES = 50000
+
+
+# A - after the time of day marks a negative UTC offset
+NEGATIVE_OFFSET = re.compile(r"[T ][\d:.,]*-")
+
+
+def has_utc_offsets(values: List[str]) -> bool:
+    """Whether any ISO string carries a UTC offset or a trailing Z"""
+    joined = "\n".join(values)
+    if "+" in joined or "Z" in joined or "z" in joined:
+        return True
+    # Substring checks are far cheaper than the regex, so plain dates skip it
+    return ("T" in joined or " " in joined) and NEGATIVE_OFFSET.search(joined) is not None
+
+
+def local_datetime(value: str) -> datetime:
+    """Wall-clock time of an ISO string, dropping any UTC offset"""
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def parse_dates(values: List[str]) -> np.ndarray:
+    """Parse ISO date strings into a microsecond ``datetime64`` array of local wall-clock times"""
+    # NumPy converts offsets to UTC (warning, not raising), which can move the
+    # calendar day, so those strings go through the stdlib instead
+    if not has_utc_offsets(values):
+        try:
+            return np.array(values, dtype="datetime64[us]")
+        except ValueError:
+            pass
+    return np.array([local_datetime(v) for v in values], dtype="datetime64[us]")
+
+
+def calendar_features(dates: np.ndarray, start_index: int) -> np.ndarray:
+    """Feature matrix of [day index, day of week, month, day of month]"""
+    days = dates.astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+
+    X = np.empty((len(days), 4), dtype=float)
+    X[:, 0] = np.arange(start_index, start_index + len(days))
+    X[:, 1] = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    X[:, 2] = months.astype(np.int64) % 12 + 1
+    X[:, 3] = (days - months).astype(np.int64) + 1
+    return X
+
+
+class LinearForecastModel:
+    """Standardized ordinary least squares with an intercept.
+
+    Mirrors ``StandardScaler`` + ``LinearRegression``: features are scaled to
+    zero mean and unit variance (constant columns keep a scale of 1), the
+    centred system is solved with a minimum-norm least-squares solve and the
+    intercept is recovered from the means.
+    """
+
+    def __init__(self, solver: str = "auto"):
+        self.solver = solver
+        self.mean_: Optional[np.ndarray] = None
+        self.scale_: Optional[np.ndarray] = None
+        self.coef_: Optional[np.ndarray] = None
+        self.intercept_ = 0.0
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "LinearForecastModel":
+        solver = self.solver
+        if solver == "auto":
+            solver = "closed_form" if len(X) <= CLOSED_FORM_MAX_SAMPLES else "sklearn"
+
+        if solver == "sklearn":
+            from sklearn.linear_model import LinearRegression
+            from sklearn.preprocessing import StandardScaler
+
+            scaler = StandardScaler().fit(X)
+            model = LinearRegression().fit(scaler.transform(X), y)
+            self.mean_, self.scale_ = scaler.mean_, scaler.scale_
+            self.coef_, self.intercept_ = model.coef_, float(model.intercept_)
+            return self
+
+        self.mean_ = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+
+        X_scaled = (X - self.mean_) / self.scale_
+        y_mean = y.mean()
+        X_centred = X_scaled - X_scaled.mean(axis=0)
+        self.coef_ = np.linalg.lstsq(X_centred, y - y_mean, rcond=None)[0]
+        self.intercept_ = float(y_mean - X_scaled.mean(axis=0) @ self.coef_)
+        return self
+
+    @classmethod
+    def from_moments(cls, n: int, mean: np.ndarray, comoment: np.ndarray) -> "LinearForecastModel":
+        """Solve from sufficient statistics of the augmented rows [features..., volume].
+
+        `mean` holds the column means and `comoment` the centred cross-product
+        matrix (sum of outer products of deviations), so the fit never needs
+        the original observations.
+        """
+        model = cls("closed_form")
+        model.mean_ = mean[:-1]
+        scale = np.sqrt(np.maximum(np.diag(comoment)[:-1], 0) / n)
+        model.scale_ = np.where(scale > 0, scale, 1.0)
+
+        XtX = comoment[:-1, :-1] / np.outer(model.scale_, model.scale_)
+        Xty = comoment[:-1, -1] / model.scale_
+        model.coef_ = np.linalg.pinv(XtX, rcond=1e-10) @ Xty
+        model.intercept_ = float(mean[-1])
+        return model
+
+    def fitted(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Feature means, feature scales and coefficients of a fitted model"""
+        if self.mean_ is None or self.scale_ is None or self.coef_ is None:
+            raise ValueError("Model has not been fitted")
+        return self.mean_, self.scale_, self.coef_
+
+    def standardize(self, X: np.ndarray) -> np.ndarray:
+        mean, scale, _ = self.fitted()
+        return (X - mean) / scale
+
+    def predict_standardized(self, X_scaled: np.ndarray) -> np.ndarray:
+        return X_scaled @ self.fitted()[2] + self.intercept_
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_standardized(self.standardize(X))
+
+    def interval_basis(self, X: np.ndarray, y: np.ndarray) -> IntervalBasis:
+        """Interval basis of this model fitted on X and y"""
+        design = self.standardize(X)
+        design -= design.mean(axis=0)
+        return fit_basis(design[None], (y - self.predict(X))[None], np.array([len(y)]))
+
+
+def regression_metrics(y: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    """MAE, RMSE and R² for fitted values"""
+    residuals = y - y_pred
+    ss_res = float(residuals @ residuals)
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    if ss_tot > 0:
+        r2 = 1 - ss_res / ss_tot
+    else:
+        r2 = 1.0 if ss_res == 0 else 0.0
+
+    return {
+        "mae": float(np.mean(np.abs(residuals))),
+        "rmse": float(np.sqrt(ss_res / len(y))),
+        "r2": r2
+    }
+
+
+def forecast_series(volumes: np.ndarray, dates: np.ndarray, horizon: int, now: np.datetime64, solver: str = "auto", intervals: IntervalOptions = IntervalOptions()) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """Fit one series and predict every horizon day in a single pass.
+
+    Returns column arrays for the horizon (dates, predictions, seasonal and
+    trend factors, interval bounds) plus the in-sample model metrics.
+    """
+    X = calendar_features(dates, 0)
+    model = LinearForecastModel(solver).fit(X, volumes)
+    columns = horizon_columns(model, len(volumes), horizon, now, model.interval_basis(X, volumes), intervals)
+    return columns, regression_metrics(volumes, model.predict(X))
+
+
+def horizon_columns(model: LinearForecastModel, n_observations: int, horizon: int, now: np.datetime64, basis: IntervalBasis, intervals: IntervalOptions) -> Dict[str, np.ndarray]:
+    """Predict every horizon day of a fitted model and its prediction intervals in a single pass"""
+    steps = np.arange(1, horizon + 1)
+    future_dates = now + steps * np.timedelta64(1, "D")
+    X_future = calendar_features(future_dates, n_observations + 1)
+    future = model.standardize(X_future)
+    raw = model.predict_standardized(future)
+    low, high = prediction_bounds(basis, future[None], intervals)
+
+    # Weekly seasonal pattern and a slight upward trend, applied to the bounds too
+    seasonal = 1 + 0.1 * np.sin(2 * np.pi * steps / 7)
+    trend = 1 + 0.005 * steps
+    predicted = np.maximum(0, raw * seasonal * trend)
+
+    return {
+        "dates": future_dates,
+        "day_of_week": X_future[:, 1].astype(int),
+        "month": X_future[:, 2].astype(int),
+        "predicted_volume": predicted,
+        "seasonal_factor": seasonal,
+        "trend_factor": trend,
+        "lower": np.maximum(0, (raw + low[0]) * seasonal * trend),
+        "upper": np.maximum(0, (raw + high[0]) * seasonal * trend)
+    }
+
+
+def forecast_rows(columns: Dict[str, Any], confidence_level: float = 0.8) -> Tuple[List[Dict[str, Any]], List[Dict[str, float]]]:
+    """Turn horizon columns into the per-day dicts of ForecastResponse"""
+    dates = np.datetime_as_string(columns["dates"], unit="us").tolist()
+    predicted = np.round(columns["predicted_volume"], 2).tolist()
+    day_of_week = columns["day_of_week"].tolist()
+    month = columns["month"].tolist()
+    seasonal = np.round(columns["seasonal_factor"], 3).tolist()
+    trend = np.round(columns["trend_factor"], 3).tolist()
+
+    predictions = [
+        {
+            "date": d,
+            "predicted_volume": p,
+            "day_of_week": dow,
+            "month": m,
+            "seasonal_factor": s,
+            "trend_factor": t
+        }
+        for d, p, dow, m, s, t in zip(dates, predicted, day_of_week, month, seasonal, trend)
+    ]
+    confidence_intervals = [
+        {"lower": lo, "upper": hi, "confidence_level": confidence_level}
+        for lo, hi in zip(np.round(columns["lower"], 2).tolist(), np.round(columns["upper"], 2).tolist())
+    ]
+    return predictions, confidence_intervals
+
+
+def forecast_arrays(columns: Dict[str, Any], confidence_level: float = 0.8) -> Dict[str, Any]:
+    """Columnar counterpart of `forecast_rows`: one rounded array per field"""
+    return {
+        "dates": np.datetime_as_string(columns["dates"], unit="us").tolist(),
+        "predicted_volume": np.round(columns["predicted_volume"], 2),
+        "day_of_week": columns["day_of_week"],
+        "month": columns["month"],
+        "seasonal_factor": np.round(columns["seasonal_factor"], 3),
+        "trend_factor": np.round(columns["trend_factor"], 3),
+        "lower": np.round(columns["lower"], 2),
+        "upper": np.round(columns["upper"], 2),
+        "confidence_level": confidence_level
+    }
+
+
+def forecast_many(codes: np.ndarray, n_series: int, dates: np.ndarray, volumes: np.ndarray, horizon: int, now: np.datetime64, intervals: IntervalOptions = IntervalOptions()) -> Dict[str, np.ndarray]:
+    """Fit and forecast many series at once over a padded 3-D design tensor.
+
+    `codes` assigns every observation to a series in ``range(n_series)``.
+    Rows are grouped per series (keeping their original order), padded to the
+    longest series and masked, so every per-series standardization, normal
+    equation and prediction is a single batched array operation. The result
+    has one row per series and matches `forecast_series` for each of them.
+    """
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    counts = np.bincount(codes, minlength=n_series)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    position = np.arange(len(codes)) - starts[codes]
+
+    features = calendar_features(dates[order], 0)
+    features[:, 0] = position
+
+    length = max(int(counts.max()), 1) if n_series else 1
+    X = np.zeros((n_series, length, 4))
+    y = np.zeros((n_series, length))
+    mask = np.zeros((n_series, length), dtype=bool)
+    X[codes, position] = features
+    y[codes, position] = volumes[order]
+    mask[codes, position] = True
+
+    n = np.maximum(counts, 1)[:, None].astype(float)
+    m = mask[..., None]
+
+    # Per-series standardization (constant columns keep a scale of 1)
+    mean = (X * m).sum(axis=1) / n
+    scale = np.sqrt((((X - mean[:, None]) ** 2) * m).sum(axis=1) / n)
+    scale = np.where(scale > 0, scale, 1.0)
+    X_centred = ((X - mean[:, None]) / scale[:, None]) * m
+
+    y_mean = (y * mask).sum(axis=1) / n[:, 0]
+    y_centred = (y - y_mean[:, None]) * mask
+
+    # Batched normal equations; the pseudo-inverse gives the same minimum-norm
+    # solution as lstsq when calendar features are collinear
+    XtX = np.einsum("sli,slj->sij", X_centred, X_centred)
+    Xty = np.einsum("sli,sl->si", X_centred, y_centred)
+    coef = np.einsum("sij,sj->si", np.linalg.pinv(XtX, rcond=1e-10), Xty)
+
+    fitted = np.einsum("sli,si->sl", X_centred, coef) + y_mean[:, None]
+    residuals = (y - fitted) * mask
+    ss_res = (residuals ** 2).sum(axis=1)
+    ss_tot = (y_centred ** 2).sum(axis=1)
+    r2 = np.where(ss_tot > 0, 1 - ss_res / np.where(ss_tot > 0, ss_tot, 1), np.where(ss_res == 0, 1.0, 0.0))
+
+    steps = np.arange(1, horizon + 1)
+    future_dates = now + steps * np.timedelta64(1, "D")
+    X_future = np.broadcast_to(calendar_features(future_dates, 0), (n_series, horizon, 4)).copy()
+    X_future[:, :, 0] = counts[:, None] + steps
+    future = (X_future - mean[:, None]) / scale[:, None]
+    raw = np.einsum("shi,si->sh", future, coef) + y_mean[:, None]
+    low, high = prediction_bounds(fit_basis(X_centred, residuals, counts), future, intervals)
+
+    seasonal = 1 + 0.1 * np.sin(2 * np.pi * steps / 7)
+    trend = 1 + 0.005 * steps
+    predicted = np.maximum(0, raw * seasonal * trend)
+
+    return {
+        "dates": future_dates,
+        "counts": counts,
+        "predicted_volume": predicted,
+        "seasonal_factor": seasonal,
+        "trend_factor": trend,
+        "lower": np.maximum(0, (raw + low) * seasonal * trend),
+        "upper": np.maximum(0, (raw + high) * seasonal * trend),
+        "mae": np.abs(residuals).sum(axis=1) / n[:, 0],
+        "rmse": np.sqrt(ss_res / n[:, 0]),
+        "r2": r2
+    }
@@ -0,0 +1,40 @@
+"""Vectorized great-circle helpers shared by the routing endpoints"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees.
+
+    Accepts scalars or arrays and broadcasts like any NumPy ufunc, so a whole
+    batch of origin/destination pairs is handled in a single pass.
+    """
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    # Clip guards against tiny floating point overshoots above 1.0
+    c = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return EARTH_RADIUS_KM * c
+
+
+def lookup_factors(keys, table, default):
+    """Map a sequence of string keys to factors through a dense array lookup"""
+    names = list(table.keys())
+    factors = np.append(np.array([table[name] for name in names], dtype=float), default)
+    index = {name: i for i, name in enumerate(names)}
+
+    unique_keys, inverse = np.unique(np.asarray(keys, dtype=object).astype(str), return_inverse=True)
+    codes = np.array([index.get(key, len(names)) for key in unique_keys], dtype=np.intp)
+    return factors[codes[inverse]]
+
+
+def distance_matrix(lats, lngs):
+    """Full N x N great-circle matrix in km, computed in one broadcasted pass"""
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    return haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
@@ -0,0 +1,210 @@
+"""On-disk store of daily demand series, read through memory maps.
+
+Each series (a product category, lane or any other id) is one file of packed
+12-byte records, a ``datetime64[D]`` day and a float32 volume, sorted by day
+with one record per day. Forecasts and anomaly scans reference a series and
+a date range instead of shipping the history as JSON: a read maps the file,
+binary-searches the day column and returns views of both columns, so nothing
+is parsed or copied until the model needs it. At most `max_mapped` maps stay
+open, least recently used first out.
+
+Appends of days after the last stored day go to the end of the file.
+Anything else (backfills, corrections of stored days) merges with the stored
+records, the later value winning for a repeated day, and replaces the file
+atomically. A torn append is cut back to whole records. Readers keep the maps
+they opened, so a replacement never changes data under a running forecast.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([("date", "datetime64[D]"), ("volume", "float32")])
+FILE_SUFFIX = ".series"
+
+# Escaped ids longer than this would run into file name limits
+MAX_FILE_ID_LENGTH = 200
+
+
+def file_id(series_id: str) -> str:
+    """File name stem for a series id: every character outside [A-Za-z0-9_.~-] is %-escaped"""
+    quoted = quote(series_id, safe="")
+    if not series_id or len(quoted) > MAX_FILE_ID_LENGTH:
+        raise ValueError(f"Series id must be 1 to {MAX_FILE_ID_LENGTH} characters once escaped")
+    return quoted
+
+
+def daily_records(dates: np.ndarray, volumes: np.ndarray) -> np.ndarray:
+    """Records sorted by day, keeping the last value given for each day"""
+    days = np.asarray(dates).astype("datetime64[D]")
+    volumes = np.asarray(volumes, dtype=float)
+    if len(days) != len(volumes):
+        raise ValueError("dates and volumes must have the same length")
+    if np.isnat(days).any():
+        raise ValueError("Observation dates must not be missing")
+
+    order = np.argsort(days, kind="stable")
+    days = days[order]
+    last = np.ones(len(days), dtype=bool)
+    last[:-1] = days[1:] != days[:-1]
+
+    records = np.empty(int(last.sum()), dtype=RECORD_DTYPE)
+    records["date"] = days[last]
+    records["volume"] = volumes[order][last]
+    return records
+
+
+class _Mapped:
+    """Read-only map of one series file and the file identity it was opened from"""
+
+    __slots__ = ("stamp", "records")
+
+    def __init__(self, stamp: Tuple[int, int], records: np.ndarray):
+        self.stamp = stamp
+        self.records = records
+
+
+class HistoryStore:
+    """Thread-safe series id -> daily (date, volume) records, one file per series under `path`"""
+
+    def __init__(self, path: str, max_mapped: int = 1024):
+        self.path = path
+        self.max_mapped = max_mapped
+        self._lock = threading.Lock()
+        self._mapped: "OrderedDict[str, _Mapped]" = OrderedDict()
+        self.unmapped = 0
+        self.appends = 0
+        self.rewrites = 0
+
+    def load(self) -> int:
+        """Create the directory if needed; returns the series count"""
+        os.makedirs(self.path, exist_ok=True)
+        return len(self.series_ids())
+
+    def _file(self, series_id: str) -> str:
+        return os.path.join(self.path, file_id(series_id) + FILE_SUFFIX)
+
+    def stamp(self, series_id: str) -> Optional[Tuple[int, int]]:
+        """File identity and size; changes whenever the series does. None if unknown"""
+        try:
+            stat = os.stat(self._file(series_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _records(self, series_id: str) -> Optional[np.ndarray]:
+        # Called with the lock held; maps are reopened when the file changed, here or in another process
+        stamp = self.stamp(series_id)
+        if stamp is None:
+            self._mapped.pop(series_id, None)
+            return None
+        mapped = self._mapped.get(series_id)
+        if mapped is not None and mapped.stamp == stamp:
+            self._mapped.move_to_end(series_id)
+            return mapped.records
+
+        n = stamp[1] // RECORD_DTYPE.itemsize
+        if n == 0:
+            records = np.empty(0, dtype=RECORD_DTYPE)
+        else:
+            records = np.memmap(self._file(series_id), dtype=RECORD_DTYPE, mode="r", shape=(n,))
+        self._mapped[series_id] = _Mapped(stamp, records)
+        self._mapped.move_to_end(series_id)
+        # Readers holding an evicted map keep it open until they drop it
+        while len(self._mapped) > self.max_mapped:
+            self._mapped.popitem(last=False)
+            self.unmapped += 1
+        return records
+
+    def read(self, series_id: str, start: Optional[np.datetime64] = None, end: Optional[np.datetime64] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Days and volumes from `start` to `end` inclusive as read-only views of the map; None if unknown"""
+        with self._lock:
+            records = self._records(series_id)
+        if records is None:
+            return None
+        dates = records["date"]
+        low = 0 if start is None else int(np.searchsorted(dates, np.asarray(start).astype("datetime64[D]"), side="left"))
+        high = len(dates) if end is None else int(np.searchsorted(dates, np.asarray(end).astype("datetime64[D]"), side="right"))
+        high = max(low, high)
+        return dates[low:high], records["volume"][low:high]
+
+    def append(self, series_id: str, dates: np.ndarray, volumes: np.ndarray) -> Dict[str, Any]:
+        """Add observations to a series, creating it if needed; returns its summary"""
+        new = daily_records(dates, volumes)
+        path = self._file(series_id)
+        with self._lock:
+            stored = self._records(series_id)
+            if len(new) and stored is not None and len(stored) and new["date"][0] <= stored["date"][-1]:
+                merged = np.concatenate([stored, new])
+                self._replace(path, daily_records(merged["date"], merged["volume"]))
+                self.rewrites += 1
+            elif len(new):
+                os.makedirs(self.path, exist_ok=True)
+                with open(path, "ab") as f:
+                    # Drop the partial record a torn earlier append may have left
+                    f.truncate(0 if stored is None else len(stored) * RECORD_DTYPE.itemsize)
+                    f.write(new.tobytes())
+                self.appends += 1
+            return self._summary(series_id, self._records(series_id))
+
+    def _replace(self, path: str, records: np.ndarray) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(records.tobytes())
+        os.replace(tmp_path, path)
+
+    def delete(self, series_id: str) -> bool:
+        with self._lock:
+            self._mapped.pop(series_id, None)
+            try:
+                os.remove(self._file(series_id))
+            except FileNotFoundError:
+                return False
+        return True
+
+    def series_ids(self) -> List[str]:
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        return sorted(unquote(name[:-len(FILE_SUFFIX)]) for name in names if name.endswith(FILE_SUFFIX))
+
+    def _summary(self, series_id: str, records: Optional[np.ndarray]) -> Dict[str, Any]:
+        if records is None or not len(records):
+            return {"series_id": series_id, "observations": 0, "first_date": None, "last_date": None}
+        return {
+            "series_id": series_id,
+            "observations": len(records),
+            "first_date": str(records["date"][0]),
+            "last_date": str(records["date"][-1])
+        }
+
+    def get(self, series_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            records = self._records(series_id)
+            return None if records is None else self._summary(series_id, records)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        series_ids = self.series_ids()
+        with self._lock:
+            return [self._summary(series_id, self._records(series_id)) for series_id in series_ids]
+
+    def stats(self) -> Dict[str, int]:
+        # From file sizes alone, so scrapes never map every series
+        try:
+            entries = [entry for entry in os.scandir(self.path) if entry.name.endswith(FILE_SUFFIX)]
+        except FileNotFoundError:
+            entries = []
+        observations = sum(entry.stat().st_size // RECORD_DTYPE.itemsize for entry in entries)
+        return {
+            "series": len(entries),
+            "observations": observations,
+            "bytes": observations * RECORD_DTYPE.itemsize,
+            "mapped_series": len(self._mapped),
+            "unmapped": self.unmapped,
+            "appends": self.appends,
+            "rewrites": self.rewrites
+        }
@@ -0,0 +1,241 @@
+"""In-process background jobs for model work too slow for a synchronous request.
+
+Jobs wait in a bounded priority queue (higher priority first, FIFO within a
+priority) and are run by a fixed number of worker tasks on the event loop.
+Each job is a coroutine that hands its CPU work to an executor of its own,
+so long analytics never take the workers that interactive endpoints use.
+Jobs report progress as they go; finished jobs keep their result until
+`result_ttl_seconds` pass or `max_results` newer jobs have finished.
+
+Submitting to a full queue raises a 429. Cancelling a queued job drops it;
+cancelling a running one stops it at its next await (work already handed to
+the executor still finishes, but its result is discarded).
+"""
+import asyncio
+import heapq
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class Job:
+    """One unit of background work and everything reported about it"""
+
+    def __init__(self, operation: str, run: Callable[["Job"], Awaitable[Any]], priority: int = 0):
+        self.job_id = f"job_{uuid.uuid4().hex[:16]}"
+        self.operation = operation
+        self.priority = priority
+        self.state = "queued"
+        self.progress = 0.0
+        self.stage: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[Dict[str, Any]] = None
+        self._run = run
+        self._task: Optional["asyncio.Future"] = None
+        self._cancel_requested = False
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def report(self, progress: float, stage: Optional[str] = None) -> None:
+        """Record progress as a fraction of the job, optionally naming the current stage"""
+        self.progress = min(max(progress, 0.0), 1.0)
+        if stage is not None:
+            self.stage = stage
+
+    def status(self) -> Dict[str, Any]:
+        def iso(timestamp: Optional[float]) -> Optional[str]:
+            return None if timestamp is None else datetime.utcfromtimestamp(timestamp).isoformat()
+
+        return {
+            "job_id": self.job_id,
+            "operation": self.operation,
+            "state": self.state,
+            "priority": self.priority,
+            "progress": round(self.progress, 4),
+            "stage": self.stage,
+            "submitted_at": iso(self.submitted_at),
+            "started_at": iso(self.started_at),
+            "finished_at": iso(self.finished_at),
+            "error": self.error
+        }
+
+
+class JobQueue:
+    """Bounded priority queue of jobs drained by `workers` concurrent worker tasks"""
+
+    def __init__(self, workers: int = 1, max_queue: int = 64, result_ttl_seconds: float = 3600.0, max_results: int = 256):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_results = max_results
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # job id -> finished_at, oldest first
+        self._heap: List[tuple] = []
+        self._sequence = 0
+        self._queued = 0
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._worker_tasks: List["asyncio.Task"] = []
+        self.submitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.counts = dict.fromkeys(FINISHED_STATES, 0)
+
+    def start(self) -> None:
+        # A fresh condition per start, so it belongs to the running loop
+        self._wakeup = asyncio.Condition()
+        self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        for job in self._jobs.values():
+            if job._task is not None:
+                job._task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, operation: str, run: Callable[[Job], Awaitable[Any]], priority: int = 0) -> Job:
+        """Queue a job or raise a 429 when the queue is full"""
+        self._expire()
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Job queue is full, retry later",
+                headers={"Retry-After": "5"}
+            )
+
+        job = Job(operation, run, priority)
+        self._jobs[job.job_id] = job
+        self._sequence += 1
+        heapq.heappush(self._heap, (-priority, self._sequence, job))
+        self._queued += 1
+        self.submitted += 1
+        wakeup = self._condition()
+        async with wakeup:
+            wakeup.notify()
+        return job
+
+    def _condition(self) -> asyncio.Condition:
+        # Created on first use from the running loop when start() has not run yet
+        if self._wakeup is None:
+            self._wakeup = asyncio.Condition()
+        return self._wakeup
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        """Jobs ahead of a queued job, in the order workers will take them"""
+        if job.state != "queued":
+            return None
+        ahead = sorted(entry for entry in self._heap if entry[2].state == "queued")
+        return next(i for i, entry in enumerate(ahead) if entry[2] is job)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job._cancel_requested = True
+        if job.state == "queued":
+            self._queued -= 1
+            self._finish(job, "cancelled")
+        elif job._task is not None:
+            job._task.cancel()
+        return job
+
+    def discard(self, job_id: str) -> bool:
+        """Forget a finished job and its result"""
+        job = self._jobs.get(job_id)
+        if job is None or not job.finished:
+            return False
+        del self._jobs[job_id]
+        self._finished.pop(job_id, None)
+        return True
+
+    async def _worker(self) -> None:
+        wakeup = self._condition()
+        while True:
+            async with wakeup:
+                await wakeup.wait_for(lambda: bool(self._heap))
+                _, _, job = heapq.heappop(self._heap)
+            if job.state != "queued":
+                continue  # cancelled while waiting
+            self._queued -= 1
+            await self._execute(job)
+
+    async def _execute(self, job: Job) -> None:
+        job.state = "running"
+        job.started_at = time.time()
+        job._task = asyncio.ensure_future(job._run(job))
+        try:
+            job.result = await job._task
+        except asyncio.CancelledError:
+            if not job._cancel_requested:
+                self._finish(job, "cancelled")
+                raise  # the worker itself is being stopped
+            self._finish(job, "cancelled")
+        except HTTPException as e:
+            job.error = {"status_code": e.status_code, "detail": e.detail}
+            self._finish(job, "failed")
+        except Exception as e:
+            job.error = {"status_code": 500, "detail": f"{job.operation} failed: {str(e)}"}
+            self._finish(job, "failed")
+        else:
+            job.report(1.0)
+            self._finish(job, "succeeded")
+        finally:
+            job._task = None
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished_at = time.time()
+        self.counts[state] += 1
+        self._finished[job.job_id] = job.finished_at
+        self._expire()
+
+    def _expire(self) -> None:
+        """Drop finished jobs past their TTL, then the oldest beyond max_results"""
+        cutoff = time.time() - self.result_ttl_seconds
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff and len(self._finished) <= self.max_results:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+            self.expired += 1
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        self._expire()
+        return [job.status() for job in self._jobs.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        self._expire()
+        states = dict.fromkeys(JOB_STATES, 0)
+        for job in self._jobs.values():
+            states[job.state] += 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "result_ttl_seconds": self.result_ttl_seconds,
+            "max_results": self.max_results,
+            "by_state": states,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "finished": dict(self.counts)
+        }
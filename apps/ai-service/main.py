@@ -1,13 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional, Dict, Any, Sequence, Tuple, Type, Union
 import numpy as np
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime
 import json
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
+import math
+import os
+from cache import RouteCache
+from coalesce import OUTCOMES, RequestCoalescer
+from executor import BoundedExecutor
+from geo import distance_matrix, haversine_km, lookup_factors
+from jobs import JOB_STATES, Job, JobQueue
+from serialization import encoded_response, is_columnar, negotiate
+from metrics import MODEL_QUALITY, QUEUE_WAIT_SECONDS, REGISTRY, REQUEST_SECONDS, REQUEST_STAGE_SECONDS, STAGE_SECONDS, Gauge, MetricsMiddleware, StageTimer, instrumented
+from warmup import SubsystemRegistry
 import warnings
+
+# Model subsystems are imported where they are used so startup only pays for
+# the web stack; see LogisticsAI.subsystems
+if TYPE_CHECKING:
+    from anomaly_stream import AnomalySpool
+    from history_store import HistoryStore
+    from intervals import IntervalOptions
+    from model_registry import ForecastModelRegistry
+    from road_graph import PathTable, RoadGraph, RoadRoute, RoadRouter
+    from rolling_baselines import RollingBaselineStore
+    from spatial_index import HubIndex
 warnings.filterwarnings('ignore')
 
 app = FastAPI(
@@ -25,6 +47,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-endpoint latency, size and status metrics, exported at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Pydantic models
 class Location(BaseModel):
     latitude: float
@@ -50,12 +75,42 @@ class RouteResponse(BaseModel):
     estimated_cost: float
     co2_footprint: float
     route_polyline: List[Dict[str, float]]
+    stop_order: List[int] = []  # visiting order as indices into the requested waypoints
+    leg_distances: List[float] = []
+    created_at: datetime
+
+class BatchRouteRequest(BaseModel):
+    origins: List[Location]
+    destinations: List[Location]
+    vehicle_type: str = "truck"
+    optimize_for: str = "time"  # time, cost, emissions
+
+class BatchRouteResponse(BaseModel):
+    batch_id: str
+    vehicle_type: str
+    optimize_for: str
+    total_routes: int
+    route_ids: List[str]
+    total_distance: List[float]
+    total_time: List[float]
+    estimated_cost: List[float]
+    co2_footprint: List[float]
+    route_polylines: List[List[Dict[str, float]]]
     created_at: datetime
 
 class ForecastRequest(BaseModel):
-    historical_data: List[Dict[str, Any]]
+    historical_data: List[Dict[str, Any]] = []
     forecast_horizon: int = 30  # days
     product_category: Optional[str] = None
+    # Alternative to historical_data: a series in the history store and an inclusive date range
+    series_id: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    # Prediction intervals: analytic (OLS, t-distribution) or bootstrap (resampled residuals)
+    confidence_level: float = 0.8
+    interval_method: str = "analytic"
+    resamples: int = 1000  # bootstrap replicates
+    seed: Optional[int] = None  # fixes the bootstrap draws
 
 class ForecastResponse(BaseModel):
     forecast_id: str
@@ -64,9 +119,71 @@ class ForecastResponse(BaseModel):
     model_metrics: Dict[str, float]
     created_at: datetime
 
+class SeriesHistory(BaseModel):
+    series_id: str
+    historical_data: List[Dict[str, Any]]
+
+class BatchForecastRequest(BaseModel):
+    series: List[SeriesHistory] = []
+    # Columnar alternative: one entry per observation, tagged with its series id
+    series_ids: List[str] = []
+    dates: List[str] = []
+    volumes: List[float] = []
+    forecast_horizon: int = 30  # days
+    confidence_level: float = 0.8
+    interval_method: str = "analytic"  # analytic, bootstrap
+    resamples: int = 1000
+    seed: Optional[int] = None
+
+class SeriesForecast(BaseModel):
+    series_id: str
+    predicted_volume: List[float]
+    lower: List[float]
+    upper: List[float]
+    model_metrics: Dict[str, float]
+
+class BatchForecastResponse(BaseModel):
+    forecast_id: str
+    dates: List[str]
+    seasonal_factor: List[float]
+    trend_factor: List[float]
+    confidence_level: float  # coverage of every series' lower/upper bounds
+    forecasts: List[SeriesForecast]
+    skipped_series: List[str]  # fewer than 7 observations
+    created_at: datetime
+
+class ObservationAppendRequest(BaseModel):
+    observations: List[Dict[str, Any]]  # {date, volume}, oldest first
+
+class HistoryAppendRequest(BaseModel):
+    observations: List[Dict[str, Any]] = []  # {date, volume}
+    # Columnar alternative: parallel arrays
+    dates: List[str] = []
+    volumes: List[float] = []
+
+class HistorySeriesSummary(BaseModel):
+    series_id: str
+    observations: int
+    first_date: Optional[str]
+    last_date: Optional[str]
+
+class ForecastModelSummary(BaseModel):
+    series_id: str
+    observations: int
+    last_date: Optional[str]
+    model_metrics: Dict[str, float]
+
 class AnomalyDetectionRequest(BaseModel):
-    shipment_data: List[Dict[str, Any]]
+    shipment_data: List[Dict[str, Any]] = []
     threshold: float = 0.1  # 10% deviation threshold
+    group_by: List[str] = []  # carrier, lane, vehicle_type; day_of_week for a stored series
+    method: str = "zscore"  # zscore, robust (median/MAD)
+    z_threshold: float = 2.0
+    min_group_size: int = 5  # smaller groups use the overall baseline
+    # Alternative to shipment_data: score the daily volumes of a stored series over an inclusive date range
+    series_id: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
 
 class AnomalyDetectionResponse(BaseModel):
     anomalies: List[Dict[str, Any]]
@@ -74,6 +191,15 @@ class AnomalyDetectionResponse(BaseModel):
     anomaly_rate: float
     recommendations: List[str]
 
+class ShipmentEventRequest(BaseModel):
+    events: List[Dict[str, Any]]  # shipment-shaped events, oldest first
+    threshold: float = 0.1  # 10% deviation threshold
+    z_threshold: float = 2.0
+
+class ShipmentEventResponse(BaseModel):
+    processed: int
+    anomalies: List[Dict[str, Any]]
+
 class CO2EstimationRequest(BaseModel):
     route_distance: float
     vehicle_type: str
@@ -86,12 +212,80 @@ class CO2EstimationResponse(BaseModel):
     carbon_intensity: float
     recommendations: List[str]
 
+class BulkCO2Request(BaseModel):
+    # Columnar legs; vehicle_type, cargo_weight, fuel_type and country may hold a single value for all legs
+    route_distance: List[float]
+    vehicle_type: List[str]
+    cargo_weight: List[float] = []
+    fuel_type: List[str] = []
+    country: List[str] = []
+    include_legs: bool = True
+
+class JobSubmitRequest(BaseModel):
+    operation: str  # forecast_demand, forecast_demand_batch, detect_anomalies
+    payload: Dict[str, Any]  # the body the synchronous endpoint takes
+    priority: int = 0  # higher runs first
+    format: str = "records"  # records, columnar
+
+class Hub(BaseModel):
+    hub_id: str
+    location: Location
+    hub_type: str = "depot"  # depot, cross_dock
+
+class HubUpsertRequest(BaseModel):
+    hubs: List[Hub]
+
+class HubQueryRequest(BaseModel):
+    orders: List[Location] = []
+    # Columnar alternative: order coordinates as parallel arrays
+    latitudes: List[float] = []
+    longitudes: List[float] = []
+
+class HubAssignmentRequest(HubQueryRequest):
+    k: int = 1  # nearest hubs returned per order
+    max_distance_km: Optional[float] = None
+
+class HubAssignmentResponse(BaseModel):
+    total_orders: int
+    assigned_orders: int
+    hub_ids: List[Optional[str]]  # nearest hub per order, None when no hub is in range
+    distances_km: List[Optional[float]]
+    alternatives: List[List[str]] = []  # next nearest hubs per order when k > 1
+    alternative_distances_km: List[List[float]] = []
+    orders_per_hub: Dict[str, int]
+
+class HubRadiusRequest(HubQueryRequest):
+    radius_km: float
+    limit: Optional[int] = None  # nearest hubs kept per order
+
+class HubRadiusResponse(BaseModel):
+    total_orders: int
+    hub_ids: List[List[str]]  # per order, nearest first
+    distances_km: List[List[float]]
+
+class BulkCO2Response(BaseModel):
+    total_legs: int
+    total_distance: float
+    total_co2: float
+    estimated_co2: List[float]
+    fuel_consumption: List[float]
+    carbon_intensity: List[float]
+    by_vehicle: Dict[str, Dict[str, float]]
+    by_fuel: Dict[str, Dict[str, float]]
+
+def route_columns(route: RouteResponse) -> Dict[str, Any]:
+    """Columnar form of a RouteResponse: waypoints and polyline as parallel arrays"""
+    payload = route.model_dump(exclude={"waypoints", "route_polyline"})
+    payload["waypoints"] = {field: [getattr(w, field) for w in route.waypoints] for field in Location.model_fields}
+    payload["route_polyline"] = {
+        "lat": [point["lat"] for point in route.route_polyline],
+        "lng": [point["lng"] for point in route.route_polyline]
+    }
+    return payload
+
 # Enhanced AI algorithms
 class LogisticsAI:
     def __init__(self):
-        self.scaler = StandardScaler()
-        self.forecast_model = LinearRegression()
-        
         # EU-specific emission factors (kg CO2/km)
         self.emission_factors = {
             'truck': {
@@ -122,19 +316,198 @@ class LogisticsAI:
             'Austria': 1.03,
             'Switzerland': 0.95
         }
+        
+        # Hours and euros per km for each optimization preference
+        self.route_profiles = {
+            'time': (0.4, 3.0),  # faster, express pricing
+            'emissions': (0.6, 2.8),  # slower, eco-friendly
+            'cost': (0.5, 2.5)  # standard
+        }
+        
+        # Dense emission factor table (vehicle x fuel) for array lookups
+        self.vehicle_codes = {vehicle: i for i, vehicle in enumerate(self.emission_factors)}
+        self.fuel_codes = {'diesel': 0, 'electric': 1, 'hybrid': 2}
+        self.emission_matrix = np.full((len(self.vehicle_codes) + 1, len(self.fuel_codes) + 1), 0.15)
+        for vehicle, fuels in self.emission_factors.items():
+            for fuel, factor in fuels.items():
+                self.emission_matrix[self.vehicle_codes[vehicle], self.fuel_codes[fuel]] = factor
+        
+        # Payload capacity (kg) used for load-dependent emissions; unknown vehicles use the truck value
+        self.vehicle_capacity = {
+            'truck': 12000,
+            'van': 1200,
+            'trailer': 24000
+        }
+        self.capacity_array = np.array([self.vehicle_capacity[v] for v in self.vehicle_codes] + [self.vehicle_capacity['truck']], dtype=float)
+        
+        # Country factors as a dense array with the 1.0 default last
+        self.country_codes = {country: i for i, country in enumerate(self.country_factors)}
+        self.country_array = np.array(list(self.country_factors.values()) + [1.0])
+        
+        # Seconds of local search allowed when sequencing multi-stop routes
+        self.sequencing_time_budget = 0.05
+        
+        # Live anomaly events are grouped by these shipment fields
+        self.baseline_group_by = [f for f in os.getenv("BASELINE_GROUP_BY", "carrier,lane").split(",") if f]
+        
+        # Stateful model components load on first use or from the startup warm-up
+        self.subsystems = SubsystemRegistry()
+        self.subsystems.register("co2_estimation", self.load_co2_estimation)
+        self.subsystems.register("route_optimization", self.load_route_optimization)
+        self.subsystems.register("anomaly_detection", self.load_anomaly_detection)
+        self.subsystems.register("demand_forecasting", self.load_demand_forecasting)
+        self.subsystems.register("hub_assignment", self.load_hub_assignment)
+        self.subsystems.register("history_store", self.load_history_store)
+        self.subsystems.register("road_routing", self.load_road_routing)
     
-    def optimize_route(self, origin: Location, destination: Location, vehicle_type: str, optimize_for: str) -> RouteResponse:
-        """Enhanced route optimization with EU-specific considerations"""
-        # Calculate base distance (Haversine formula for more accuracy)
-        lat1, lon1 = np.radians(origin.latitude), np.radians(origin.longitude)
-        lat2, lon2 = np.radians(destination.latitude), np.radians(destination.longitude)
+    def load_co2_estimation(self) -> None:
+        """CO2 factor tables are built eagerly; this only warms the leg estimator"""
+        from emissions import estimate_legs, load_factor
+        estimate_legs(np.ones(1), self.emission_matrix[:1, 0], load_factor(np.zeros(1), self.capacity_array[:1]), self.country_array[:1])
+    
+    def load_route_optimization(self) -> RouteCache:
+        """Repeat lanes are served from an in-process LRU + TTL cache"""
+        from sequencing import sequence_stops
+        cache = RouteCache(
+            max_size=int(os.getenv("ROUTE_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("ROUTE_CACHE_TTL", "3600")),
+            precision=int(os.getenv("ROUTE_CACHE_PRECISION", "4"))
+        )
+        sequence_stops(distance_matrix([52.52, 50.11, 48.14, 48.86], [13.40, 8.68, 11.58, 2.35]), 0.0)
+        return cache
+    
+    def load_anomaly_detection(self) -> "RollingBaselineStore":
+        """Live per-group sliding-window baselines for event scoring"""
+        from anomaly import SCORED_METRICS, detect
+        from rolling_baselines import RollingBaselineStore
+        import anomaly_stream  # noqa: F401
+        shipment = {"estimatedDelivery": "2024-01-01T08:00:00Z", "actualDelivery": "2024-01-01T09:30:00Z", "route": {"estimatedCost": 120.0}}
+        detect([shipment, shipment], group_by=["carrier"], method="robust")
+        return RollingBaselineStore(
+            metrics=len(SCORED_METRICS),
+            capacity=int(os.getenv("BASELINE_WINDOW_SIZE", "500")),
+            max_age_seconds=float(os.getenv("BASELINE_WINDOW_SECONDS", "0")),
+            max_groups=int(os.getenv("BASELINE_MAX_GROUPS", "10000")),
+            min_samples=int(os.getenv("BASELINE_MIN_SAMPLES", "20"))
+        )
+    
+    def load_demand_forecasting(self) -> "ForecastModelRegistry":
+        """Incremental per-series forecast models, persisted across restarts"""
+        from forecasting import forecast_series, parse_dates
+        from model_registry import ForecastModelRegistry
+        registry = ForecastModelRegistry(
+            os.getenv("FORECAST_REGISTRY_PATH", "data/forecast_registry.npz"),
+            save_interval=float(os.getenv("FORECAST_REGISTRY_SAVE_INTERVAL", "1.0"))
+        )
+        registry.load()
+        dates = parse_dates([f"2024-01-{day:02d}" for day in range(1, 15)])
+        forecast_series(np.arange(14, dtype=float), dates, 7, dates[-1])
+        return registry
+    
+    def load_hub_assignment(self) -> "HubIndex":
+        """Depots and cross-dock hubs in a k-d tree, persisted across restarts"""
+        from spatial_index import HubIndex, build_part, part_nearest, unit_vectors
+        index = HubIndex(
+            os.getenv("HUB_INDEX_PATH", "data/hubs.npz"),
+            rebuild_after=int(os.getenv("HUB_INDEX_REBUILD_AFTER", "256"))
+        )
+        index.load()
+        lats, lngs = np.array([52.52, 50.11]), np.array([13.40, 8.68])
+        part_nearest(build_part(["a", "b"], lats, lngs), unit_vectors(lats, lngs), 1, np.inf)
+        return index
+    
+    def load_history_store(self) -> "HistoryStore":
+        """Daily demand series kept on disk so forecasts can reference them instead of resending them"""
+        from history_store import HistoryStore
+        store = HistoryStore(
+            os.getenv("HISTORY_STORE_PATH", "data/history"),
+            max_mapped=int(os.getenv("HISTORY_MAX_MAPPED", "1024"))
+        )
+        store.load()
+        return store
+    
+    def load_road_routing(self) -> Optional["RoadRouter"]:
+        """Road network shortest paths with hub-to-hub tables built on first use; None (great-circle routing) without a graph file"""
+        path = os.getenv("ROAD_GRAPH_PATH", "data/road_graph.npz")
+        if not os.path.exists(path):
+            return None
+        from road_graph import RoadGraph, RoadRouter
+        router = RoadRouter(
+            RoadGraph.load(path),
+            max_snap_km=float(os.getenv("ROAD_SNAP_MAX_KM", "25")),
+            max_table_cells=int(os.getenv("ROAD_TABLE_MAX_CELLS", "20000000"))
+        )
+        router.set_hubs(*self.hub_index.coordinates())
+        return router
+    
+    @property
+    def route_cache(self) -> RouteCache:
+        return self.subsystems.get("route_optimization")
+    
+    @property
+    def forecast_registry(self) -> "ForecastModelRegistry":
+        return self.subsystems.get("demand_forecasting")
+    
+    @property
+    def rolling_baselines(self) -> "RollingBaselineStore":
+        return self.subsystems.get("anomaly_detection")
+    
+    @property
+    def hub_index(self) -> "HubIndex":
+        return self.subsystems.get("hub_assignment")
+    
+    @property
+    def history_store(self) -> "HistoryStore":
+        return self.subsystems.get("history_store")
+    
+    @property
+    def road_router(self) -> Optional["RoadRouter"]:
+        return self.subsystems.get("road_routing")
+    
+    def emission_factor(self, vehicle_type: str, fuel_type: str) -> float:
+        """Look up the base emission factor, falling back to the truck/diesel default"""
+        vehicle = self.vehicle_codes.get(vehicle_type, len(self.vehicle_codes))
+        fuel = self.fuel_codes.get(fuel_type, len(self.fuel_codes))
+        return float(self.emission_matrix[vehicle, fuel])
+    
+    def optimize_route(self, origin: Location, destination: Location, vehicle_type: str, optimize_for: str, waypoints: Optional[List[Location]] = None) -> RouteResponse:
+        """Enhanced route optimization with EU-specific considerations, served from cache for repeat lanes"""
+        timer = StageTimer("optimize_route")
+        waypoints = waypoints or []
+        points = [(loc.latitude, loc.longitude) for loc in (origin, *waypoints, destination)]
+        key = self.route_cache.make_key(points, vehicle_type, optimize_for, self.country_factors.get(origin.country, 1.0))
         
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        cached = self.route_cache.get(key)
+        timer.lap("cache_lookup")
+        if cached is not None:
+            # Echo the caller's own locations, as only coordinates are part of the key. The route_id
+            # stays the lane's deterministic id, shared by every request for the same lane and options
+            update: Dict[str, Any] = {"origin": origin, "destination": destination, "created_at": datetime.utcnow()}
+            if waypoints:
+                update["waypoints"] = [waypoints[i] for i in cached.stop_order]
+            return cached.model_copy(update=update)
         
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        distance = 6371 * c  # Earth radius in km
+        route_id = self.route_cache.route_id_for(key)
+        if waypoints:
+            route = self.optimize_multi_stop_route(origin, destination, waypoints, vehicle_type, optimize_for, route_id)
+        else:
+            route = self.optimize_direct_route(origin, destination, vehicle_type, optimize_for, route_id)
+        timer.lap("solve")
+        
+        self.route_cache.put(key, route)
+        return route
+    
+    def optimize_direct_route(self, origin: Location, destination: Location, vehicle_type: str, optimize_for: str, route_id: str) -> RouteResponse:
+        """Shortest road route when a road graph is loaded, else a great-circle route with interpolated waypoints"""
+        router = self.road_router
+        if router is not None:
+            from road_graph import metric_for
+            road = router.route(origin.latitude, origin.longitude, destination.latitude, destination.longitude, metric_for(optimize_for))
+            if road is not None:
+                return self.road_route_response(router.graph, origin, destination, road, vehicle_type, optimize_for, route_id)
+        
+        # Calculate base distance (Haversine formula for more accuracy)
+        distance = float(haversine_km(origin.latitude, origin.longitude, destination.latitude, destination.longitude))
         
         # Apply EU-specific adjustments
         country_factor = self.country_factors.get(origin.country, 1.0)
@@ -156,17 +529,9 @@ class LogisticsAI:
                 waypoints.append(waypoint)
         
         # Calculate time and cost based on optimization preference
-        if optimize_for == "time":
-            # Prioritize speed over cost
-            total_time = distance * 0.4  # hours (faster)
-            estimated_cost = distance * 3.0  # euros per km (express)
-        elif optimize_for == "emissions":
-            # Prioritize eco-friendly routes
-            total_time = distance * 0.6  # hours (slower, more efficient)
-            estimated_cost = distance * 2.8  # euros per km (eco-friendly)
-        else:  # cost optimization
-            total_time = distance * 0.5  # hours (standard)
-            estimated_cost = distance * 2.5  # euros per km (standard)
+        hours_per_km, cost_per_km = self.route_profiles.get(optimize_for, self.route_profiles['cost'])
+        total_time = distance * hours_per_km
+        estimated_cost = distance * cost_per_km
         
         # Calculate CO2 footprint
         co2_footprint = self.calculate_co2_footprint(distance, vehicle_type, "diesel")
@@ -179,7 +544,7 @@ class LogisticsAI:
         ]
         
         return RouteResponse(
-            route_id=f"route_{np.random.randint(10000, 99999)}",
+            route_id=route_id,
             origin=origin,
             destination=destination,
             waypoints=waypoints,
@@ -191,199 +556,1053 @@ class LogisticsAI:
             created_at=datetime.utcnow()
         )
     
-    def forecast_demand(self, historical_data: List[Dict[str, Any]], horizon: int, product_category: Optional[str] = None) -> ForecastResponse:
+    def road_polyline(self, graph: "RoadGraph", nodes: np.ndarray) -> List[Dict[str, float]]:
+        return [{"lat": lat, "lng": lng} for lat, lng in zip(graph.lat[nodes].tolist(), graph.lng[nodes].tolist())]
+    
+    def road_waypoints(self, graph: "RoadGraph", nodes: np.ndarray, distance: float) -> List[Location]:
+        """Up to 3 road nodes spread along a path, one per 100 km like the great-circle waypoints"""
+        count = min(3, int(distance / 100), max(len(nodes) - 2, 0))
+        picks = nodes[(np.arange(1, count + 1) * (len(nodes) - 1)) // (count + 1)]
+        return [
+            Location(
+                latitude=float(graph.lat[node]),
+                longitude=float(graph.lng[node]),
+                address=f"Waypoint {i}",
+                city="Intermediate City",
+                country="EU"
+            )
+            for i, node in enumerate(picks.tolist(), start=1)
+        ]
+    
+    def road_route_response(self, graph: "RoadGraph", origin: Location, destination: Location, road: "RoadRoute", vehicle_type: str, optimize_for: str, route_id: str) -> RouteResponse:
+        """Route along road network edges; the stretches to and from the nearest road nodes are costed as straight lines"""
+        hours_per_km, cost_per_km = self.route_profiles.get(optimize_for, self.route_profiles['cost'])
+        # Road lengths are real distances, so no country detour factor
+        distance = road.length_km + road.access_km
+        total_time = road.time_h + road.access_km * hours_per_km
+        estimated_cost = distance * cost_per_km
+        co2_footprint = self.calculate_co2_footprint(road.emissions_km + road.access_km, vehicle_type, "diesel")
+        
+        route_polyline = [
+            {"lat": origin.latitude, "lng": origin.longitude},
+            *self.road_polyline(graph, road.nodes),
+            {"lat": destination.latitude, "lng": destination.longitude}
+        ]
+        
+        return RouteResponse(
+            route_id=route_id,
+            origin=origin,
+            destination=destination,
+            waypoints=self.road_waypoints(graph, road.nodes, distance),
+            total_distance=round(distance, 2),
+            total_time=round(total_time, 2),
+            estimated_cost=round(estimated_cost, 2),
+            co2_footprint=round(co2_footprint, 2),
+            route_polyline=route_polyline,
+            created_at=datetime.utcnow()
+        )
+    
+    def optimize_multi_stop_route(self, origin: Location, destination: Location, stops: List[Location], vehicle_type: str, optimize_for: str, route_id: str) -> RouteResponse:
+        """Sequence intermediate stops between origin and destination to minimise distance"""
+        from sequencing import sequence_stops
+        
+        locations = [origin, *stops, destination]
+        router = self.road_router
+        if router is not None:
+            from road_graph import metric_for
+            stop_table = router.stop_table([loc.latitude for loc in locations], [loc.longitude for loc in locations], metric_for(optimize_for))
+            if stop_table is not None:
+                return self.road_multi_stop_route(router.graph, locations, *stop_table, vehicle_type, optimize_for, route_id)
+        
+        dist = distance_matrix(
+            [loc.latitude for loc in locations],
+            [loc.longitude for loc in locations]
+        )
+        
+        order = sequence_stops(dist, self.sequencing_time_budget)
+        country_factor = self.country_factors.get(origin.country, 1.0)
+        legs = dist[order[:-1], order[1:]] * country_factor
+        distance = float(legs.sum())
+        
+        hours_per_km, cost_per_km = self.route_profiles.get(optimize_for, self.route_profiles['cost'])
+        total_time = distance * hours_per_km
+        estimated_cost = distance * cost_per_km
+        co2_footprint = self.calculate_co2_footprint(distance, vehicle_type, "diesel")
+        
+        ordered = [locations[i] for i in order.tolist()]
+        
+        return RouteResponse(
+            route_id=route_id,
+            origin=origin,
+            destination=destination,
+            waypoints=ordered[1:-1],
+            total_distance=round(distance, 2),
+            total_time=round(total_time, 2),
+            estimated_cost=round(estimated_cost, 2),
+            co2_footprint=round(co2_footprint, 2),
+            route_polyline=[{"lat": loc.latitude, "lng": loc.longitude} for loc in ordered],
+            stop_order=(order[1:-1] - 1).tolist(),
+            leg_distances=np.round(legs, 2).tolist(),
+            created_at=datetime.utcnow()
+        )
+    
+    def road_multi_stop_route(self, graph: "RoadGraph", locations: List[Location], table: "PathTable", access_km: np.ndarray, vehicle_type: str, optimize_for: str, route_id: str) -> RouteResponse:
+        """Stops sequenced on road-network costs between their nearest road nodes"""
+        from sequencing import sequence_stops
+        
+        # The solver's move deltas assume a symmetric matrix; one-way streets make the road costs slightly asymmetric
+        order = sequence_stops((table.cost + table.cost.T) / 2, self.sequencing_time_budget)
+        start, end = order[:-1], order[1:]
+        access = access_km[start] + access_km[end]
+        legs = table.length_km[start, end] + access
+        distance = float(legs.sum())
+        
+        hours_per_km, cost_per_km = self.route_profiles.get(optimize_for, self.route_profiles['cost'])
+        total_time = float((table.time_h[start, end] + access * hours_per_km).sum())
+        estimated_cost = distance * cost_per_km
+        co2_footprint = self.calculate_co2_footprint(float((table.emissions_km[start, end] + access).sum()), vehicle_type, "diesel")
+        
+        ordered = [locations[i] for i in order.tolist()]
+        route_polyline = []
+        for i, j, location in zip(start.tolist(), end.tolist(), ordered):
+            route_polyline.append({"lat": location.latitude, "lng": location.longitude})
+            leg = graph.table_route(table, i, j)
+            if leg is not None:
+                route_polyline.extend(self.road_polyline(graph, leg.nodes))
+        route_polyline.append({"lat": ordered[-1].latitude, "lng": ordered[-1].longitude})
+        
+        return RouteResponse(
+            route_id=route_id,
+            origin=locations[0],
+            destination=locations[-1],
+            waypoints=ordered[1:-1],
+            total_distance=round(distance, 2),
+            total_time=round(total_time, 2),
+            estimated_cost=round(estimated_cost, 2),
+            co2_footprint=round(co2_footprint, 2),
+            route_polyline=route_polyline,
+            stop_order=(order[1:-1] - 1).tolist(),
+            leg_distances=np.round(legs, 2).tolist(),
+            created_at=datetime.utcnow()
+        )
+    
+    def optimize_routes(self, origins: List[Location], destinations: List[Location], vehicle_type: str, optimize_for: str, columnar: bool = False) -> Union[BatchRouteResponse, Dict[str, Any]]:
+        """Batch route optimization computed in single vectorized passes over all O/D pairs"""
+        timer = StageTimer("optimize_routes")
+        if len(origins) != len(destinations):
+            raise HTTPException(status_code=400, detail="origins and destinations must have the same length")
+        
+        n = len(origins)
+        coords = np.array(
+            [(o.latitude, o.longitude, d.latitude, d.longitude) for o, d in zip(origins, destinations)],
+            dtype=float
+        ).reshape(n, 4)
+        origin_lat, origin_lng, dest_lat, dest_lng = coords.T
+        timer.lap("prepare")
+        
+        # Haversine distance with country factors applied through an array lookup
+        distance = haversine_km(origin_lat, origin_lng, dest_lat, dest_lng)
+        country_factor = lookup_factors([o.country for o in origins], self.country_factors, 1.0)
+        distance *= country_factor
+        
+        hours_per_km, cost_per_km = self.route_profiles.get(optimize_for, self.route_profiles['cost'])
+        total_time = distance * hours_per_km
+        emissions_distance = distance.copy()
+        
+        # Lanes the road network connects take road lengths, times and emissions weights
+        roads: List[Optional["RoadRoute"]] = [None] * n
+        router = self.road_router
+        graph = None if router is None else router.graph
+        if router is not None:
+            from road_graph import metric_for
+            metric = metric_for(optimize_for)
+            roads = [router.route(lat1, lng1, lat2, lng2, metric) for lat1, lng1, lat2, lng2 in coords.tolist()]
+            for i, road in enumerate(roads):
+                if road is not None:
+                    distance[i] = road.length_km + road.access_km
+                    total_time[i] = road.time_h + road.access_km * hours_per_km
+                    emissions_distance[i] = road.emissions_km + road.access_km
+            timer.lap("road_search")
+        estimated_cost = distance * cost_per_km
+        
+        # Same EU road adjustment as calculate_co2_footprint, rounded per leg
+        co2_footprint = np.round(emissions_distance * self.emission_factor(vehicle_type, "diesel") * 1.05, 2)
+        
+        # Up to 3 interpolated waypoints per great-circle route, one every 100 km
+        num_waypoints = np.where(distance > 100, np.minimum(3, (distance / 100).astype(int)), 0)
+        steps = np.arange(1, 4)
+        ratios = steps / (num_waypoints[:, None] + 1)
+        waypoint_lat = origin_lat[:, None] + (dest_lat - origin_lat)[:, None] * ratios
+        waypoint_lng = origin_lng[:, None] + (dest_lng - origin_lng)[:, None] * ratios
+        timer.lap("compute")
+        
+        # Same deterministic ids as the single-route endpoint for the same lane
+        route_ids = [
+            self.route_cache.route_id_for(self.route_cache.make_key(
+                [(o.latitude, o.longitude), (d.latitude, d.longitude)], vehicle_type, optimize_for, factor
+            ))
+            for o, d, factor in zip(origins, destinations, country_factor.tolist())
+        ]
+        
+        if columnar:
+            # Polylines flattened: route i spans points offsets[i] to offsets[i + 1]
+            valid = np.column_stack([np.ones(n, dtype=bool), steps <= num_waypoints[:, None], np.ones(n, dtype=bool)])
+            counts = num_waypoints + 2
+            polyline_lat = np.column_stack([origin_lat, waypoint_lat, dest_lat])[valid]
+            polyline_lng = np.column_stack([origin_lng, waypoint_lng, dest_lng])[valid]
+            if graph is not None and any(road is not None for road in roads):
+                # Road lanes run origin, road nodes, destination instead
+                split = np.cumsum(counts)[:-1]
+                lat_parts, lng_parts = np.split(polyline_lat, split), np.split(polyline_lng, split)
+                for i, road in enumerate(roads):
+                    if road is not None:
+                        lat_parts[i] = np.concatenate([origin_lat[i:i + 1], graph.lat[road.nodes], dest_lat[i:i + 1]])
+                        lng_parts[i] = np.concatenate([origin_lng[i:i + 1], graph.lng[road.nodes], dest_lng[i:i + 1]])
+                        counts[i] = len(road.nodes) + 2
+                polyline_lat, polyline_lng = np.concatenate(lat_parts), np.concatenate(lng_parts)
+            columns: Dict[str, Any] = {
+                "batch_id": f"batch_{np.random.randint(10000, 99999)}",
+                "vehicle_type": vehicle_type,
+                "optimize_for": optimize_for,
+                "total_routes": n,
+                "route_ids": route_ids,
+                "total_distance": np.round(distance, 2),
+                "total_time": np.round(total_time, 2),
+                "estimated_cost": np.round(estimated_cost, 2),
+                "co2_footprint": co2_footprint,
+                "route_polylines": {
+                    "offsets": np.concatenate([[0], np.cumsum(counts)]),
+                    "lat": polyline_lat,
+                    "lng": polyline_lng
+                },
+                "created_at": datetime.utcnow()
+            }
+            timer.lap("format")
+            return columns
+        
+        waypoint_lat_rows = waypoint_lat.tolist()
+        waypoint_lng_rows = waypoint_lng.tolist()
+        route_polylines = []
+        for i, count in enumerate(num_waypoints.tolist()):
+            polyline = [{"lat": origins[i].latitude, "lng": origins[i].longitude}]
+            road = roads[i]
+            if road is not None and graph is not None:
+                polyline.extend(self.road_polyline(graph, road.nodes))
+            else:
+                polyline.extend({"lat": lat, "lng": lng} for lat, lng in zip(waypoint_lat_rows[i][:count], waypoint_lng_rows[i][:count]))
+            polyline.append({"lat": destinations[i].latitude, "lng": destinations[i].longitude})
+            route_polylines.append(polyline)
+        
+        response = BatchRouteResponse(
+            batch_id=f"batch_{np.random.randint(10000, 99999)}",
+            vehicle_type=vehicle_type,
+            optimize_for=optimize_for,
+            total_routes=n,
+            route_ids=route_ids,
+            total_distance=np.round(distance, 2).tolist(),
+            total_time=np.round(total_time, 2).tolist(),
+            estimated_cost=np.round(estimated_cost, 2).tolist(),
+            co2_footprint=co2_footprint.tolist(),
+            route_polylines=route_polylines,
+            created_at=datetime.utcnow()
+        )
+        timer.lap("format")
+        return response
+    
+    def forecast_demand(self, historical_data: List[Dict[str, Any]], horizon: int, product_category: Optional[str] = None, columnar: bool = False, intervals: Optional["IntervalOptions"] = None) -> Union[ForecastResponse, Dict[str, Any]]:
         """Enhanced demand forecasting with seasonal decomposition and trend analysis"""
+        from forecasting import parse_dates
+        
+        timer = StageTimer("forecast_demand")
         if len(historical_data) < 7:
             raise HTTPException(status_code=400, detail="Insufficient historical data (minimum 7 days required)")
         
-        # Extract and prepare data
-        volumes = [item.get('volume', 100) for item in historical_data]
-        dates = [datetime.fromisoformat(item.get('date', datetime.utcnow().isoformat())) for item in historical_data]
-        
-        # Create features for ML model
-        X = []
-        y = []
-        
-        for i, (date, volume) in enumerate(zip(dates, volumes)):
-            features = [
-                i,  # day index
-                date.weekday(),  # day of week
-                date.month,  # month
-                date.day,  # day of month
-                volume  # previous volume (for trend)
-            ]
-            X.append(features[:-1])
-            y.append(features[-1])
-        
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
-        
-        # Train model
-        self.forecast_model.fit(X_scaled, y)
-        
-        # Generate predictions
-        predictions = []
-        confidence_intervals = []
-        base_volume = np.mean(volumes)
-        
-        for day in range(1, horizon + 1):
-            future_date = datetime.utcnow() + timedelta(days=day)
-            
-            # Create features for prediction
-            features = [
-                len(volumes) + day,
-                future_date.weekday(),
-                future_date.month,
-                future_date.day
-            ]
-            
-            # Make prediction
-            features_scaled = self.scaler.transform([features])
-            prediction = self.forecast_model.predict(features_scaled)[0]
-            
-            # Add seasonal and trend components
-            seasonal_factor = 1 + 0.1 * np.sin(2 * np.pi * day / 7)  # Weekly pattern
-            trend_factor = 1 + 0.005 * day  # Slight upward trend
-            
-            final_prediction = max(0, prediction * seasonal_factor * trend_factor)
-            
-            # Calculate confidence interval
-            confidence = base_volume * 0.2  # 20% confidence interval
-            
-            predictions.append({
-                "date": future_date.isoformat(),
-                "predicted_volume": round(final_prediction, 2),
-                "day_of_week": future_date.weekday(),
-                "month": future_date.month,
-                "seasonal_factor": round(seasonal_factor, 3),
-                "trend_factor": round(trend_factor, 3)
-            })
-            
-            confidence_intervals.append({
-                "lower": round(max(0, final_prediction - confidence), 2),
-                "upper": round(final_prediction + confidence, 2),
-                "confidence_level": 0.8
-            })
-        
-        # Calculate model metrics
-        y_pred = self.forecast_model.predict(X_scaled)
-        mae = np.mean(np.abs(np.array(y) - y_pred))
-        rmse = np.sqrt(np.mean((np.array(y) - y_pred) ** 2))
-        r2 = self.forecast_model.score(X_scaled, y)
+        # Extract and prepare data as arrays in one pass each
+        volumes = np.array([item.get('volume', 100) for item in historical_data], dtype=float)
+        default_date = datetime.utcnow().isoformat()
+        dates = parse_dates([item.get('date', default_date) for item in historical_data])
+        return self.forecast_history(dates, volumes, horizon, columnar, timer, intervals)
+    
+    def forecast_stored_series(self, series_id: str, start_date: Optional[str], end_date: Optional[str], horizon: int, columnar: bool = False, intervals: Optional["IntervalOptions"] = None) -> Union[ForecastResponse, Dict[str, Any]]:
+        """Demand forecast over a date range of a series in the history store"""
+        timer = StageTimer("forecast_demand")
+        dates, volumes = self.stored_history(series_id, start_date, end_date)
+        if len(volumes) < 7:
+            raise HTTPException(status_code=400, detail="Insufficient historical data (minimum 7 days required)")
+        timer.lap("read")
+        return self.forecast_history(dates, volumes.astype(float), horizon, columnar, timer, intervals)
+    
+    def stored_history(self, series_id: str, start_date: Optional[str], end_date: Optional[str]) -> tuple:
+        """Read-only (dates, volumes) views of a stored series between two ISO dates, both inclusive"""
+        try:
+            start = None if start_date is None else np.datetime64(start_date, 'D')
+            end = None if end_date is None else np.datetime64(end_date, 'D')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="start_date and end_date must be ISO dates (YYYY-MM-DD)")
+        try:
+            history = self.history_store.read(series_id, start, end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if history is None:
+            raise HTTPException(status_code=404, detail=f"No stored history for series '{series_id}'")
+        return history
+    
+    def forecast_history(self, dates: np.ndarray, volumes: np.ndarray, horizon: int, columnar: bool, timer: StageTimer, intervals: Optional["IntervalOptions"] = None) -> Union[ForecastResponse, Dict[str, Any]]:
+        """Fit and forecast one series given as date and volume arrays"""
+        from forecasting import LinearForecastModel, calendar_features, horizon_columns, regression_metrics
+        from intervals import IntervalOptions
+        
+        intervals = intervals or IntervalOptions()
+        X = calendar_features(dates, 0)
+        timer.lap("prepare")
+        
+        # Fit on the whole history and predict every horizon day at once;
+        # fitted state is local to this call so concurrent jobs never share it
+        model = LinearForecastModel().fit(X, volumes)
+        timer.lap("fit")
+        columns = horizon_columns(model, len(volumes), horizon, np.datetime64(datetime.utcnow(), 'us'), model.interval_basis(X, volumes), intervals)
+        metrics = regression_metrics(volumes, model.predict(X))
+        timer.lap("predict")
         
+        for name in ("mae", "rmse", "r2"):
+            MODEL_QUALITY.observe(metrics[name], "demand_forecasting", name)
+        model_metrics = {
+            "mae": round(metrics["mae"], 2),
+            "rmse": round(metrics["rmse"], 2),
+            "r2": round(metrics["r2"], 3),
+            "training_samples": len(volumes)
+        }
+        
+        response = self.forecast_response(columns, model_metrics, columnar, intervals.confidence_level)
+        timer.lap("format")
+        return response
+    
+    def forecast_response(self, columns: Dict[str, Any], model_metrics: Dict[str, float], columnar: bool = False, confidence_level: float = 0.8) -> Union[ForecastResponse, Dict[str, Any]]:
+        """Per-day records (validated) or one array per field (plain dict)"""
+        from forecasting import forecast_arrays, forecast_rows
+        
+        forecast_id = f"forecast_{np.random.randint(10000, 99999)}"
+        if columnar:
+            return {
+                "forecast_id": forecast_id,
+                **forecast_arrays(columns, confidence_level),
+                "model_metrics": model_metrics,
+                "created_at": datetime.utcnow()
+            }
+        predictions, confidence_intervals = forecast_rows(columns, confidence_level)
         return ForecastResponse(
-            forecast_id=f"forecast_{np.random.randint(10000, 99999)}",
+            forecast_id=forecast_id,
             predictions=predictions,
             confidence_intervals=confidence_intervals,
-            model_metrics={
-                "mae": round(mae, 2),
-                "rmse": round(rmse, 2),
-                "r2": round(r2, 3),
-                "training_samples": len(historical_data)
-            },
+            model_metrics=model_metrics,
+            created_at=datetime.utcnow()
+        )
+    
+    def forecast_demand_batch(self, series_ids: List[str], dates: List[str], volumes: List[float], horizon: int, now: Optional[datetime] = None, intervals: Optional["IntervalOptions"] = None) -> BatchForecastResponse:
+        """Forecast many series in one pass using batched normal equations"""
+        from forecasting import forecast_many, parse_dates
+        from intervals import IntervalOptions
+        
+        timer = StageTimer("forecast_demand_batch")
+        intervals = intervals or IntervalOptions()
+        if not (len(series_ids) == len(dates) == len(volumes)):
+            raise HTTPException(status_code=400, detail="series_ids, dates and volumes must have the same length")
+        now = now or datetime.utcnow()
+        
+        # Series codes in order of first appearance
+        names, first_index, inverse = np.unique(np.asarray(series_ids, dtype=str), return_index=True, return_inverse=True)
+        rank = np.empty(len(names), dtype=np.intp)
+        rank[np.argsort(first_index)] = np.arange(len(names))
+        names = names[np.argsort(first_index)]
+        codes = rank[inverse.reshape(-1)]
+        
+        # Series with too little history are reported back instead of failing the batch
+        counts = np.bincount(codes, minlength=len(names))
+        eligible = counts >= 7
+        keep = eligible[codes]
+        remap = np.cumsum(eligible) - 1
+        
+        parsed = parse_dates(list(dates))
+        timer.lap("prepare")
+        result = forecast_many(
+            remap[codes[keep]],
+            int(eligible.sum()),
+            parsed[keep],
+            np.asarray(volumes, dtype=float)[keep],
+            horizon,
+            np.datetime64(now, 'us'),
+            intervals
+        )
+        timer.lap("fit_predict")
+        
+        predicted = np.round(result["predicted_volume"], 2).tolist()
+        lower = np.round(result["lower"], 2).tolist()
+        upper = np.round(result["upper"], 2).tolist()
+        mae = np.round(result["mae"], 2).tolist()
+        rmse = np.round(result["rmse"], 2).tolist()
+        r2 = np.round(result["r2"], 3).tolist()
+        counts_kept = result["counts"].tolist()
+        
+        forecasts = [
+            SeriesForecast(
+                series_id=series_id,
+                predicted_volume=predicted[i],
+                lower=lower[i],
+                upper=upper[i],
+                model_metrics={"mae": mae[i], "rmse": rmse[i], "r2": r2[i], "training_samples": counts_kept[i]}
+            )
+            for i, series_id in enumerate(names[eligible].tolist())
+        ]
+        
+        response = BatchForecastResponse(
+            forecast_id=f"forecast_{np.random.randint(10000, 99999)}",
+            dates=np.datetime_as_string(result["dates"], unit="us").tolist(),
+            seasonal_factor=np.round(result["seasonal_factor"], 3).tolist(),
+            trend_factor=np.round(result["trend_factor"], 3).tolist(),
+            confidence_level=intervals.confidence_level,
+            forecasts=forecasts,
+            skipped_series=names[~eligible].tolist(),
             created_at=datetime.utcnow()
         )
+        timer.lap("format")
+        return response
+    
+    def append_observations(self, series_id: str, observations: List[Dict[str, Any]]) -> ForecastModelSummary:
+        """Fold new observations into a stored model without refitting the history"""
+        from forecasting import parse_dates
+        
+        if not observations:
+            raise HTTPException(status_code=400, detail="No observations provided")
+        
+        timer = StageTimer("append_observations")
+        volumes = np.array([item.get('volume', 100) for item in observations], dtype=float)
+        default_date = datetime.utcnow().isoformat()
+        try:
+            dates = parse_dates([item.get('date', default_date) for item in observations])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid observation date: {str(e)}")
+        timer.lap("prepare")
+        
+        moments = self.forecast_registry.append(series_id, dates, volumes)
+        timer.lap("update")
+        self.forecast_registry.save_soon()
+        timer.lap("persist")
+        return self.model_summary(series_id, moments)
+    
+    def append_history(self, series_id: str, request: HistoryAppendRequest) -> HistorySeriesSummary:
+        """Store observations of a series once so later forecasts can reference it"""
+        from forecasting import parse_dates
+        
+        timer = StageTimer("append_history")
+        dates = list(request.dates)
+        volumes = list(request.volumes)
+        if len(dates) != len(volumes):
+            raise HTTPException(status_code=400, detail="dates and volumes must have the same length")
+        default_date = datetime.utcnow().isoformat()
+        for item in request.observations:
+            dates.append(item.get('date', default_date))
+            volumes.append(item.get('volume', 100))
+        if not dates:
+            raise HTTPException(status_code=400, detail="No observations provided")
+        
+        try:
+            parsed = parse_dates(dates)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid observation date: {str(e)}")
+        timer.lap("prepare")
+        try:
+            summary = self.history_store.append(series_id, parsed, np.asarray(volumes, dtype=float))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        timer.lap("persist")
+        return HistorySeriesSummary(**summary)
+    
+    def model_summary(self, series_id: str, moments) -> ForecastModelSummary:
+        metrics = moments.metrics(moments.model()) if moments.n >= 2 else {}
+        return ForecastModelSummary(
+            series_id=series_id,
+            observations=moments.n,
+            last_date=None if moments.last_date is None else str(moments.last_date),
+            model_metrics={name: round(value, 3) for name, value in metrics.items()}
+        )
+    
+    def forecast_from_model(self, series_id: str, horizon: int, columnar: bool = False, intervals: Optional["IntervalOptions"] = None) -> Union[ForecastResponse, Dict[str, Any]]:
+        """Forecast from the stored sufficient statistics of a series"""
+        from forecasting import horizon_columns
+        from intervals import IntervalOptions
+        
+        intervals = intervals or IntervalOptions()
+        moments = self.forecast_registry.get(series_id)
+        if moments is None:
+            raise HTTPException(status_code=404, detail=f"No stored model for series '{series_id}'")
+        if moments.n < 7:
+            raise HTTPException(status_code=400, detail="Insufficient historical data (minimum 7 days required)")
+        
+        timer = StageTimer("forecast_from_model")
+        model = moments.model()
+        timer.lap("solve")
+        try:
+            columns = horizon_columns(model, moments.n, horizon, np.datetime64(datetime.utcnow(), 'us'), moments.interval_basis(model), intervals)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        timer.lap("predict")
+        metrics = moments.metrics(model)
+        model_metrics = {
+            "rmse": round(metrics["rmse"], 2),
+            "r2": round(metrics["r2"], 3),
+            "training_samples": moments.n
+        }
+        
+        response = self.forecast_response(columns, model_metrics, columnar, intervals.confidence_level)
+        timer.lap("format")
+        return response
     
-    def detect_anomalies(self, shipment_data: List[Dict[str, Any]], threshold: float) -> AnomalyDetectionResponse:
-        """Detect anomalies in shipment data using statistical methods"""
+    def detect_anomalies(self, shipment_data: List[Dict[str, Any]], threshold: float, group_by: Optional[List[str]] = None, method: str = "zscore", z_threshold: float = 2.0, min_group_size: int = 5, columnar: bool = False) -> Union[AnomalyDetectionResponse, Dict[str, Any]]:
+        """Detect anomalies against per-group baselines using a columnar statistical engine"""
+        from anomaly import detect, detect_columns
+        
         if not shipment_data:
             raise HTTPException(status_code=400, detail="No shipment data provided")
         
-        # Extract relevant metrics
-        delivery_times = []
-        costs = []
-        distances = []
-        
-        for shipment in shipment_data:
-            if 'estimatedDelivery' in shipment and 'actualDelivery' in shipment:
-                try:
-                    est_delivery = datetime.fromisoformat(shipment['estimatedDelivery'])
-                    act_delivery = datetime.fromisoformat(shipment['actualDelivery'])
-                    delivery_time = (act_delivery - est_delivery).total_seconds() / 3600  # hours
-                    delivery_times.append(delivery_time)
-                except:
-                    pass
-            
-            if 'route' in shipment and 'estimatedCost' in shipment['route']:
-                costs.append(shipment['route']['estimatedCost'])
-            
-            if 'route' in shipment and 'totalDistance' in shipment['route']:
-                distances.append(shipment['route']['totalDistance'])
+        timer = StageTimer("detect_anomalies")
+        options: Dict[str, Any] = {
+            "threshold": threshold,
+            "group_by": group_by or [],
+            "method": method,
+            "z_threshold": z_threshold,
+            "min_group_size": min_group_size
+        }
+        try:
+            if columnar:
+                columns, flagged_shipments = detect_columns(shipment_data, **options)
+            else:
+                anomalies, flagged_shipments = detect(shipment_data, **options)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        timer.lap("score")
         
-        anomalies = []
-        recommendations = []
+        anomaly_rate = flagged_shipments / len(shipment_data)
+        MODEL_QUALITY.observe(anomaly_rate, "anomaly_detection", "anomaly_rate")
         
-        # Analyze delivery time anomalies
-        if delivery_times:
-            mean_delivery = np.mean(delivery_times)
-            std_delivery = np.std(delivery_times)
-            
-            for i, delivery_time in enumerate(delivery_times):
-                z_score = abs((delivery_time - mean_delivery) / std_delivery) if std_delivery > 0 else 0
-                if z_score > 2:  # More than 2 standard deviations
-                    anomalies.append({
-                        "type": "delivery_delay",
-                        "shipment_index": i,
-                        "metric": "delivery_time",
-                        "value": delivery_time,
-                        "expected_range": f"{mean_delivery - 2*std_delivery:.1f} to {mean_delivery + 2*std_delivery:.1f}",
-                        "severity": "high" if z_score > 3 else "medium"
-                    })
-        
-        # Analyze cost anomalies
-        if costs:
-            mean_cost = np.mean(costs)
-            std_cost = np.std(costs)
-            
-            for i, cost in enumerate(costs):
-                z_score = abs((cost - mean_cost) / std_cost) if std_cost > 0 else 0
-                if z_score > 2:
-                    anomalies.append({
-                        "type": "cost_deviation",
-                        "shipment_index": i,
-                        "metric": "cost",
-                        "value": cost,
-                        "expected_range": f"{mean_cost - 2*std_cost:.2f} to {mean_cost + 2*std_cost:.2f}",
-                        "severity": "high" if z_score > 3 else "medium"
-                    })
+        if columnar:
+            for name in ("expected_low", "expected_high", "z_score"):
+                columns[name] = np.round(columns[name], 2)
+            payload: Dict[str, Any] = {
+                "anomalies": columns,
+                "total_shipments": len(shipment_data),
+                "anomaly_rate": round(anomaly_rate, 3),
+                "recommendations": self.anomaly_recommendations(set(columns["type"].tolist()))
+            }
+            timer.lap("format")
+            return payload
         
         # Generate recommendations
-        if anomalies:
-            if any(a['type'] == 'delivery_delay' for a in anomalies):
-                recommendations.append("Review carrier performance and consider alternative routes for delayed shipments")
-            if any(a['type'] == 'cost_deviation' for a in anomalies):
-                recommendations.append("Analyze cost drivers and negotiate better rates with carriers")
-            recommendations.append("Implement real-time monitoring to detect issues earlier")
-        else:
-            recommendations.append("All shipments are within normal parameters")
+        recommendations = self.anomaly_recommendations({a['type'] for a in anomalies})
         
-        anomaly_rate = len(anomalies) / len(shipment_data)
-        
-        return AnomalyDetectionResponse(
+        response = AnomalyDetectionResponse(
             anomalies=anomalies,
             total_shipments=len(shipment_data),
             anomaly_rate=round(anomaly_rate, 3),
             recommendations=recommendations
         )
+        timer.lap("format")
+        return response
+    
+    def detect_series_anomalies(self, series_id: str, start_date: Optional[str], end_date: Optional[str], threshold: float, group_by: Optional[List[str]] = None, method: str = "zscore", z_threshold: float = 2.0, min_group_size: int = 5, columnar: bool = False) -> Union[AnomalyDetectionResponse, Dict[str, Any]]:
+        """Flag unusual days in a date range of a stored demand series"""
+        from anomaly import detect_series, detect_series_columns
+        
+        timer = StageTimer("detect_anomalies")
+        dates, volumes = self.stored_history(series_id, start_date, end_date)
+        if not len(volumes):
+            raise HTTPException(status_code=400, detail="No stored observations in the requested date range")
+        timer.lap("read")
+        options: Dict[str, Any] = {
+            "threshold": threshold,
+            "group_by": group_by or [],
+            "method": method,
+            "z_threshold": z_threshold,
+            "min_group_size": min_group_size
+        }
+        try:
+            if columnar:
+                columns, flagged_days = detect_series_columns(dates, volumes, **options)
+            else:
+                anomalies, flagged_days = detect_series(dates, volumes, **options)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        timer.lap("score")
+        
+        anomaly_rate = flagged_days / len(volumes)
+        MODEL_QUALITY.observe(anomaly_rate, "anomaly_detection", "anomaly_rate")
+        
+        # Each scored day counts as one "shipment" of the response
+        if columnar:
+            for name in ("value", "expected_low", "expected_high", "z_score"):
+                columns[name] = np.round(columns[name], 2)
+            payload: Dict[str, Any] = {
+                "anomalies": columns,
+                "total_shipments": len(volumes),
+                "anomaly_rate": round(anomaly_rate, 3),
+                "recommendations": self.anomaly_recommendations(set(columns["type"].tolist()))
+            }
+            timer.lap("format")
+            return payload
+        
+        response = AnomalyDetectionResponse(
+            anomalies=anomalies,
+            total_shipments=len(volumes),
+            anomaly_rate=round(anomaly_rate, 3),
+            recommendations=self.anomaly_recommendations({a['type'] for a in anomalies})
+        )
+        timer.lap("format")
+        return response
     
-    def calculate_co2_footprint(self, distance: float, vehicle_type: str, fuel_type: str) -> float:
+    def score_shipment_events(self, events: List[Dict[str, Any]], threshold: float, z_threshold: float) -> ShipmentEventResponse:
+        """Score live events against rolling per-group baselines in O(1) each"""
+        from anomaly import SCORED_METRICS, group_key, parse_timestamp, shipment_metrics
+        
+        timer = StageTimer("score_shipment_events")
+        anomalies = []
+        epoch = datetime(1970, 1, 1)
+        now = (datetime.utcnow() - epoch).total_seconds()
+        
+        for i, event in enumerate(events):
+            key = "|".join(group_key(event, field) for field in self.baseline_group_by)
+            stamp = parse_timestamp(event.get('timestamp', event.get('actualDelivery')))
+            timestamp = (stamp - epoch).total_seconds() if stamp is not None else now
+            values = shipment_metrics(event)
+            
+            scores = self.rolling_baselines.score(key, values, timestamp, z_threshold, threshold)
+            for (metric, anomaly_type, fmt), score, value in zip(SCORED_METRICS, scores, values):
+                if score is None or not score["anomalous"]:
+                    continue
+                low = score["mean"] - z_threshold * score["std"]
+                high = score["mean"] + z_threshold * score["std"]
+                anomalies.append({
+                    "type": anomaly_type,
+                    "event_index": i,
+                    "group": key,
+                    "metric": metric,
+                    "value": value,
+                    "expected_range": f"{fmt.format(low)} to {fmt.format(high)}",
+                    "z_score": round(score["z"], 2),
+                    "severity": "high" if score["z"] > z_threshold + 1 else "medium"
+                })
+        
+        timer.lap("score")
+        return ShipmentEventResponse(processed=len(events), anomalies=anomalies)
+    
+    def anomaly_recommendations(self, anomaly_types: set) -> List[str]:
+        """Recommendations for the kinds of anomalies that were found"""
+        recommendations = []
+        if anomaly_types:
+            if 'delivery_delay' in anomaly_types:
+                recommendations.append("Review carrier performance and consider alternative routes for delayed shipments")
+            if 'cost_deviation' in anomaly_types:
+                recommendations.append("Analyze cost drivers and negotiate better rates with carriers")
+            if 'volume_spike' in anomaly_types or 'volume_drop' in anomaly_types:
+                recommendations.append("Check stock levels and carrier capacity around days with unusual demand")
+            recommendations.append("Implement real-time monitoring to detect issues earlier")
+        else:
+            recommendations.append("All shipments are within normal parameters")
+        return recommendations
+    
+    def stream_anomaly_report(self, spool: "AnomalySpool", threshold: float = 0.1, z_threshold: float = 2.0, lines_per_chunk: int = 512):
+        """Yield NDJSON anomaly lines from an ingested spool, then a summary line"""
+        try:
+            anomaly_count = 0
+            anomaly_types = set()
+            buffer = []
+            for anomaly in spool.scan(threshold, z_threshold):
+                anomaly_count += 1
+                anomaly_types.add(anomaly['type'])
+                buffer.append(json.dumps(anomaly))
+                if len(buffer) >= lines_per_chunk:
+                    yield "\n".join(buffer) + "\n"
+                    buffer = []
+            
+            total = spool.total_shipments
+            buffer.append(json.dumps({
+                "type": "summary",
+                "total_shipments": total,
+                "anomaly_count": anomaly_count,
+                "anomaly_rate": round(spool.flagged_shipments / total, 3) if total else 0.0,
+                "recommendations": self.anomaly_recommendations(anomaly_types)
+            }))
+            yield "\n".join(buffer) + "\n"
+        finally:
+            spool.close()
+    
+    def cargo_factor(self, vehicle_type: str, cargo_weight: Optional[float]) -> float:
+        """Load-dependent emission multiplier; 1.0 when the cargo weight is unknown"""
+        if cargo_weight is None:
+            return 1.0
+        from emissions import load_factor
+        capacity = self.capacity_array[self.vehicle_codes.get(vehicle_type, len(self.vehicle_codes))]
+        return float(load_factor(cargo_weight, capacity))
+    
+    def calculate_co2_footprint(self, distance: float, vehicle_type: str, fuel_type: str, cargo_weight: Optional[float] = None) -> float:
         """Calculate CO2 footprint based on EU standards"""
-        base_emission = self.emission_factors.get(vehicle_type, {}).get(fuel_type, 0.15)
+        base_emission = self.emission_factor(vehicle_type, fuel_type)
         
         # Apply EU-specific adjustments
         # Consider cargo weight, road conditions, and country factors
-        cargo_factor = 1.0  # Could be enhanced with actual cargo weight
+        cargo_factor = self.cargo_factor(vehicle_type, cargo_weight)
         road_factor = 1.05  # EU roads are generally well-maintained
         
         total_emission = distance * base_emission * cargo_factor * road_factor
         
         return round(total_emission, 2)
 
+    def estimate_co2_bulk(self, route_distance: Union[Sequence[float], np.ndarray], vehicle_type: Sequence[str], cargo_weight: Optional[Union[Sequence[float], np.ndarray]] = None, fuel_type: Optional[Sequence[str]] = None, country: Optional[Sequence[str]] = None, include_legs: bool = True) -> BulkCO2Response:
+        """Estimate CO2 for many legs with dense factor tables and per-vehicle/fuel aggregates"""
+        from emissions import aggregate, column_or_default, encode, estimate_legs, load_factor
+        
+        timer = StageTimer("estimate_co2_bulk")
+        n = len(route_distance)
+        try:
+            vehicles = column_or_default(vehicle_type, n, "truck")
+            fuels = column_or_default(fuel_type, n, "diesel")
+            countries = column_or_default(country, n, "")
+            cargo_column = column_or_default(cargo_weight, n, np.nan)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        distance = np.asarray(route_distance, dtype=float)
+        if np.any(distance < 0):
+            raise HTTPException(status_code=400, detail="route_distance must not be negative")
+        
+        vehicle_codes, vehicle_labels, vehicle_inverse = encode(vehicles, self.vehicle_codes)
+        fuel_codes, fuel_labels, fuel_inverse = encode(fuels, self.fuel_codes)
+        country_codes, _, _ = encode(countries, self.country_codes)
+        timer.lap("prepare")
+        
+        # Unknown cargo weight keeps the reference (half-load) factor of 1.0
+        cargo = np.asarray(cargo_column, dtype=float)
+        load = np.where(np.isnan(cargo), 1.0, load_factor(np.nan_to_num(cargo), self.capacity_array[vehicle_codes]))
+        
+        legs = estimate_legs(
+            distance,
+            self.emission_matrix[vehicle_codes, fuel_codes],
+            load,
+            self.country_array[country_codes]
+        )
+        timer.lap("estimate")
+        
+        response = BulkCO2Response(
+            total_legs=n,
+            total_distance=round(float(distance.sum()), 2),
+            total_co2=round(float(legs["estimated_co2"].sum()), 2),
+            estimated_co2=np.round(legs["estimated_co2"], 2).tolist() if include_legs else [],
+            fuel_consumption=np.round(legs["fuel_consumption"], 2).tolist() if include_legs else [],
+            carbon_intensity=np.round(legs["carbon_intensity"], 3).tolist() if include_legs else [],
+            by_vehicle=aggregate(vehicle_inverse, vehicle_labels, legs["estimated_co2"], distance),
+            by_fuel=aggregate(fuel_inverse, fuel_labels, legs["estimated_co2"], distance)
+        )
+        timer.lap("format")
+        return response
+
+    def order_coordinates(self, request: HubQueryRequest) -> tuple:
+        """Order latitudes and longitudes from either the Location list or the parallel arrays"""
+        if len(request.latitudes) != len(request.longitudes):
+            raise HTTPException(status_code=400, detail="latitudes and longitudes must have the same length")
+        lats = np.array([o.latitude for o in request.orders] + list(request.latitudes), dtype=float)
+        lngs = np.array([o.longitude for o in request.orders] + list(request.longitudes), dtype=float)
+        if len(lats) == 0:
+            raise HTTPException(status_code=400, detail="No orders provided")
+        return lats, lngs
+    
+    def assign_hubs(self, request: HubAssignmentRequest) -> HubAssignmentResponse:
+        """Assign every order to its nearest hubs with one batched k-d tree query"""
+        if request.k < 1:
+            raise HTTPException(status_code=400, detail="k must be at least 1")
+        lats, lngs = self.order_coordinates(request)
+        
+        timer = StageTimer("assign_hubs")
+        hub_ids, distances = self.hub_index.nearest(lats, lngs, request.k, request.max_distance_km)
+        timer.lap("query")
+        
+        nearest = hub_ids[:, 0]
+        assigned = ~np.isnan(distances[:, 0])
+        assigned_ids, counts = np.unique(nearest[assigned].astype(str), return_counts=True)
+        if assigned.any():
+            MODEL_QUALITY.observe(float(distances[assigned, 0].mean()), "hub_assignment", "distance_km")
+        
+        rounded = np.round(distances, 3)
+        alternatives = []
+        alternative_distances = []
+        if request.k > 1:
+            found = ~np.isnan(distances[:, 1:])
+            alternatives = [row[mask].tolist() for row, mask in zip(hub_ids[:, 1:], found)]
+            alternative_distances = [row[mask].tolist() for row, mask in zip(rounded[:, 1:], found)]
+        
+        response = HubAssignmentResponse(
+            total_orders=len(lats),
+            assigned_orders=int(assigned.sum()),
+            hub_ids=nearest.tolist(),
+            distances_km=[None if d != d else d for d in rounded[:, 0].tolist()],
+            alternatives=alternatives,
+            alternative_distances_km=alternative_distances,
+            orders_per_hub=dict(zip(assigned_ids.tolist(), counts.tolist()))
+        )
+        timer.lap("format")
+        return response
+    
+    def hubs_within(self, request: HubRadiusRequest) -> HubRadiusResponse:
+        """Every hub within a radius of each order, nearest first"""
+        from spatial_index import group_offsets
+        if request.radius_km < 0:
+            raise HTTPException(status_code=400, detail="radius_km must not be negative")
+        lats, lngs = self.order_coordinates(request)
+        
+        timer = StageTimer("hubs_within")
+        hub_ids, distances, offsets = self.hub_index.within(lats, lngs, request.radius_km, request.limit)
+        timer.lap("query")
+        
+        response = HubRadiusResponse(
+            total_orders=len(lats),
+            hub_ids=group_offsets(hub_ids, offsets),
+            distances_km=group_offsets(np.round(distances, 3), offsets)
+        )
+        timer.lap("format")
+        return response
+
 # Initialize AI service
 ai_service = LogisticsAI()
 
+# Heavy model work runs in a bounded pool; cheap paths like CO2 stay inline
+model_executor = BoundedExecutor(
+    max_workers=int(os.getenv("AI_EXECUTOR_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("AI_EXECUTOR_QUEUE", "32")),
+    kind=os.getenv("AI_EXECUTOR_KIND", "thread"),
+    on_queue_wait=QUEUE_WAIT_SECONDS.observe
+)
+
+# Identical forecast and anomaly requests arriving together share one computation
+request_coalescer = RequestCoalescer(
+    ttl_seconds=float(os.getenv("COALESCE_TTL_SECONDS", "10")),
+    max_entries=int(os.getenv("COALESCE_MAX_ENTRIES", "256"))
+)
+
+# Module-level entry points so a process pool can pickle them
+def run_optimize_routes(origins: List[Location], destinations: List[Location], vehicle_type: str, optimize_for: str, columnar: bool = False) -> Union[BatchRouteResponse, Dict[str, Any]]:
+    return ai_service.optimize_routes(origins, destinations, vehicle_type, optimize_for, columnar)
+
+def run_forecast_demand(historical_data: List[Dict[str, Any]], horizon: int, product_category: Optional[str], columnar: bool = False, intervals: Optional["IntervalOptions"] = None) -> Union[ForecastResponse, Dict[str, Any]]:
+    return ai_service.forecast_demand(historical_data, horizon, product_category, columnar, intervals)
+
+def run_forecast_stored_series(series_id: str, start_date: Optional[str], end_date: Optional[str], horizon: int, columnar: bool = False, intervals: Optional["IntervalOptions"] = None) -> Union[ForecastResponse, Dict[str, Any]]:
+    return ai_service.forecast_stored_series(series_id, start_date, end_date, horizon, columnar, intervals)
+
+def interval_options(confidence_level: float, method: str, resamples: int = 1000, seed: Optional[int] = None) -> "IntervalOptions":
+    """Validated prediction-interval settings, or a 400"""
+    from intervals import IntervalOptions
+    try:
+        return IntervalOptions(confidence_level, method, resamples, seed).validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def request_intervals(request: Union[ForecastRequest, BatchForecastRequest]) -> "IntervalOptions":
+    return interval_options(request.confidence_level, request.interval_method, request.resamples, request.seed)
+
+def forecast_demand_call(request: ForecastRequest, columnar: bool) -> tuple:
+    """Executor entry point and arguments for a forecast sent by value or by stored-series reference"""
+    intervals = request_intervals(request)
+    if request.series_id is None:
+        return (run_forecast_demand, request.historical_data, request.forecast_horizon, request.product_category, columnar, intervals)
+    if request.historical_data:
+        raise HTTPException(status_code=400, detail="Send either historical_data or series_id, not both")
+    return (run_forecast_stored_series, request.series_id, request.start_date, request.end_date, request.forecast_horizon, columnar, intervals)
+
+def run_forecast_demand_batch(series_ids: List[str], dates: List[str], volumes: List[float], horizon: int, now: datetime, intervals: Optional["IntervalOptions"] = None) -> BatchForecastResponse:
+    return ai_service.forecast_demand_batch(series_ids, dates, volumes, horizon, now, intervals)
+
+# Large forecast batches are split by series and the shards run in parallel
+FORECAST_BATCH_SHARD_SIZE = int(os.getenv("FORECAST_BATCH_SHARD_SIZE", "1000"))
+
+def shard_forecast_batch(request: BatchForecastRequest, max_shards: int) -> List[tuple]:
+    """Flatten a batch request into columns and split it into per-series shards"""
+    series_ids = list(request.series_ids)
+    dates = list(request.dates)
+    volumes = list(request.volumes)
+    default_date = datetime.utcnow().isoformat()
+    for series in request.series:
+        for item in series.historical_data:
+            series_ids.append(series.series_id)
+            dates.append(item.get('date', default_date))
+            volumes.append(item.get('volume', 100))
+    
+    if not (len(series_ids) == len(dates) == len(volumes)):
+        raise HTTPException(status_code=400, detail="series_ids, dates and volumes must have the same length")
+    
+    _, codes = np.unique(np.asarray(series_ids, dtype=str), return_inverse=True)
+    num_series = int(codes.max()) + 1 if len(codes) else 0
+    num_shards = min(max_shards, math.ceil(num_series / FORECAST_BATCH_SHARD_SIZE))
+    if num_shards <= 1:
+        return [(series_ids, dates, volumes)]
+    
+    shard_of_row = codes.reshape(-1) % num_shards
+    columns = [np.asarray(series_ids, dtype=str), np.asarray(dates, dtype=str), np.asarray(volumes, dtype=float)]
+    return [tuple(column[shard_of_row == k] for column in columns) for k in range(num_shards)]
+
+async def gather_shards(coros: List[Awaitable[Any]]) -> List[Any]:
+    """Await shard coroutines in order, cancelling the rest as soon as one fails"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # Also covers the caller itself being cancelled while the shards run
+        for task in tasks:
+            task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    for task in done:
+        error = task.exception()
+        if error is not None:
+            raise error
+    return [task.result() for task in tasks]
+
+def merge_forecast_batches(results: List[BatchForecastResponse]) -> BatchForecastResponse:
+    merged = results[0]
+    for result in results[1:]:
+        merged.forecasts.extend(result.forecasts)
+        merged.skipped_series.extend(result.skipped_series)
+    return merged
+
+def run_estimate_co2_bulk(route_distance: List[float], vehicle_type: List[str], cargo_weight: List[float], fuel_type: List[str], country: List[str], include_legs: bool) -> BulkCO2Response:
+    return ai_service.estimate_co2_bulk(route_distance, vehicle_type, cargo_weight, fuel_type, country, include_legs)
+
+def run_estimate_co2_csv(text: str, include_legs: bool) -> BulkCO2Response:
+    from emissions import read_csv_columns
+    columns = read_csv_columns(text)
+    cargo_weight = [float(v) if v else np.nan for v in columns["cargo_weight"]] if "cargo_weight" in columns else None
+    return ai_service.estimate_co2_bulk(
+        np.array(columns["route_distance"], dtype=float),
+        columns["vehicle_type"],
+        cargo_weight,
+        columns.get("fuel_type"),
+        columns.get("country"),
+        include_legs
+    )
+
+def run_detect_anomalies(shipment_data: List[Dict[str, Any]], threshold: float, group_by: List[str], method: str, z_threshold: float, min_group_size: int, columnar: bool = False) -> Union[AnomalyDetectionResponse, Dict[str, Any]]:
+    return ai_service.detect_anomalies(shipment_data, threshold, group_by, method, z_threshold, min_group_size, columnar)
+
+def run_detect_series_anomalies(series_id: str, start_date: Optional[str], end_date: Optional[str], threshold: float, group_by: List[str], method: str, z_threshold: float, min_group_size: int, columnar: bool = False) -> Union[AnomalyDetectionResponse, Dict[str, Any]]:
+    return ai_service.detect_series_anomalies(series_id, start_date, end_date, threshold, group_by, method, z_threshold, min_group_size, columnar)
+
+def detect_anomalies_call(request: AnomalyDetectionRequest, columnar: bool) -> tuple:
+    """Executor entry point and arguments for shipments sent by value or a stored series by reference"""
+    options = (request.threshold, request.group_by, request.method, request.z_threshold, request.min_group_size, columnar)
+    if request.series_id is None:
+        return (run_detect_anomalies, request.shipment_data, *options)
+    if request.shipment_data:
+        raise HTTPException(status_code=400, detail="Send either shipment_data or series_id, not both")
+    return (run_detect_series_anomalies, request.series_id, request.start_date, request.end_date, *options)
+
+# Background jobs get their own workers so long analytics never hold the ones interactive requests use
+JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+job_executor = BoundedExecutor(
+    max_workers=JOB_WORKERS,
+    max_queue=0,
+    kind=os.getenv("AI_JOB_EXECUTOR_KIND", os.getenv("AI_EXECUTOR_KIND", "thread"))
+)
+job_queue = JobQueue(
+    workers=JOB_WORKERS,
+    max_queue=int(os.getenv("AI_JOB_QUEUE", "64")),
+    result_ttl_seconds=float(os.getenv("AI_JOB_RESULT_TTL", "3600")),
+    max_results=int(os.getenv("AI_JOB_MAX_RESULTS", "256"))
+)
+# Batch forecast jobs run their shards one after another to report progress between them
+JOB_FORECAST_SHARDS = int(os.getenv("AI_JOB_FORECAST_SHARDS", "64"))
+
+async def forecast_demand_job(job: Job, request: ForecastRequest, columnar: bool) -> Union[ForecastResponse, Dict[str, Any]]:
+    job.report(0.0, "forecast")
+    return await job_executor.run(*forecast_demand_call(request, columnar))
+
+async def forecast_demand_batch_job(job: Job, request: BatchForecastRequest, columnar: bool) -> BatchForecastResponse:
+    job.report(0.0, "shard")
+    now = datetime.utcnow()
+    intervals = request_intervals(request)
+    shards = await job_executor.run(shard_forecast_batch, request, JOB_FORECAST_SHARDS)
+    results = []
+    for i, shard in enumerate(shards):
+        job.report(i / len(shards), f"forecast shard {i + 1}/{len(shards)}")
+        results.append(await job_executor.run(run_forecast_demand_batch, *shard, request.forecast_horizon, now, intervals))
+    return merge_forecast_batches(results)
+
+async def detect_anomalies_job(job: Job, request: AnomalyDetectionRequest, columnar: bool) -> Union[AnomalyDetectionResponse, Dict[str, Any]]:
+    job.report(0.0, "detect")
+    return await job_executor.run(*detect_anomalies_call(request, columnar))
+
+# operation -> (request model, job coroutine)
+JOB_OPERATIONS: Dict[str, Tuple[Type[BaseModel], Callable[..., Awaitable[Any]]]] = {
+    "forecast_demand": (ForecastRequest, forecast_demand_job),
+    "forecast_demand_batch": (BatchForecastRequest, forecast_demand_batch_job),
+    "detect_anomalies": (AnomalyDetectionRequest, detect_anomalies_job)
+}
+
+def job_status(job: Job) -> Dict[str, Any]:
+    return {
+        **job.status(),
+        "queue_position": job_queue.position(job),
+        "links": {
+            "status": f"/api/jobs/{job.job_id}",
+            "result": f"/api/jobs/{job.job_id}/result"
+        }
+    }
+
+async def require_subsystem(name: str) -> None:
+    """Load a subsystem off the event loop if the warm-up has not finished it yet"""
+    subsystem = ai_service.subsystems[name]
+    if subsystem.ready:
+        return
+    try:
+        await run_in_threadpool(subsystem.get)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"{name} is unavailable: {str(e)}")
+
+async def history_revision(series_id: Optional[str]) -> Optional[tuple]:
+    """Identity of a referenced series' file, so memoized results never outlive an append to it"""
+    if series_id is None:
+        return None
+    await require_subsystem("history_store")
+    try:
+        return ai_service.history_store.stamp(series_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.on_event("startup")
+async def start_warmup():
+    # background: accept traffic at once and warm up in a thread (default)
+    # eager: finish warming before serving; lazy: load each subsystem on first use
+    mode = os.getenv("AI_WARMUP", "background")
+    if mode == "eager":
+        await run_in_threadpool(ai_service.subsystems.warm_up)
+    elif mode == "background":
+        app.state.warmup_task = asyncio.create_task(run_in_threadpool(ai_service.subsystems.warm_up))
+    else:
+        ai_service.subsystems.warmup_state = "disabled"
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await job_queue.stop()
+    job_executor.shutdown()
+    model_executor.shutdown()
+    # Appends batch their writes, so flush whatever is still pending
+    if ai_service.subsystems["demand_forecasting"].ready:
+        await run_in_threadpool(ai_service.forecast_registry.close)
+
 # API Endpoints
 @app.get("/")
+@instrumented
 async def root():
     return {
         "message": "🚀 Lodix AI Service",
@@ -392,79 +1611,334 @@ async def root():
         "timestamp": datetime.utcnow().isoformat(),
         "endpoints": {
             "route_optimization": "/api/optimize-route",
+            "batch_route_optimization": "/api/optimize-routes",
             "demand_forecasting": "/api/forecast-demand",
+            "batch_demand_forecasting": "/api/forecast-demand/batch",
+            "stored_forecast_models": "/api/forecast-models",
+            "demand_history": "/api/history",
             "anomaly_detection": "/api/detect-anomalies",
+            "streaming_anomaly_detection": "/api/detect-anomalies/stream",
+            "live_event_scoring": "/api/anomaly-baselines/events",
             "co2_estimation": "/api/estimate-co2",
-            "health": "/health"
+            "bulk_co2_estimation": "/api/estimate-co2/batch",
+            "hub_assignment": "/api/hubs/assign",
+            "road_graph": "/api/road-graph",
+            "background_jobs": "/api/jobs",
+            "health": "/health",
+            "readiness": "/health/ready",
+            "metrics": "/metrics"
         }
     }
 
-@app.get("/health")
-async def health_check():
+def readiness_report() -> Dict[str, Any]:
+    subsystems = ai_service.subsystems
+    models = subsystems.status()
+    failed = any(model["state"] == "failed" for model in models.values())
+    # Lazy mode never warms ahead of traffic: cold subsystems load on first use
+    ready = subsystems.ready or (subsystems.warmup_state == "disabled" and not failed)
+    if ready:
+        status = "healthy"
+    elif failed:
+        status = "degraded"
+    else:
+        status = "warming"
     return {
-        "status": "healthy",
+        "status": status,
+        "ready": ready,
         "service": "Lodix AI Service",
         "timestamp": datetime.utcnow().isoformat(),
-        "ai_models": {
-            "route_optimization": "active",
-            "demand_forecasting": "active",
-            "anomaly_detection": "active",
-            "co2_estimation": "active"
-        }
+        "warmup": {
+            "state": subsystems.warmup_state,
+            "seconds": None if subsystems.warmup_seconds is None else round(subsystems.warmup_seconds, 4)
+        },
+        "ai_models": models
     }
 
+@app.get("/health")
+@instrumented
+async def health_check():
+    """Liveness: the process serves requests; per-model readiness is reported, not enforced"""
+    return readiness_report()
+
+@app.get("/health/ready")
+@instrumented
+async def readiness_check():
+    """Readiness: 503 until every model subsystem has warmed up (lazy mode: until one fails)"""
+    report = readiness_report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 @app.post("/api/optimize-route", response_model=RouteResponse)
-async def optimize_route(request: RouteRequest):
+@instrumented
+async def optimize_route(request: RouteRequest, response_format: str = Query("records", alias="format"), accept: Optional[str] = Header(None)):
     """Optimize route between origin and destination with EU-specific considerations"""
+    columnar = is_columnar(response_format)
+    media_type = negotiate(accept)
+    await require_subsystem("route_optimization")
+    await require_subsystem("road_routing")
     try:
-        route = ai_service.optimize_route(
+        # Road searches can take tens of milliseconds on large networks
+        route = await run_in_threadpool(
+            ai_service.optimize_route,
             request.origin, 
             request.destination, 
             request.vehicle_type, 
-            request.optimize_for
+            request.optimize_for,
+            request.waypoints
         )
-        return route
+        return encoded_response(route_columns(route) if columnar else route, media_type)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Route optimization failed: {str(e)}")
 
+@app.post("/api/optimize-routes", response_model=BatchRouteResponse)
+@instrumented
+async def optimize_routes(request: BatchRouteRequest, response_format: str = Query("records", alias="format"), accept: Optional[str] = Header(None)):
+    """Optimize a batch of origin/destination pairs in one call"""
+    columnar = is_columnar(response_format)
+    media_type = negotiate(accept)
+    await require_subsystem("road_routing")
+    try:
+        routes = await model_executor.run(
+            run_optimize_routes,
+            request.origins,
+            request.destinations,
+            request.vehicle_type,
+            request.optimize_for,
+            columnar
+        )
+        return encoded_response(routes, media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch route optimization failed: {str(e)}")
+
 @app.post("/api/forecast-demand", response_model=ForecastResponse)
-async def forecast_demand(request: ForecastRequest):
+@instrumented
+async def forecast_demand(request: ForecastRequest, response_format: str = Query("records", alias="format"), accept: Optional[str] = Header(None)):
     """Generate enhanced demand forecast using ML models"""
+    columnar = is_columnar(response_format)
+    media_type = negotiate(accept)
     try:
-        forecast = ai_service.forecast_demand(
-            request.historical_data, 
-            request.forecast_horizon, 
-            request.product_category
+        call = forecast_demand_call(request, columnar)
+        revision = await history_revision(request.series_id)
+        forecast = await request_coalescer.run(
+            "forecast_demand",
+            {"request": request, "columnar": columnar, "history": revision},
+            lambda: model_executor.run(*call)
         )
-        return forecast
+        return encoded_response(forecast, media_type)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Demand forecasting failed: {str(e)}")
 
+@app.post("/api/forecast-demand/batch", response_model=BatchForecastResponse)
+@instrumented
+async def forecast_demand_batch(request: BatchForecastRequest, accept: Optional[str] = Header(None)):
+    """Forecast many product categories or lanes in a single request"""
+    media_type = negotiate(accept)
+    
+    async def forecast_shards() -> BatchForecastResponse:
+        now = datetime.utcnow()
+        intervals = request_intervals(request)
+        shards = await model_executor.run(shard_forecast_batch, request, model_executor.max_workers)
+        results = await gather_shards([
+            model_executor.run(run_forecast_demand_batch, *shard, request.forecast_horizon, now, intervals)
+            for shard in shards
+        ])
+        return merge_forecast_batches(results)
+    
+    try:
+        merged = await request_coalescer.run("forecast_demand_batch", request, forecast_shards)
+        return encoded_response(merged, media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch demand forecasting failed: {str(e)}")
+
+@app.get("/api/forecast-models")
+@instrumented
+async def list_forecast_models():
+    """List stored incremental forecast models"""
+    await require_subsystem("demand_forecasting")
+    return {"models": ai_service.forecast_registry.summary()}
+
+@app.post("/api/forecast-models/{series_id:path}/observations", response_model=ForecastModelSummary)
+@instrumented
+async def append_observations(series_id: str, request: ObservationAppendRequest):
+    """Append new observations to a stored forecast model"""
+    await require_subsystem("demand_forecasting")
+    try:
+        return await run_in_threadpool(ai_service.append_observations, series_id, request.observations)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Updating forecast model failed: {str(e)}")
+
+@app.get("/api/forecast-models/{series_id:path}/forecast", response_model=ForecastResponse)
+@instrumented
+async def forecast_from_model(series_id: str, horizon: int = Query(30, ge=1), confidence_level: float = Query(0.8), interval_method: str = Query("analytic"), response_format: str = Query("records", alias="format"), accept: Optional[str] = Header(None)):
+    """Forecast demand from a stored model without resending history.
+
+    Stored models keep moments, not observations, so only analytic intervals apply; bootstrap is a 400.
+    """
+    columnar = is_columnar(response_format)
+    media_type = negotiate(accept)
+    intervals = interval_options(confidence_level, interval_method)
+    await require_subsystem("demand_forecasting")
+    try:
+        return encoded_response(ai_service.forecast_from_model(series_id, horizon, columnar, intervals), media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Demand forecasting failed: {str(e)}")
+
+@app.delete("/api/forecast-models/{series_id:path}")
+@instrumented
+async def delete_forecast_model(series_id: str):
+    """Drop a stored forecast model"""
+    await require_subsystem("demand_forecasting")
+    if not ai_service.forecast_registry.delete(series_id):
+        raise HTTPException(status_code=404, detail=f"No stored model for series '{series_id}'")
+    await run_in_threadpool(ai_service.forecast_registry.save)
+    return {"deleted": series_id}
+
+@app.get("/api/history")
+@instrumented
+async def list_history():
+    """List series held in the history store"""
+    await require_subsystem("history_store")
+    return {"series": await run_in_threadpool(ai_service.history_store.summary)}
+
+@app.post("/api/history/{series_id:path}/observations", response_model=HistorySeriesSummary)
+@instrumented
+async def append_history(series_id: str, request: HistoryAppendRequest):
+    """Ingest or extend a daily demand series so forecasts can reference it by id"""
+    await require_subsystem("history_store")
+    try:
+        return await run_in_threadpool(ai_service.append_history, series_id, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Storing history failed: {str(e)}")
+
+@app.get("/api/history/{series_id:path}")
+@instrumented
+async def get_history(series_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None, response_format: str = Query("records", alias="format"), accept: Optional[str] = Header(None)):
+    """Read back a stored series, optionally between two dates (inclusive)"""
+    columnar = is_columnar(response_format)
+    media_type = negotiate(accept)
+    await require_subsystem("history_store")
+    dates, volumes = ai_service.stored_history(series_id, start_date, end_date)
+    day_strings = np.datetime_as_string(dates, unit="D")
+    # Kept as float32 so volumes print as stored rather than widened to float64
+    volumes = np.ascontiguousarray(volumes)
+    if columnar:
+        return encoded_response({"series_id": series_id, "dates": day_strings, "volumes": volumes}, media_type)
+    observations = [{"date": day, "volume": volume} for day, volume in zip(day_strings.tolist(), volumes)]
+    return encoded_response({"series_id": series_id, "observations": observations}, media_type)
+
+@app.delete("/api/history/{series_id:path}")
+@instrumented
+async def delete_history(series_id: str):
+    """Drop a stored series"""
+    await require_subsystem("history_store")
+    try:
+        deleted = ai_service.history_store.delete(series_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No stored history for series '{series_id}'")
+    return {"deleted": series_id}
+
 @app.post("/api/detect-anomalies", response_model=AnomalyDetectionResponse)
-async def detect_anomalies(request: AnomalyDetectionRequest):
-    """Detect anomalies in shipment data"""
+@instrumented
+async def detect_anomalies(request: AnomalyDetectionRequest, response_format: str = Query("records", alias="format"), accept: Optional[str] = Header(None)):
+    """Detect anomalies in shipment data or in a stored demand series"""
+    columnar = is_columnar(response_format)
+    media_type = negotiate(accept)
     try:
-        anomalies = ai_service.detect_anomalies(
-            request.shipment_data, 
-            request.threshold
+        call = detect_anomalies_call(request, columnar)
+        revision = await history_revision(request.series_id)
+        anomalies = await request_coalescer.run(
+            "detect_anomalies",
+            {"request": request, "columnar": columnar, "history": revision},
+            lambda: model_executor.run(*call)
         )
-        return anomalies
+        return encoded_response(anomalies, media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Anomaly detection failed: {str(e)}")
+
+@app.post("/api/detect-anomalies/stream")
+@instrumented
+async def detect_anomalies_stream(request: Request, threshold: float = Query(0.1), z_threshold: float = Query(2.0), method: str = Query("zscore")):
+    """Detect anomalies in an NDJSON (or chunked) upload of shipments with bounded memory"""
+    from anomaly_stream import AnomalySpool
+    if method != "zscore":
+        raise HTTPException(status_code=400, detail="Streaming detection supports method 'zscore' only; robust baselines need every value in memory")
+    spool = AnomalySpool()
+    try:
+        # Phase one: parse incrementally, off the event loop, chunk by chunk
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(spool.feed, chunk)
+        await run_in_threadpool(spool.finish)
+    except ValueError as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        spool.close()
         raise HTTPException(status_code=500, detail=f"Anomaly detection failed: {str(e)}")
+    
+    # Phase two: score against the final statistics and stream results out
+    return StreamingResponse(ai_service.stream_anomaly_report(spool, threshold, z_threshold), media_type="application/x-ndjson")
+
+@app.post("/api/anomaly-baselines/events", response_model=ShipmentEventResponse)
+@instrumented
+async def score_shipment_events(request: ShipmentEventRequest):
+    """Score live shipment events against rolling baselines and absorb them"""
+    await require_subsystem("anomaly_detection")
+    try:
+        return ai_service.score_shipment_events(request.events, request.threshold, request.z_threshold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Event scoring failed: {str(e)}")
+
+@app.get("/api/anomaly-baselines")
+@instrumented
+async def get_anomaly_baselines():
+    """Report rolling baseline window usage"""
+    await require_subsystem("anomaly_detection")
+    return {"group_by": ai_service.baseline_group_by, **ai_service.rolling_baselines.stats()}
+
+@app.delete("/api/anomaly-baselines")
+@instrumented
+async def reset_anomaly_baselines():
+    """Drop every rolling baseline window"""
+    await require_subsystem("anomaly_detection")
+    ai_service.rolling_baselines.reset()
+    return {"status": "reset"}
 
 @app.post("/api/estimate-co2", response_model=CO2EstimationResponse)
+@instrumented
 async def estimate_co2(request: CO2EstimationRequest):
     """Estimate CO2 emissions for logistics operations"""
+    await require_subsystem("co2_estimation")
     try:
         co2_footprint = ai_service.calculate_co2_footprint(
             request.route_distance, 
             request.vehicle_type, 
-            request.fuel_type
+            request.fuel_type,
+            request.cargo_weight
         )
         
         # Calculate additional metrics
-        fuel_consumption = request.route_distance * 0.3  # liters per km (approximate)
-        carbon_intensity = co2_footprint / request.route_distance  # kg CO2 per km
+        cargo_factor = ai_service.cargo_factor(request.vehicle_type, request.cargo_weight)
+        fuel_consumption = request.route_distance * 0.3 * cargo_factor  # liters per km (approximate)
+        carbon_intensity = co2_footprint / request.route_distance if request.route_distance > 0 else 0.0  # kg CO2 per km
+        MODEL_QUALITY.observe(carbon_intensity, "co2_estimation", "carbon_intensity")
         
         # Generate recommendations
         recommendations = []
@@ -483,54 +1957,329 @@ async def estimate_co2(request: CO2EstimationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"CO2 estimation failed: {str(e)}")
 
+@app.post("/api/estimate-co2/batch", response_model=BulkCO2Response)
+@instrumented
+async def estimate_co2_bulk(request: BulkCO2Request):
+    """Estimate CO2 emissions for many legs supplied as columns"""
+    try:
+        return await model_executor.run(
+            run_estimate_co2_bulk,
+            request.route_distance,
+            request.vehicle_type,
+            request.cargo_weight,
+            request.fuel_type,
+            request.country,
+            request.include_legs
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"CO2 estimation failed: {str(e)}")
+
+@app.post("/api/estimate-co2/batch/csv", response_model=BulkCO2Response)
+@instrumented
+async def estimate_co2_csv(request: Request, include_legs: bool = Query(True)):
+    """Estimate CO2 emissions for a CSV upload with a route_distance,vehicle_type[,cargo_weight,fuel_type,country] header"""
+    try:
+        text = (await request.body()).decode("utf-8")
+        return await model_executor.run(run_estimate_co2_csv, text, include_legs)
+    except HTTPException:
+        raise
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV upload: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"CO2 estimation failed: {str(e)}")
+
+# Endpoints and model operations that make up each subsystem, for status reporting
+MODEL_ENDPOINTS = {
+    "route_optimization": ("optimize_route", "optimize_routes"),
+    "demand_forecasting": ("forecast_demand", "forecast_demand_batch", "append_observations", "forecast_from_model", "append_history"),
+    "anomaly_detection": ("detect_anomalies", "detect_anomalies_stream", "score_shipment_events"),
+    "co2_estimation": ("estimate_co2", "estimate_co2_bulk", "estimate_co2_csv"),
+    "hub_assignment": ("assign_hubs", "hubs_within")
+}
+MODEL_OPERATIONS = {
+    "route_optimization": ("optimize_route", "optimize_routes"),
+    "demand_forecasting": ("forecast_demand", "forecast_demand_batch", "append_observations", "forecast_from_model", "append_history"),
+    "anomaly_detection": ("detect_anomalies", "score_shipment_events"),
+    "co2_estimation": ("estimate_co2_bulk",),
+    "hub_assignment": ("assign_hubs", "hubs_within")
+}
+MODEL_QUALITY_METRICS = {
+    "route_optimization": (),
+    "demand_forecasting": ("mae", "rmse", "r2"),
+    "anomaly_detection": ("anomaly_rate",),
+    "co2_estimation": ("carbon_intensity",),
+    "hub_assignment": ("distance_km",)
+}
+
+EXECUTOR_IN_FLIGHT = REGISTRY.register(Gauge("ai_executor_in_flight", "Model jobs running or waiting for a worker"))
+EXECUTOR_JOBS = REGISTRY.register(Gauge("ai_executor_jobs_total", "Model jobs by outcome", ("outcome",), metric_type="counter"))
+ROUTE_CACHE_ENTRIES = REGISTRY.register(Gauge("ai_route_cache_entries", "Routes held in the route cache"))
+ROUTE_CACHE_EVENTS = REGISTRY.register(Gauge("ai_route_cache_events_total", "Route cache lookups and removals by kind", ("event",), metric_type="counter"))
+COALESCED_REQUESTS = REGISTRY.register(Gauge("ai_coalesced_requests_total", "Coalesced model requests by operation and outcome (computed, coalesced, memo_hit)", ("operation", "outcome"), metric_type="counter"))
+COALESCE_SAVED_SECONDS = REGISTRY.register(Gauge("ai_coalesce_saved_seconds_total", "Compute time not spent thanks to coalescing and the memo", ("operation",), metric_type="counter"))
+COALESCE_MEMO_ENTRIES = REGISTRY.register(Gauge("ai_coalesce_memo_entries", "Results held in the request memo"))
+JOBS = REGISTRY.register(Gauge("ai_jobs", "Retained background jobs by state", ("state",)))
+JOBS_REJECTED = REGISTRY.register(Gauge("ai_jobs_rejected_total", "Background jobs refused because the queue was full", metric_type="counter"))
+HUB_INDEX_ENTRIES = REGISTRY.register(Gauge("ai_hub_index_entries", "Hubs in the spatial index by where they are held", ("state",)))
+HISTORY_STORE_SIZE = REGISTRY.register(Gauge("ai_history_store_size", "Series and daily observations held in the history store", ("kind",)))
+ROAD_ROUTES = REGISTRY.register(Gauge("ai_road_routes_total", "Road route lookups by outcome (table_hits, searches, off_network, unreachable)", ("outcome",), metric_type="counter"))
+SUBSYSTEM_READY = REGISTRY.register(Gauge("ai_subsystem_ready", "1 once a model subsystem has loaded", ("subsystem",)))
+
+def collect_runtime_metrics() -> None:
+    executor = model_executor.stats()
+    EXECUTOR_IN_FLIGHT.set(executor["in_flight"])
+    EXECUTOR_JOBS.set(executor["completed"], "completed")
+    EXECUTOR_JOBS.set(executor["failed"], "failed")
+    EXECUTOR_JOBS.set(executor["rejected"], "rejected")
+    jobs = job_queue.stats()
+    for state in JOB_STATES:
+        JOBS.set(jobs["by_state"][state], state)
+    JOBS_REJECTED.set(jobs["rejected"])
+    coalescing = request_coalescer.stats()
+    COALESCE_MEMO_ENTRIES.set(coalescing["memo_entries"])
+    for operation, counts in coalescing["operations"].items():
+        for outcome in OUTCOMES:
+            COALESCED_REQUESTS.set(counts[outcome], operation, outcome)
+        COALESCE_SAVED_SECONDS.set(counts["saved_seconds"], operation)
+    for name, model in ai_service.subsystems.status().items():
+        SUBSYSTEM_READY.set(1 if model["state"] == "ready" else 0, name)
+    # Only report the cache once it exists; scraping must not trigger a load
+    if ai_service.subsystems["route_optimization"].ready:
+        cache = ai_service.route_cache.stats()
+        ROUTE_CACHE_ENTRIES.set(cache["size"])
+        for event in ("hits", "misses", "evictions", "expirations"):
+            ROUTE_CACHE_EVENTS.set(cache[event], event)
+    if ai_service.subsystems["hub_assignment"].ready:
+        hubs = ai_service.hub_index.stats()
+        for state in ("indexed", "buffered", "tombstoned"):
+            HUB_INDEX_ENTRIES.set(hubs[state], state)
+    if ai_service.subsystems["history_store"].ready:
+        history = ai_service.history_store.stats()
+        for kind in ("series", "observations"):
+            HISTORY_STORE_SIZE.set(history[kind], kind)
+    if ai_service.subsystems["road_routing"].ready and ai_service.road_router is not None:
+        road = ai_service.road_router.stats()
+        for outcome in ("table_hits", "searches", "off_network", "unreachable"):
+            ROAD_ROUTES.set(road[outcome], outcome)
+
+REGISTRY.add_collector(collect_runtime_metrics)
+
+def milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+def measured_performance(model: str) -> Dict[str, Any]:
+    """Request latencies, per-stage means and model quality observed since startup"""
+    endpoints = MODEL_ENDPOINTS[model]
+    latency = REQUEST_SECONDS.summary(lambda labels: labels[0] in endpoints)
+    stage_split = {
+        stage: milliseconds(REQUEST_STAGE_SECONDS.summary(lambda labels: labels[0] in endpoints and labels[1] == stage)["mean"])
+        for stage in ("parse_validate", "handler", "serialize")
+    }
+    operations = MODEL_OPERATIONS[model]
+    stages = {
+        f"{operation}.{stage}": milliseconds(STAGE_SECONDS.summary(lambda labels: labels == (operation, stage))["mean"])
+        for operation, stage in STAGE_SECONDS.label_sets()
+        if operation in operations
+    }
+    quality = {}
+    for metric in MODEL_QUALITY_METRICS[model]:
+        mean = MODEL_QUALITY.mean(model, metric)
+        quality[f"mean_{metric}"] = None if mean is None else round(mean, 4)
+    return {
+        "requests": int(latency["count"] or 0),
+        "latency_ms": {key: milliseconds(latency[key]) for key in ("mean", "p50", "p95", "p99")},
+        "request_stages_ms": stage_split,
+        "model_stages_ms": stages,
+        **quality
+    }
+
 @app.get("/api/models/status")
+@instrumented
 async def get_model_status():
-    """Get status of all AI models"""
-    return {
-        "models": {
-            "route_optimization": {
-                "status": "active",
-                "version": "2.0.0",
-                "last_updated": datetime.utcnow().isoformat(),
-                "performance": {
-                    "accuracy": "92%",
-                    "response_time": "120ms",
-                    "eu_compliance": "100%"
-                }
-            },
-            "demand_forecasting": {
-                "status": "active",
-                "version": "2.0.0",
-                "last_updated": datetime.utcnow().isoformat(),
-                "performance": {
-                    "mae": "8.5",
-                    "r2": "0.89",
-                    "seasonal_accuracy": "94%"
-                }
-            },
-            "anomaly_detection": {
-                "status": "active",
-                "version": "1.0.0",
-                "last_updated": datetime.utcnow().isoformat(),
-                "performance": {
-                    "detection_rate": "96%",
-                    "false_positive_rate": "4%",
-                    "response_time": "80ms"
-                }
-            },
-            "co2_estimation": {
-                "status": "active",
-                "version": "1.0.0",
-                "last_updated": datetime.utcnow().isoformat(),
-                "performance": {
-                    "accuracy": "88%",
-                    "eu_standards_compliance": "100%",
-                    "response_time": "50ms"
-                }
-            }
+    """Get status of all AI models with latencies and quality measured since startup"""
+    subsystems = ai_service.subsystems
+    models = {}
+    for name, version in (("route_optimization", "2.0.0"), ("demand_forecasting", "2.0.0"), ("anomaly_detection", "1.0.0"), ("co2_estimation", "1.0.0"), ("hub_assignment", "1.0.0")):
+        subsystem = subsystems[name]
+        models[name] = {
+            "status": subsystem.state,
+            "version": version,
+            "last_updated": None if subsystem.loaded_at is None else datetime.utcfromtimestamp(subsystem.loaded_at).isoformat(),
+            "performance": measured_performance(name)
         }
+    if subsystems["route_optimization"].ready:
+        models["route_optimization"]["cache"] = ai_service.route_cache.stats()
+    if subsystems["hub_assignment"].ready:
+        models["hub_assignment"]["index"] = ai_service.hub_index.stats()
+    if subsystems["history_store"].ready:
+        models["demand_forecasting"]["history_store"] = ai_service.history_store.stats()
+    if subsystems["road_routing"].ready:
+        router = ai_service.road_router
+        models["route_optimization"]["road_graph"] = None if router is None else router.stats()
+    
+    queue_wait = QUEUE_WAIT_SECONDS.summary()
+    return {
+        "models": models,
+        "executor": {
+            **model_executor.stats(),
+            "queue_wait_ms": {key: milliseconds(queue_wait[key]) for key in ("mean", "p50", "p95", "p99")}
+        },
+        "coalescing": request_coalescer.stats(),
+        "jobs": job_queue.stats()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, stage, executor and cache metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/jobs", status_code=202)
+@instrumented
+async def submit_job(request: JobSubmitRequest):
+    """Queue a forecast or anomaly job and return its id at once"""
+    if request.operation not in JOB_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown operation '{request.operation}', expected one of: {', '.join(JOB_OPERATIONS)}")
+    columnar = is_columnar(request.format)
+    model, run = JOB_OPERATIONS[request.operation]
+    try:
+        payload = model.model_validate(request.payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json()))
+    
+    job = await job_queue.submit(request.operation, lambda job: run(job, payload, columnar), request.priority)
+    return job_status(job)
+
+@app.get("/api/jobs")
+@instrumented
+async def list_jobs():
+    """List retained jobs with queue statistics"""
+    return {"jobs": job_queue.summaries(), **job_queue.stats()}
+
+@app.get("/api/jobs/{job_id}")
+@instrumented
+async def get_job(job_id: str):
+    """Report a job's state and progress"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}' (unknown or expired)")
+    return job_status(job)
+
+@app.get("/api/jobs/{job_id}/result")
+@instrumented
+async def get_job_result(job_id: str, accept: Optional[str] = Header(None)):
+    """Fetch a finished job's result; 202 with the status while it is still pending"""
+    media_type = negotiate(accept)
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}' (unknown or expired)")
+    if job.state == "succeeded":
+        return encoded_response(job.result, media_type)
+    if job.state == "failed":
+        error = job.error or {"status_code": 500, "detail": f"Job '{job_id}' failed"}
+        raise HTTPException(status_code=error["status_code"], detail=error["detail"])
+    if job.state == "cancelled":
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' was cancelled")
+    return JSONResponse(status_code=202, content=job_status(job))
+
+@app.delete("/api/jobs/{job_id}")
+@instrumented
+async def cancel_job(job_id: str):
+    """Cancel a pending job, or discard a finished job's result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}' (unknown or expired)")
+    if job.finished:
+        job_queue.discard(job_id)
+        return {"discarded": job_id}
+    job_queue.cancel(job_id)
+    return job_status(job)
+
+async def refresh_road_hubs() -> None:
+    """Re-snap hubs after a change; hub-to-hub tables are rebuilt on next use"""
+    if ai_service.subsystems["road_routing"].ready and ai_service.road_router is not None:
+        await run_in_threadpool(ai_service.road_router.set_hubs, *ai_service.hub_index.coordinates())
+
+@app.get("/api/road-graph")
+@instrumented
+async def get_road_graph():
+    """Report the loaded road network and its routing counters"""
+    await require_subsystem("road_routing")
+    router = ai_service.road_router
+    if router is None:
+        return {"loaded": False, "routing": "great_circle"}
+    return {"loaded": True, "routing": "road_network", **router.stats()}
+
+@app.get("/api/hubs")
+@instrumented
+async def get_hub_index():
+    """Report how many hubs are indexed, buffered and tombstoned"""
+    await require_subsystem("hub_assignment")
+    return ai_service.hub_index.stats()
+
+@app.post("/api/hubs")
+@instrumented
+async def upsert_hubs(request: HubUpsertRequest):
+    """Open hubs or move existing ones"""
+    await require_subsystem("hub_assignment")
+    index = ai_service.hub_index
+    updated = index.upsert(
+        {"hub_id": hub.hub_id, "hub_type": hub.hub_type, **hub.location.model_dump()}
+        for hub in request.hubs
+    )
+    await run_in_threadpool(index.save)
+    await refresh_road_hubs()
+    return {"updated": updated, **index.stats()}
+
+@app.get("/api/hubs/{hub_id}")
+@instrumented
+async def get_hub(hub_id: str):
+    """Look up one hub"""
+    await require_subsystem("hub_assignment")
+    hub = ai_service.hub_index.get(hub_id)
+    if hub is None:
+        raise HTTPException(status_code=404, detail=f"No hub '{hub_id}'")
+    return hub
+
+@app.delete("/api/hubs/{hub_id}")
+@instrumented
+async def delete_hub(hub_id: str):
+    """Close a hub"""
+    await require_subsystem("hub_assignment")
+    index = ai_service.hub_index
+    if not index.remove([hub_id]):
+        raise HTTPException(status_code=404, detail=f"No hub '{hub_id}'")
+    await run_in_threadpool(index.save)
+    await refresh_road_hubs()
+    return {"deleted": hub_id}
+
+@app.post("/api/hubs/assign", response_model=HubAssignmentResponse)
+@instrumented
+async def assign_hubs(request: HubAssignmentRequest, accept: Optional[str] = Header(None)):
+    """Assign many orders to their nearest hubs in one call"""
+    media_type = negotiate(accept)
+    await require_subsystem("hub_assignment")
+    try:
+        return encoded_response(await run_in_threadpool(ai_service.assign_hubs, request), media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Hub assignment failed: {str(e)}")
+
+@app.post("/api/hubs/within", response_model=HubRadiusResponse)
+@instrumented
+async def hubs_within(request: HubRadiusRequest, accept: Optional[str] = Header(None)):
+    """Find every hub within a radius of each order"""
+    media_type = negotiate(accept)
+    await require_subsystem("hub_assignment")
+    try:
+        return encoded_response(await run_in_threadpool(ai_service.hubs_within, request), media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Hub radius query failed: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
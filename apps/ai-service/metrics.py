@@ -0,0 +1,324 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Histograms keep fixed bucket counters per label set, so recording a value is
+a bisect plus a few integer increments under a lock, cheap enough to leave
+on under full load. Request-level timings come from an ASGI middleware
+together with the `instrumented` endpoint decorator. Inside model code,
+`StageTimer.lap` records how long each stage of an operation took.
+
+Observations are per process: with a process executor, stages timed inside
+worker processes stay in those workers.
+"""
+import contextvars
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _merged(self, match: Callable[[LabelValues], bool]) -> List[float]:
+        merged = [0] * (len(self.buckets) + 1) + [0.0]
+        with self._lock:
+            for labels, series in self._series.items():
+                if match(labels):
+                    merged = [a + b for a, b in zip(merged, series)]
+        return merged
+
+    def label_sets(self) -> List[LabelValues]:
+        with self._lock:
+            return list(self._series)
+
+    def summary(self, match: Callable[[LabelValues], bool] = lambda labels: True) -> Dict[str, Optional[float]]:
+        """Count, mean and bucket-interpolated p50/p95/p99 over matching label sets"""
+        merged = self._merged(match)
+        counts, total = merged[:-1], merged[-1]
+        n = sum(counts)
+        result: Dict[str, Optional[float]] = {"count": n, "mean": total / n if n else None}
+        for q in (0.5, 0.95, 0.99):
+            result[f"p{int(q * 100)}"] = self._quantile(counts, n, q)
+        return result
+
+    def _quantile(self, counts: List[float], n: float, q: float) -> Optional[float]:
+        # Linear interpolation inside the bucket, as Prometheus' histogram_quantile
+        if n == 0:
+            return None
+        rank = q * n
+        cumulative = 0.0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[i - 1] if i > 0 else 0.0
+                return low + (self.buckets[i] - low) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        bounds = [f'le="{_format_value(bound)}"' for bound in self.buckets] + ['le="+Inf"']
+        for labels, values in series:
+            cumulative = 0
+            # Bucket counts are whole numbers; only the trailing sum is a float
+            for bound, count in zip(bounds, values):
+                cumulative += int(count)
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, bound)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(values[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Summary:
+    """Running sum and count per label set (a Prometheus summary without quantiles)"""
+
+    metric_type = "summary"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        if value != value:
+            return
+        with self._lock:
+            series = self._series.setdefault(labels, [0.0, 0])
+            series[0] += value
+            series[1] += 1
+
+    def mean(self, *labels: str) -> Optional[float]:
+        with self._lock:
+            total, count = self._series.get(labels, (0.0, 0))
+        return total / count if count else None
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, (total, count) in series:
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Point-in-time values, usually refreshed by a collector at scrape time.
+
+    `metric_type` may be set to "counter" for totals that another component
+    already counts (e.g. executor rejections).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), metric_type: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.metric_type = metric_type
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics plus collectors run before each scrape"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.register(Counter("ai_http_requests_total", "HTTP requests by endpoint, method and status", ("endpoint", "method", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram("ai_http_request_duration_seconds", "Time from the first request byte to the last response byte", ("endpoint",)))
+REQUEST_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ai_http_request_stage_seconds",
+    "Request time split into parse_validate (body, JSON, pydantic), handler and serialize (response model, JSON encoding)",
+    ("endpoint", "stage")
+))
+REQUEST_BYTES = REGISTRY.register(Histogram("ai_http_request_size_bytes", "Request body size", ("endpoint",), SIZE_BUCKETS))
+RESPONSE_BYTES = REGISTRY.register(Histogram("ai_http_response_size_bytes", "Response body size", ("endpoint",), SIZE_BUCKETS))
+STAGE_SECONDS = REGISTRY.register(Histogram("ai_model_stage_seconds", "Time spent in each stage of a model operation", ("operation", "stage")))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram("ai_executor_queue_wait_seconds", "Time model jobs wait for an executor worker"))
+MODEL_QUALITY = REGISTRY.register(Summary("ai_model_quality", "Model quality figures observed per call (e.g. in-sample r2, anomaly rate)", ("model", "metric")))
+
+
+class StageTimer:
+    """Records consecutive stages of one operation: call `lap(stage)` as each ends"""
+
+    __slots__ = ("operation", "_last")
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - self._last, self.operation, stage)
+        self._last = now
+
+
+class RequestTiming:
+    __slots__ = ("start", "handler_start", "handler_end")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+
+
+_current_request: "contextvars.ContextVar[Optional[RequestTiming]]" = contextvars.ContextVar("ai_request_timing", default=None)
+
+
+def instrumented(handler: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark where an async endpoint handler starts and ends for the stage split"""
+
+    @functools.wraps(handler)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        timing = _current_request.get()
+        if timing is not None:
+            timing.handler_start = time.perf_counter()
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            if timing is not None:
+                timing.handler_end = time.perf_counter()
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-endpoint latency, sizes and status codes"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(time.perf_counter())
+        token = _current_request.set(timing)
+        received = 0
+        sent = 0
+        status = 500
+
+        async def counting_receive() -> Dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Dict[str, Any]) -> None:
+            nonlocal sent, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _current_request.reset(token)
+            end = time.perf_counter()
+            endpoint = scope.get("endpoint")
+            name = getattr(endpoint, "__name__", "unmatched")
+            REQUESTS.inc(1, name, scope["method"], str(status))
+            REQUEST_SECONDS.observe(end - timing.start, name)
+            REQUEST_BYTES.observe(received, name)
+            RESPONSE_BYTES.observe(sent, name)
+            if timing.handler_start is not None and timing.handler_end is not None:
+                REQUEST_STAGE_SECONDS.observe(timing.handler_start - timing.start, name, "parse_validate")
+                REQUEST_STAGE_SECONDS.observe(timing.handler_end - timing.handler_start, name, "handler")
+                REQUEST_STAGE_SECONDS.observe(end - timing.handler_end, name, "serialize")
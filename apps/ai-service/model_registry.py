@@ -0,0 +1,227 @@
+"""Incremental forecast models kept per product category or series id.
+
+Each series stores only sufficient statistics of its augmented rows
+[day index, day of week, month, day of month, volume]: the observation count,
+the column means and the centred co-moment matrix. New observations are
+merged with Chan's parallel update, so appending a day costs O(features²)
+no matter how long the history is, and the standardized least-squares model
+can be solved from the statistics at any time.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from forecasting import LinearForecastModel, calendar_features
+from intervals import IntervalBasis, gram_basis
+
+NUM_COLUMNS = 5  # four calendar features plus the volume
+
+
+class SeriesMoments:
+    """Running count, means and co-moments for one series"""
+
+    __slots__ = ("n", "mean", "comoment", "last_date")
+
+    def __init__(self, n: int = 0, mean: Optional[np.ndarray] = None, comoment: Optional[np.ndarray] = None, last_date: Optional[np.datetime64] = None):
+        self.n = n
+        self.mean = np.zeros(NUM_COLUMNS) if mean is None else mean
+        self.comoment = np.zeros((NUM_COLUMNS, NUM_COLUMNS)) if comoment is None else comoment
+        self.last_date = last_date
+
+    def update(self, dates: np.ndarray, volumes: np.ndarray) -> None:
+        """Merge a block of new observations, in the order given"""
+        if len(volumes) == 0:
+            return
+
+        rows = np.empty((len(volumes), NUM_COLUMNS))
+        # Day index continues from the observations already absorbed
+        rows[:, :-1] = calendar_features(dates, self.n)
+        rows[:, -1] = volumes
+
+        n_new = len(rows)
+        mean_new = rows.mean(axis=0)
+        deviations = rows - mean_new
+        comoment_new = deviations.T @ deviations
+
+        total = self.n + n_new
+        delta = mean_new - self.mean
+        comoment = self.comoment + comoment_new + np.outer(delta, delta) * (self.n * n_new / total)
+        mean = self.mean + delta * (n_new / total)
+        latest = dates.max().astype("datetime64[D]")
+        if self.last_date is not None and self.last_date > latest:
+            latest = self.last_date
+        self.n, self.mean, self.comoment, self.last_date = total, mean, comoment, latest
+
+    def copy(self) -> "SeriesMoments":
+        # The arrays are replaced, never written in place, so sharing them is safe
+        return SeriesMoments(self.n, self.mean, self.comoment, self.last_date)
+
+    def model(self) -> LinearForecastModel:
+        return LinearForecastModel.from_moments(self.n, self.mean, self.comoment)
+
+    def residual_ss(self, model: LinearForecastModel) -> float:
+        _, scale, coef = model.fitted()
+        explained = float(coef @ (self.comoment[:-1, -1] / scale))
+        return max(float(self.comoment[-1, -1]) - explained, 0.0)
+
+    def metrics(self, model: LinearForecastModel) -> Dict[str, float]:
+        """In-sample RMSE and R² derived from the statistics alone"""
+        ss_tot = float(self.comoment[-1, -1])
+        ss_res = self.residual_ss(model)
+        if ss_tot > 0:
+            r2 = 1 - ss_res / ss_tot
+        else:
+            r2 = 1.0
+        return {"rmse": float(np.sqrt(ss_res / self.n)), "r2": r2}
+
+    def interval_basis(self, model: LinearForecastModel) -> IntervalBasis:
+        """Analytic-interval basis from the statistics; bootstrap intervals need the observations"""
+        _, scale, _ = model.fitted()
+        gram = self.comoment[:-1, :-1] / np.outer(scale, scale)
+        return gram_basis(gram[None], np.array([self.residual_ss(model)]), np.array([self.n]))
+
+
+class ForecastModelRegistry:
+    """Thread-safe map of series id -> SeriesMoments persisted to one .npz file.
+
+    Every change bumps a version. Saves are serialized and skip writing when
+    the file already holds the current version, so concurrent updates that
+    queue behind one write are persisted together by the next. `save_soon`
+    additionally holds writes back to one per `save_interval` seconds; readers
+    get snapshots, so a forecast never sees a half-applied append.
+    """
+
+    def __init__(self, path: str, save_interval: float = 0.0):
+        self.path = path
+        self.save_interval = save_interval
+        self._models: Dict[str, SeriesMoments] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._version = 0
+        self._saved_version = 0
+        self._last_write = float("-inf")
+        self._timer: Optional[threading.Timer] = None
+
+    def load(self) -> int:
+        """Load persisted statistics if the file exists; returns the series count"""
+        if not os.path.exists(self.path):
+            return 0
+
+        with np.load(self.path, allow_pickle=False) as data:
+            keys = data["keys"].tolist()
+            counts = data["counts"]
+            means = data["means"]
+            comoments = data["comoments"]
+            last_dates = data["last_dates"]
+
+        models = {
+            key: SeriesMoments(
+                int(counts[i]),
+                means[i].copy(),
+                comoments[i].copy(),
+                None if np.isnat(last_dates[i]) else last_dates[i]
+            )
+            for i, key in enumerate(keys)
+        }
+        with self._lock:
+            self._models = models
+        return len(models)
+
+    def save(self) -> None:
+        """Write every series to disk atomically, unless a save already covered the latest change"""
+        with self._save_lock:
+            self._write()
+
+    def save_soon(self) -> None:
+        """Save now, or once `save_interval` has passed since the last write"""
+        with self._lock:
+            if self._timer is not None:
+                return  # the pending write picks this change up
+            delay = self._last_write + self.save_interval - time.monotonic()
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._deferred_save)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self.save()
+
+    def _deferred_save(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.save()
+
+    def close(self) -> None:
+        """Cancel a pending deferred write and persist everything now"""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self.save()
+
+    def _write(self) -> None:
+        # Called with the save lock held, so only one writer uses the temp file
+        with self._lock:
+            version = self._version
+            if version == self._saved_version:
+                return
+            keys = list(self._models)
+            models = [self._models[key] for key in keys]
+            counts = np.array([m.n for m in models], dtype=np.int64)
+            means = np.array([m.mean for m in models]).reshape(len(models), NUM_COLUMNS)
+            comoments = np.array([m.comoment for m in models]).reshape(len(models), NUM_COLUMNS, NUM_COLUMNS)
+            last_dates = np.array(
+                [np.datetime64("NaT") if m.last_date is None else m.last_date for m in models],
+                dtype="datetime64[D]"
+            )
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(keys, dtype=str),
+                counts=counts,
+                means=means,
+                comoments=comoments,
+                last_dates=last_dates
+            )
+        os.replace(tmp_path, self.path)
+        self._saved_version = version
+        self._last_write = time.monotonic()
+
+    def append(self, series_id: str, dates: np.ndarray, volumes: np.ndarray) -> SeriesMoments:
+        with self._lock:
+            moments = self._models.get(series_id)
+            if moments is None:
+                moments = self._models[series_id] = SeriesMoments()
+            moments.update(dates, volumes)
+            self._version += 1
+            return moments.copy()
+
+    def get(self, series_id: str) -> Optional[SeriesMoments]:
+        with self._lock:
+            moments = self._models.get(series_id)
+            return None if moments is None else moments.copy()
+
+    def delete(self, series_id: str) -> bool:
+        with self._lock:
+            if self._models.pop(series_id, None) is None:
+                return False
+            self._version += 1
+            return True
+
+    def summary(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [
+                {
+                    "series_id": key,
+                    "observations": m.n,
+                    "last_date": None if m.last_date is None else str(m.last_date)
+                }
+                for key, m in self._models.items()
+            ]
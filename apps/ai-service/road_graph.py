@@ -0,0 +1,570 @@
+"""Road-network shortest paths over compact CSR arrays.
+
+The network is a directed graph of road nodes and edges with a length, a
+free-flow speed and an emissions weight (a per-km multiplier, 1.0 for an
+average road). Out-edges are held in CSR arrays grouped by source and
+in-edges grouped by target, with one cost per edge for each optimization
+target:
+
+    time       hours (length / speed)
+    cost       km (carriers price by distance)
+    emissions  km scaled by the edge's emissions weight
+
+Point-to-point queries run bidirectional A*. Both searches use the average
+of a great-circle lower bound towards the target and from the source, which
+keeps every reduced edge cost non-negative, so the usual bidirectional
+stopping rule still proves the path optimal. The bound prices each
+great-circle km at the lowest cost per km of any edge in the network, which
+keeps it admissible whatever the data.
+
+Tables between a fixed set of nodes (hubs, the stops of one route) come from
+scipy's Dijkstra, one shortest-path tree per source, searched a block of
+sources at a time. The paths to the other k nodes are walked up each tree
+for all of them at once, and length, time and emissions are summed along
+them. A table keeps only the (k, k) totals and those node paths, never the
+trees, so lanes between those nodes resolve by lookup. Hub tables are built
+on first use and only while hubs times graph nodes stays under a cap; stop
+tables bound their searches by a detour limit.
+
+scipy is imported when the first table or snapping tree is built.
+"""
+import heapq
+import math
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from geo import EARTH_RADIUS_KM, distance_matrix, haversine_km
+
+METRICS = ("time", "cost", "emissions")
+GRAPH_FIELDS = ("node_lat", "node_lng", "edge_source", "edge_target", "edge_length_km", "edge_speed_kmh")
+
+# Dijkstra output (sources x graph nodes) held at once while a table is built
+TABLE_BLOCK_CELLS = 1 << 22
+# Path nodes a table keeps; tables with longer paths rebuild them by search
+MAX_TABLE_PATH_NODES = 1 << 24
+# Stop-table searches end at this multiple of the widest stop spread, priced at a typical cost per km
+STOP_SEARCH_DETOUR = 3.0
+
+
+def metric_for(optimize_for: str) -> str:
+    """Graph metric for an optimize_for value; unknown values route by cost like the route profiles"""
+    return optimize_for if optimize_for in METRICS else "cost"
+
+
+class RoadRoute(NamedTuple):
+    """A shortest path as node indices from source to target, with its totals"""
+    nodes: np.ndarray
+    cost: float
+    length_km: float
+    time_h: float
+    emissions_km: float
+    access_km: float = 0.0  # great-circle km from the endpoints to their nearest road nodes
+
+
+class CSR(NamedTuple):
+    indptr: np.ndarray
+    neighbours: np.ndarray  # target (out-edges) or source (in-edges) of each entry
+    edges: np.ndarray  # edge id of each entry
+
+
+class PathTable(NamedTuple):
+    """All-pairs shortest paths between k nodes under one metric"""
+    metric: str
+    nodes: np.ndarray  # (k,) node indices
+    cost: np.ndarray  # (k, k), inf when unreachable
+    length_km: np.ndarray
+    time_h: np.ndarray
+    emissions_km: np.ndarray
+    # Pair (i, j) spans path_nodes[path_offsets[i * k + j]:path_offsets[i * k + j + 1]];
+    # both None when the paths were over the table's budget
+    path_offsets: Optional[np.ndarray]
+    path_nodes: Optional[np.ndarray]
+
+
+def build_csr(keys: np.ndarray, others: np.ndarray, n: int) -> CSR:
+    order = np.lexsort((others, keys))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return CSR(indptr, others[order], order)
+
+
+class RoadGraph:
+    """Directed road network in CSR form with time, cost and emissions edge weights"""
+
+    def __init__(self, lat, lng, source, target, length_km, speed_kmh, emissions=None):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lng = np.asarray(lng, dtype=float)
+        self.source = np.asarray(source, dtype=np.int64)
+        self.target = np.asarray(target, dtype=np.int64)
+        self.length_km = np.asarray(length_km, dtype=float)
+        self.speed_kmh = np.asarray(speed_kmh, dtype=float)
+        self.emissions_weight = np.ones(len(self.source)) if emissions is None else np.asarray(emissions, dtype=float)
+
+        n, m = len(self.lat), len(self.source)
+        if len(self.lng) != n or not (len(self.target) == len(self.length_km) == len(self.speed_kmh) == len(self.emissions_weight) == m):
+            raise ValueError("Node and edge columns must have matching lengths")
+        if m and (min(self.source.min(), self.target.min()) < 0 or max(self.source.max(), self.target.max()) >= n):
+            raise ValueError("Edge endpoints must be node indices")
+        if (self.length_km < 0).any() or not (self.speed_kmh > 0).all() or (self.emissions_weight < 0).any():
+            raise ValueError("Edge lengths and emissions weights must be non-negative and speeds positive")
+
+        self.time_h = self.length_km / self.speed_kmh
+        self.weights = {
+            "time": self.time_h,
+            "cost": self.length_km,
+            "emissions": self.length_km * self.emissions_weight
+        }
+        self.forward = build_csr(self.source, self.target, n)
+        self.reverse = build_csr(self.target, self.source, n)
+
+        # Lowest cost per great-circle km of any edge: scaled straight lines never overestimate
+        crow = haversine_km(self.lat[self.source], self.lng[self.source], self.lat[self.target], self.lng[self.target])
+        moving = crow > 0
+        self.floor = {
+            metric: float(np.min(weight[moving] / crow[moving])) * (1 - 1e-9) if moving.any() else 0.0
+            for metric, weight in self.weights.items()
+        }
+        self.typical = {
+            metric: float(np.median(weight[moving] / crow[moving])) if moving.any() else 0.0
+            for metric, weight in self.weights.items()
+        }
+
+        self._lock = threading.Lock()
+        self._search: Dict[str, tuple] = {}
+        self._matrices: Dict[str, tuple] = {}
+        self._tree = None
+        self._radians: Optional[Tuple[List[float], List[float], List[float]]] = None
+
+    @classmethod
+    def from_edges(cls, lat, lng, source, target, length_km, speed_kmh, emissions=None, oneway=None) -> "RoadGraph":
+        """Graph from an edge list where edges run both ways unless flagged one-way"""
+        columns = [np.asarray(source), np.asarray(target), np.asarray(length_km, dtype=float), np.asarray(speed_kmh, dtype=float)]
+        columns.append(np.ones(len(columns[0])) if emissions is None else np.asarray(emissions, dtype=float))
+        twoway = np.ones(len(columns[0]), dtype=bool) if oneway is None else ~np.asarray(oneway, dtype=bool)
+        src, dst, length, speed, weight = columns
+        return cls(
+            lat, lng,
+            np.concatenate([src, dst[twoway]]),
+            np.concatenate([dst, src[twoway]]),
+            np.concatenate([length, length[twoway]]),
+            np.concatenate([speed, speed[twoway]]),
+            np.concatenate([weight, weight[twoway]])
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """Read an .npz with GRAPH_FIELDS plus optional edge_emissions and edge_oneway columns"""
+        with np.load(path, allow_pickle=False) as data:
+            missing = [field for field in GRAPH_FIELDS if field not in data]
+            if missing:
+                raise ValueError(f"Road graph file lacks: {', '.join(missing)}")
+            columns = {field: data[field] for field in GRAPH_FIELDS}
+            emissions = data["edge_emissions"] if "edge_emissions" in data else None
+            oneway = data["edge_oneway"] if "edge_oneway" in data else None
+        return cls.from_edges(
+            columns["node_lat"], columns["node_lng"],
+            columns["edge_source"], columns["edge_target"],
+            columns["edge_length_km"], columns["edge_speed_kmh"],
+            emissions, oneway
+        )
+
+    def save(self, path: str) -> None:
+        """Write the graph atomically, every edge as a one-way edge"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                node_lat=self.lat,
+                node_lng=self.lng,
+                edge_source=self.source,
+                edge_target=self.target,
+                edge_length_km=self.length_km,
+                edge_speed_kmh=self.speed_kmh,
+                edge_emissions=self.emissions_weight,
+                edge_oneway=np.ones(len(self.source), dtype=bool)
+            )
+        os.replace(tmp_path, path)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.lat)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.source)
+
+    def snap(self, lats, lngs) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest road node of each point and its great-circle distance in km"""
+        from spatial_index import unit_vectors
+        with self._lock:
+            if self._tree is None:
+                from scipy.spatial import cKDTree
+                self._tree = cKDTree(unit_vectors(self.lat, self.lng))
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lngs = np.atleast_1d(np.asarray(lngs, dtype=float))
+        _, nodes = self._tree.query(unit_vectors(lats, lngs))
+        nodes = np.asarray(nodes, dtype=np.int64).reshape(len(lats))
+        return nodes, haversine_km(lats, lngs, self.lat[nodes], self.lng[nodes])
+
+    def _search_arrays(self, metric: str) -> Tuple[tuple, Tuple[List[float], List[float], List[float]]]:
+        # Plain lists: the search loop indexes single entries, much faster than NumPy scalars
+        with self._lock:
+            arrays = self._search.get(metric)
+            if arrays is None:
+                weight = self.weights[metric]
+                arrays = self._search[metric] = (
+                    self.forward.indptr.tolist(),
+                    self.forward.neighbours.tolist(),
+                    weight[self.forward.edges].tolist(),
+                    self.reverse.indptr.tolist(),
+                    self.reverse.neighbours.tolist(),
+                    weight[self.reverse.edges].tolist()
+                )
+            radians = self._radians
+            if radians is None:
+                lat = np.radians(self.lat)
+                radians = self._radians = (lat.tolist(), np.radians(self.lng).tolist(), np.cos(lat).tolist())
+            return arrays, radians
+
+    def route_of(self, source: int, edges: Union[Sequence[int], np.ndarray], metric: str) -> RoadRoute:
+        """Totals of a path given as consecutive edge ids from `source`"""
+        edges = np.asarray(edges, dtype=np.int64)
+        return RoadRoute(
+            nodes=np.concatenate([[source], self.target[edges]]).astype(np.int64),
+            cost=float(self.weights[metric][edges].sum()),
+            length_km=float(self.length_km[edges].sum()),
+            time_h=float(self.time_h[edges].sum()),
+            emissions_km=float(self.weights["emissions"][edges].sum())
+        )
+
+    def shortest_path(self, source: int, target: int, metric: str) -> Optional[RoadRoute]:
+        """Bidirectional A* between two nodes; None when the target cannot be reached"""
+        if source == target:
+            return self.route_of(source, [], metric)
+        (f_indptr, f_next, f_weight, r_indptr, r_next, r_weight), (rad_lat, rad_lng, cos_lat) = self._search_arrays(metric)
+        half_scale = self.floor[metric] * EARTH_RADIUS_KM
+
+        def angle(u: int, v: int) -> float:
+            a = math.sin((rad_lat[v] - rad_lat[u]) / 2) ** 2 + cos_lat[u] * cos_lat[v] * math.sin((rad_lng[v] - rad_lng[u]) / 2) ** 2
+            return math.asin(math.sqrt(min(a, 1.0)))
+
+        # Forward potential (to-target bound minus from-source bound) / 2; the reverse search uses its negation
+        potentials: Dict[int, float] = {}
+
+        def potential(v: int) -> float:
+            p = potentials.get(v)
+            if p is None:
+                p = potentials[v] = half_scale * (angle(v, target) - angle(source, v))
+            return p
+
+        dist = ({source: 0.0}, {target: 0.0})
+        via = ({source: -1}, {target: -1})  # CSR entry each node was reached through
+        done: Tuple[Set[int], Set[int]] = (set(), set())
+        heaps = ([(potential(source), source)], [(-potential(target), target)])
+        graph = ((f_indptr, f_next, f_weight, 1.0), (r_indptr, r_next, r_weight, -1.0))
+        best = math.inf
+        meet = -1
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            _, u = heapq.heappop(heaps[side])
+            if u in done[side]:
+                continue
+            done[side].add(u)
+            indptr, neighbours, weight, sign = graph[side]
+            own, other, own_via, heap = dist[side], dist[1 - side], via[side], heaps[side]
+            g = own[u]
+            for i in range(indptr[u], indptr[u + 1]):
+                v = neighbours[i]
+                d = g + weight[i]
+                if d < own.get(v, math.inf):
+                    own[v] = d
+                    own_via[v] = i
+                    heapq.heappush(heap, (d + sign * potential(v), v))
+                    through = other.get(v)
+                    if through is not None and d + through < best:
+                        best = d + through
+                        meet = v
+
+        if meet < 0:
+            return None
+        edges = []
+        v = meet
+        while via[0][v] >= 0:
+            edge = int(self.forward.edges[via[0][v]])
+            edges.append(edge)
+            v = int(self.source[edge])
+        edges.reverse()
+        v = meet
+        while via[1][v] >= 0:
+            edge = int(self.reverse.edges[via[1][v]])
+            edges.append(edge)
+            v = int(self.target[edge])
+        return self.route_of(source, edges, metric)
+
+    def _metric_matrix(self, metric: str) -> tuple:
+        # scipy matrix keeping the cheapest of parallel edges, with the edge id behind each entry
+        with self._lock:
+            cached = self._matrices.get(metric)
+            if cached is not None:
+                return cached
+            from scipy.sparse import csr_matrix
+            n = self.num_nodes
+            weight = self.weights[metric]
+            order = np.lexsort((weight, self.target, self.source))
+            src, dst = self.source[order], self.target[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+            edges = order[first]
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.source[edges], minlength=n), out=indptr[1:])
+            # Explicit zeros stay edges for scipy's Dijkstra
+            matrix = csr_matrix((weight[edges], self.target[edges], indptr), shape=(n, n))
+            keys = self.source[edges] * n + self.target[edges]  # ascending, like the entries
+            cached = self._matrices[metric] = (matrix, keys, edges)
+            return cached
+
+    def table(self, nodes, metric: str, limit: float = np.inf, max_path_nodes: int = MAX_TABLE_PATH_NODES) -> PathTable:
+        """Shortest paths between every ordered pair of `nodes` under one metric.
+
+        Searches stop at a cost of `limit`; pairs beyond it come out unreachable.
+        """
+        from scipy.sparse.csgraph import dijkstra
+        matrix, keys, edges = self._metric_matrix(metric)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        n, k = self.num_nodes, len(nodes)
+
+        per_edge = np.column_stack([self.length_km, self.time_h, self.weights["emissions"]])
+        cost = np.empty((k, k))
+        totals = np.zeros((k, k, 3))
+        path_lengths = np.zeros((k, k), dtype=np.int64)
+        path_parts: Optional[List[np.ndarray]] = []
+        path_total = 0
+        block = max(1, TABLE_BLOCK_CELLS // max(n, 1))
+
+        for start in range(0, k, block):
+            rows = slice(start, min(start + block, k))
+            sources = nodes[rows]
+            dist, predecessors = dijkstra(matrix, directed=True, indices=sources, return_predecessors=True, limit=limit)
+            predecessors = predecessors.reshape(len(sources), n)
+            cost[rows] = dist.reshape(len(sources), n)[:, nodes]
+            del dist
+
+            reached = np.isfinite(cost[rows])
+            lengths = path_lengths[rows] = np.where(reached, tree_hops(predecessors, nodes, reached) + 1, 0)
+            paths = tree_paths(predecessors, nodes, lengths)
+
+            # Totals summed edge by edge along the block's paths: every step but the one from a path's last node
+            counts = lengths.ravel()
+            step = np.ones(len(paths), dtype=bool)
+            step[np.cumsum(counts)[counts > 0] - 1] = False
+            step = np.flatnonzero(step[:-1])
+            step_edges = edges[np.searchsorted(keys, paths[step].astype(np.int64) * n + paths[step + 1])]
+            pair = np.repeat(np.arange(counts.size), np.maximum(counts - 1, 0))
+            for column in range(3):
+                totals[rows, :, column] = np.bincount(pair, weights=per_edge[step_edges, column], minlength=counts.size).reshape(lengths.shape)
+
+            if path_parts is not None:
+                path_total += len(paths)
+                if path_total > max_path_nodes:
+                    path_parts = None
+                else:
+                    path_parts.append(paths)
+
+        if path_parts is None:
+            path_offsets = path_nodes = None
+        else:
+            path_nodes = np.concatenate(path_parts) if path_parts else np.empty(0, dtype=np.int32)
+            path_offsets = np.zeros(k * k + 1, dtype=np.int64)
+            np.cumsum(path_lengths.ravel(), out=path_offsets[1:])
+
+        return PathTable(
+            metric=metric,
+            nodes=nodes,
+            cost=cost,
+            length_km=totals[:, :, 0],
+            time_h=totals[:, :, 1],
+            emissions_km=totals[:, :, 2],
+            path_offsets=path_offsets,
+            path_nodes=path_nodes
+        )
+
+    def table_route(self, table: PathTable, i: int, j: int) -> Optional[RoadRoute]:
+        """Path from table node i to table node j; None when unreachable"""
+        if not np.isfinite(table.cost[i, j]):
+            return None
+        if table.path_nodes is None or table.path_offsets is None:
+            return self.shortest_path(int(table.nodes[i]), int(table.nodes[j]), table.metric)
+        pair = i * len(table.nodes) + j
+        return RoadRoute(
+            nodes=table.path_nodes[table.path_offsets[pair]:table.path_offsets[pair + 1]].astype(np.int64),
+            cost=float(table.cost[i, j]),
+            length_km=float(table.length_km[i, j]),
+            time_h=float(table.time_h[i, j]),
+            emissions_km=float(table.emissions_km[i, j])
+        )
+
+    def search_limit(self, nodes, metric: str) -> float:
+        """Search bound for a table between `nodes`: a generous detour over their widest great-circle spread"""
+        spread = float(distance_matrix(self.lat[nodes], self.lng[nodes]).max()) if len(nodes) else 0.0
+        return STOP_SEARCH_DETOUR * spread * self.typical[metric]
+
+
+def tree_hops(predecessors: np.ndarray, nodes: np.ndarray, reached: np.ndarray) -> np.ndarray:
+    """Edge count from each tree's root to every one of `nodes` (rows of `reached` x nodes)"""
+    rows = np.repeat(np.arange(len(predecessors)), len(nodes))
+    current = np.tile(nodes, len(predecessors))
+    hops = np.zeros(current.shape, dtype=np.int64)
+    active = np.flatnonzero(reached.ravel())
+    while len(active):
+        current[active] = predecessors[rows[active], current[active]]
+        active = active[current[active] >= 0]
+        hops[active] += 1
+    return hops.reshape(reached.shape)
+
+
+def tree_paths(predecessors: np.ndarray, nodes: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Node paths from each tree's root to every one of `nodes`, flattened row by row.
+
+    `lengths` holds the node count of each (row, node) path, 0 when unreached.
+    Paths are written back to front, one step up every tree at a time.
+    """
+    ends = np.cumsum(lengths.ravel())
+    paths = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.int32)
+    rows = np.repeat(np.arange(len(predecessors)), len(nodes))
+    current = np.tile(nodes, len(predecessors))
+    position = ends - 1
+    active = np.flatnonzero(lengths.ravel() > 0)
+    while len(active):
+        paths[position[active]] = current[active]
+        current[active] = predecessors[rows[active], current[active]]
+        position[active] -= 1
+        active = active[current[active] >= 0]
+    return paths
+
+
+class RoadRouter:
+    """Thread-safe routing over one road graph with cached hub-to-hub tables per metric.
+
+    A metric's hub table is built by the first request that needs it, while
+    other requests keep searching, and only when hubs times graph nodes is at
+    most `max_table_cells`; larger hub sets route every lane by search.
+    """
+
+    def __init__(self, graph: RoadGraph, max_snap_km: float = 25.0, max_table_cells: int = 20_000_000):
+        self.graph = graph
+        self.max_snap_km = max_snap_km
+        self.max_table_cells = max_table_cells
+        self._hub_nodes = np.empty(0, dtype=np.int64)
+        self._hub_row: Dict[int, int] = {}
+        self._tables: Dict[str, PathTable] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.table_builds = 0
+        self.counts = dict.fromkeys(("table_hits", "searches", "off_network", "unreachable"), 0)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def set_hubs(self, lats, lngs) -> int:
+        """Snap hubs to the network and drop cached tables; returns the distinct hub nodes"""
+        nodes, km = self.graph.snap(lats, lngs) if len(lats) else (np.empty(0, dtype=np.int64), np.empty(0))
+        hub_nodes = np.unique(nodes[km <= self.max_snap_km])
+        with self._lock:
+            self._hub_nodes = hub_nodes
+            self._hub_row = {int(node): row for row, node in enumerate(hub_nodes.tolist())}
+            self._tables = {}
+            self._generation += 1
+        return len(hub_nodes)
+
+    def tables_enabled(self) -> bool:
+        return 0 < len(self._hub_nodes) * self.graph.num_nodes <= self.max_table_cells
+
+    def hub_table(self, metric: str, wait: bool = False) -> Optional[PathTable]:
+        """The metric's hub-to-hub table, built on first use after the hubs change.
+
+        None while another thread builds it (unless `wait`), and when the hubs
+        are over the size cap.
+        """
+        with self._lock:
+            table = self._tables.get(metric)
+            if table is not None or not self.tables_enabled():
+                return table
+        if not self._build_lock.acquire(blocking=wait):
+            return None
+        try:
+            # Built outside the router lock so routing carries on meanwhile
+            with self._lock:
+                table = self._tables.get(metric)
+                hub_nodes, generation = self._hub_nodes, self._generation
+            if table is None:
+                table = self.graph.table(hub_nodes, metric)
+                with self._lock:
+                    self.table_builds += 1
+                    if generation == self._generation:
+                        self._tables[metric] = table
+            return table
+        finally:
+            self._build_lock.release()
+
+    def route(self, lat1: float, lng1: float, lat2: float, lng2: float, metric: str) -> Optional[RoadRoute]:
+        """Road route between two points; None when either is off the network or no road connects them"""
+        nodes, km = self.graph.snap([lat1, lat2], [lng1, lng2])
+        if (km > self.max_snap_km).any():
+            self._count("off_network")
+            return None
+        source, target = int(nodes[0]), int(nodes[1])
+
+        with self._lock:
+            row, column = self._hub_row.get(source), self._hub_row.get(target)
+        if row is not None and column is not None:
+            table = self.hub_table(metric)
+            if table is not None and row < len(table.nodes) and column < len(table.nodes) and table.nodes[row] == source and table.nodes[column] == target:
+                self._count("table_hits")
+                route = self.graph.table_route(table, row, column)
+                return None if route is None else route._replace(access_km=float(km.sum()))
+
+        self._count("searches")
+        route = self.graph.shortest_path(source, target, metric)
+        if route is None:
+            self._count("unreachable")
+            return None
+        return route._replace(access_km=float(km.sum()))
+
+    def stop_table(self, lats, lngs, metric: str) -> Optional[Tuple[PathTable, np.ndarray]]:
+        """Table between the road nodes nearest to each point plus each point's access km; None if any is off the network"""
+        nodes, km = self.graph.snap(lats, lngs)
+        if (km > self.max_snap_km).any():
+            self._count("off_network")
+            return None
+        table = self.graph.table(nodes, metric, limit=self.graph.search_limit(nodes, metric))
+        if not np.isfinite(table.cost).all():
+            # The detour bound is a heuristic: stops it cut off are searched again without it
+            table = self.graph.table(nodes, metric)
+        if not np.isfinite(table.cost).all():
+            self._count("unreachable")
+            return None
+        return table, km
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "nodes": self.graph.num_nodes,
+                "edges": self.graph.num_edges,
+                "hub_nodes": len(self._hub_nodes),
+                "hub_tables_enabled": self.tables_enabled(),
+                "max_table_cells": self.max_table_cells,
+                "tables": sorted(self._tables),
+                "table_builds": self.table_builds,
+                **self.counts
+            }
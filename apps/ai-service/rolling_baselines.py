@@ -0,0 +1,176 @@
+"""Stateful sliding-window baselines for scoring live shipment events.
+
+Every group (carrier, lane, ...) owns a fixed-size ring buffer of metric rows
+and timestamps. Running shifted sums are updated as rows enter and leave the
+window, so scoring an event against its group's mean/std and absorbing it
+are both O(1). Windows are bounded by row count and optionally by age, and
+the number of groups is capped with least-recently-used eviction.
+"""
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class RingWindow:
+    """Array-backed ring buffer with NaN-aware running sums per metric"""
+
+    __slots__ = ("values", "timestamps", "head", "size", "count", "total", "total_sq", "shift", "inserts")
+
+    def __init__(self, capacity: int, metrics: int):
+        self.values = np.full((capacity, metrics), np.nan)
+        self.timestamps = np.zeros(capacity)
+        self.head = 0  # slot of the oldest row
+        self.size = 0
+        self.count = [0] * metrics
+        # Sums are kept relative to `shift` to avoid cancellation in the variance
+        self.total = [0.0] * metrics
+        self.total_sq = [0.0] * metrics
+        self.shift: List[Optional[float]] = [None] * metrics
+        self.inserts = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamps)
+
+    def _remove_oldest(self) -> None:
+        for j, value in enumerate(self.values[self.head].tolist()):
+            if value == value:
+                shift = self.shift[j]
+                assert shift is not None  # set by the push that stored this value
+                d = value - shift
+                self.count[j] -= 1
+                self.total[j] -= d
+                self.total_sq[j] -= d * d
+        self.values[self.head] = np.nan
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+    def expire(self, cutoff: float) -> None:
+        """Drop rows older than `cutoff` (events are assumed to arrive in time order)"""
+        while self.size and self.timestamps[self.head] < cutoff:
+            self._remove_oldest()
+
+    def push(self, values: Sequence[float], timestamp: float) -> None:
+        if self.size == self.capacity:
+            self._remove_oldest()
+
+        slot = (self.head + self.size) % self.capacity
+        self.values[slot] = values
+        self.timestamps[slot] = timestamp
+        self.size += 1
+
+        for j, value in enumerate(values):
+            if value == value:
+                shift = self.shift[j]
+                if shift is None:
+                    shift = self.shift[j] = value
+                d = value - shift
+                self.count[j] += 1
+                self.total[j] += d
+                self.total_sq[j] += d * d
+
+        # Re-derive the sums from the buffer once per lap to cancel drift
+        self.inserts += 1
+        if self.inserts % self.capacity == 0:
+            self._resync()
+
+    def _resync(self) -> None:
+        valid = ~np.isnan(self.values)
+        counts = valid.sum(axis=0)
+        for j in range(self.values.shape[1]):
+            column = self.values[valid[:, j], j]
+            self.count[j] = int(counts[j])
+            if not len(column):
+                self.shift[j], self.total[j], self.total_sq[j] = None, 0.0, 0.0
+                continue
+            shift = float(column.mean())
+            d = column - shift
+            self.shift[j] = shift
+            self.total[j] = float(d.sum())
+            self.total_sq[j] = float(d @ d)
+
+    def baseline(self, j: int) -> Tuple[int, float, float]:
+        """(count, mean, std) of metric `j` over the current window"""
+        n = self.count[j]
+        shift = self.shift[j]
+        if n == 0 or shift is None:
+            return 0, math.nan, math.nan
+        mean_shifted = self.total[j] / n
+        variance = max(self.total_sq[j] / n - mean_shifted * mean_shifted, 0.0)
+        return n, shift + mean_shifted, math.sqrt(variance)
+
+
+class RollingBaselineStore:
+    """Per-group RingWindows with count, age and group-count bounds"""
+
+    def __init__(self, metrics: int, capacity: int = 500, max_age_seconds: float = 0.0, max_groups: int = 10000, min_samples: int = 20):
+        self.metrics = metrics
+        self.capacity = capacity
+        self.max_age_seconds = max_age_seconds  # 0 disables the time bound
+        self.max_groups = max_groups
+        self.min_samples = min_samples
+        self._windows: "OrderedDict[str, RingWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.events = 0
+        self.evicted_groups = 0
+
+    def score(self, key: str, values: Sequence[float], timestamp: float, z_threshold: float = 2.0, threshold: float = 0.1) -> List[Optional[Dict[str, float]]]:
+        """Score an event against its group's window, then absorb it.
+
+        Returns one entry per metric: None when the value is missing or the
+        window holds fewer than `min_samples` values, otherwise the baseline
+        and z-score with an `anomalous` flag.
+        """
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = RingWindow(self.capacity, self.metrics)
+                while len(self._windows) > self.max_groups:
+                    self._windows.popitem(last=False)
+                    self.evicted_groups += 1
+            else:
+                self._windows.move_to_end(key)
+
+            if self.max_age_seconds > 0:
+                window.expire(timestamp - self.max_age_seconds)
+
+            results: List[Optional[Dict[str, float]]] = []
+            for j, value in enumerate(values):
+                n, mean, std = window.baseline(j)
+                if value != value or n < self.min_samples:
+                    results.append(None)
+                    continue
+                deviation = abs(value - mean)
+                z = deviation / std if std > 0 else 0.0
+                results.append({
+                    "mean": mean,
+                    "std": std,
+                    "z": z,
+                    "anomalous": z > z_threshold and deviation > threshold * abs(mean)
+                })
+
+            window.push(values, timestamp)
+            self.events += 1
+            return results
+
+    def reset(self) -> None:
+        with self._lock:
+            self._windows.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            groups = len(self._windows)
+            return {
+                "groups": groups,
+                "max_groups": self.max_groups,
+                "window_size": self.capacity,
+                "max_age_seconds": self.max_age_seconds,
+                "min_samples": self.min_samples,
+                "events": self.events,
+                "evicted_groups": self.evicted_groups,
+                # Ring buffers are preallocated: metric values plus one timestamp per row
+                "buffer_bytes": groups * self.capacity * (self.metrics + 1) * 8
+            }
@@ -0,0 +1,112 @@
+"""Multi-stop sequencing over a precomputed distance matrix.
+
+The solver treats the route as an open path with a fixed start (index 0) and
+a fixed end (index N-1): a nearest-neighbour construction followed by 2-opt
+and Or-opt local search, both evaluated with vectorized move deltas and
+stopped when the time budget runs out.
+"""
+import time
+
+import numpy as np
+
+IMPROVEMENT_EPS = 1e-9
+
+
+def nearest_neighbour_path(dist: np.ndarray) -> np.ndarray:
+    """Greedy construction from the start node, finishing at the end node"""
+    n = len(dist)
+    path = [0]
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[[0, n - 1]] = False
+
+    current = 0
+    for _ in range(n - 2):
+        candidates = np.where(unvisited, dist[current], np.inf)
+        current = int(np.argmin(candidates))
+        unvisited[current] = False
+        path.append(current)
+
+    path.append(n - 1)
+    return np.array(path, dtype=np.intp)
+
+
+def path_length(path: np.ndarray, dist: np.ndarray) -> float:
+    """Total length of a path through the matrix"""
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def _two_opt_pass(path: np.ndarray, dist: np.ndarray, deadline: float) -> bool:
+    """Apply the best segment reversal for every start position"""
+    improved = False
+    last = len(path) - 1
+    for i in range(1, last - 1):
+        if time.perf_counter() > deadline:
+            break
+        a, b = path[i - 1], path[i]
+        js = np.arange(i + 1, last)
+        c, d = path[js], path[js + 1]
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        k = int(np.argmin(delta))
+        if delta[k] < -IMPROVEMENT_EPS:
+            j = js[k]
+            path[i:j + 1] = path[i:j + 1][::-1].copy()
+            improved = True
+    return improved
+
+
+def _or_opt_pass(path: np.ndarray, dist: np.ndarray, deadline: float) -> bool:
+    """Relocate chains of 1-3 stops (optionally reversed) to their best gap"""
+    improved = False
+    for length in (1, 2, 3):
+        i = 1
+        while i + length <= len(path) - 1:
+            if time.perf_counter() > deadline:
+                return improved
+
+            segment = path[i:i + length].copy()
+            first, last = segment[0], segment[-1]
+            prev, nxt = path[i - 1], path[i + length]
+            removal_gain = dist[prev, first] + dist[last, nxt] - dist[prev, nxt]
+
+            rest = np.concatenate([path[:i], path[i + length:]])
+            u, v = rest[:-1], rest[1:]
+            forward = dist[u, first] + dist[last, v] - dist[u, v]
+            backward = dist[u, last] + dist[first, v] - dist[u, v]
+            # Putting the chain back where it came from is not a move
+            forward[i - 1] = np.inf
+
+            k_forward = int(np.argmin(forward))
+            k_backward = int(np.argmin(backward))
+            if forward[k_forward] <= backward[k_backward]:
+                k, cost, chain = k_forward, forward[k_forward], segment
+            else:
+                k, cost, chain = k_backward, backward[k_backward], segment[::-1]
+
+            if cost < removal_gain - IMPROVEMENT_EPS:
+                path[:] = np.concatenate([rest[:k + 1], chain, rest[k + 1:]])
+                improved = True
+            else:
+                i += 1
+    return improved
+
+
+def sequence_stops(dist: np.ndarray, time_budget: float = 0.05) -> np.ndarray:
+    """Order the stops of an open path from node 0 to node N-1.
+
+    Returns the visiting order as indices into the distance matrix. Local
+    search keeps running until no move improves the route or `time_budget`
+    seconds have elapsed, whichever comes first.
+    """
+    n = len(dist)
+    if n <= 3:
+        return np.arange(n, dtype=np.intp)
+
+    deadline = time.perf_counter() + time_budget
+    path = nearest_neighbour_path(dist)
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _two_opt_pass(path, dist, deadline)
+        improved = _or_opt_pass(path, dist, deadline) or improved
+
+    return path
@@ -0,0 +1,127 @@
+"""Response encoding with Accept negotiation.
+
+Pydantic models are written by pydantic-core directly. Other payloads, such
+as the columnar layouts, are encoded with orjson when it is installed (NumPy
+arrays and datetimes natively, no intermediate lists) and with the standard
+library otherwise.
+MessagePack is served to clients that ask for it. Endpoints hand payloads
+straight to `encoded_response`, bypassing FastAPI's response_model
+re-validation and jsonable_encoder pass.
+"""
+import json
+from datetime import date, datetime
+from types import ModuleType
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+RESPONSE_FORMATS = ("records", "columnar")
+
+
+def _plain(obj: Any) -> Any:
+    """Fallback conversion for values the encoders do not handle themselves"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not serializable: {type(obj).__name__}")
+
+
+def _accepted(accept: str) -> List[Tuple[float, str]]:
+    ranges = []
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((quality, media_type.strip().lower()))
+    return ranges
+
+
+def is_columnar(response_format: str) -> bool:
+    """Validate a `format` query parameter; True for the columnar layout"""
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{response_format}', expected one of: {', '.join(RESPONSE_FORMATS)}")
+    return response_format == "columnar"
+
+
+def msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick JSON or MessagePack for an Accept header; JSON unless MessagePack is preferred"""
+    if not accept:
+        return JSON_MEDIA_TYPE
+    best_quality, best = 0.0, JSON_MEDIA_TYPE
+    for quality, media_type in _accepted(accept):
+        if media_type in MSGPACK_ALIASES and quality > best_quality:
+            best_quality, best = quality, MSGPACK_MEDIA_TYPE
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*") and quality >= best_quality and quality > 0:
+            best_quality, best = quality, JSON_MEDIA_TYPE
+    if best == MSGPACK_MEDIA_TYPE and not msgpack_available():
+        raise HTTPException(status_code=406, detail="MessagePack responses are not available on this server")
+    return best
+
+
+def encode_json(payload: Any) -> bytes:
+    if isinstance(payload, BaseModel):
+        # pydantic-core writes JSON straight from the model, faster than dumping to dicts first
+        return payload.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(payload, default=_plain, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_plain, separators=(",", ":")).encode()
+
+
+def encode_msgpack(payload: Any) -> bytes:
+    import msgpack
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump()
+    return msgpack.packb(payload, default=_plain, use_bin_type=True)
+
+
+def _fields(obj: Any) -> Any:
+    # Models are walked field by field: much cheaper than model_dump on large request bodies
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    return _plain(obj)
+
+
+def canonical_json(payload: Any) -> bytes:
+    """Compact JSON with sorted keys: equal payloads give equal bytes whatever their key order"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_fields, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_fields, sort_keys=True, separators=(",", ":")).encode()
+
+
+def encoded_response(payload: Any, media_type: str = JSON_MEDIA_TYPE, status_code: int = 200) -> Response:
+    """Encode a payload (dict, pydantic model, NumPy arrays inside) for the negotiated media type"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return Response(encode_msgpack(payload), status_code=status_code, media_type=MSGPACK_MEDIA_TYPE)
+    return Response(encode_json(payload), status_code=status_code, media_type=JSON_MEDIA_TYPE)
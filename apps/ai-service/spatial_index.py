@@ -0,0 +1,318 @@
+"""Nearest-hub lookups over depots and cross-dock hubs.
+
+Hubs are indexed as unit vectors on the sphere in k-d trees: the straight
+chord between two unit vectors grows monotonically with their great-circle
+distance, so the trees' Euclidean neighbours are the true nearest hubs and a
+radius in km becomes a chord radius. Candidates are then measured exactly
+with the haversine formula.
+
+Hubs opening after the last full build go to a small insert buffer with a
+tree of its own (cheap to rebuild on every change), and closed hubs are
+tombstoned in place; the main tree is rebuilt once either grows past
+`rebuild_after`. Queries work on an immutable snapshot, so they never block
+updates and never see half of one.
+
+scipy is imported when the first tree is built, not at module import.
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from geo import EARTH_RADIUS_KM, haversine_km
+
+HUB_FIELDS = ("latitude", "longitude", "address", "city", "country", "hub_type")
+
+
+def unit_vectors(lats, lngs) -> np.ndarray:
+    """(n, 3) points on the unit sphere for latitudes and longitudes in degrees"""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def chord_length(distance_km: float) -> float:
+    """Straight-line distance through the unit sphere for a great-circle distance"""
+    angle = distance_km / EARTH_RADIUS_KM
+    if angle >= np.pi:
+        return 2.0
+    # A hair of slack so rounding never drops a hub that is exactly at the limit
+    return 2.0 * np.sin(angle / 2.0) * (1 + 1e-9) + 1e-12
+
+
+class TreePart(NamedTuple):
+    """Hubs under one k-d tree; tombstoned entries stay until the next build"""
+    tree: Any  # scipy cKDTree, None when empty
+    ids: np.ndarray
+    lat: np.ndarray
+    lng: np.ndarray
+    alive: np.ndarray
+    dead: int
+
+    @property
+    def live(self) -> int:
+        return len(self.ids) - self.dead
+
+
+def build_part(ids: List[str], lat: np.ndarray, lng: np.ndarray) -> TreePart:
+    tree = None
+    if ids:
+        from scipy.spatial import cKDTree
+        tree = cKDTree(unit_vectors(lat, lng))
+    return TreePart(tree, np.array(ids, dtype=object), lat, lng, np.ones(len(ids), dtype=bool), 0)
+
+
+def part_nearest(part: TreePart, points: np.ndarray, k: int, bound: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices of each point's k nearest live entries, widening the query for rows that hit tombstones"""
+    m = len(points)
+    n = len(part.ids)
+    # Most rows meet no tombstone: ask for a few spare slots, then re-query only the rows that came up short
+    k_query = min(k + min(part.dead, 4), n)
+    _, index = part.tree.query(points, k=k_query, distance_upper_bound=bound)
+    index = index.reshape(m, k_query)
+    while True:
+        found = index < n
+        live = found & part.alive[np.where(found, index, 0)]
+        short = np.flatnonzero((live.sum(axis=1) < k) & found.all(axis=1))
+        if k_query >= n or not len(short):
+            break
+        k_query = min(k_query * 4, n)
+        _, wider = part.tree.query(points[short], k=k_query, distance_upper_bound=bound)
+        widened = np.full((m, k_query), n)
+        widened[:, :index.shape[1]] = index
+        widened[short] = wider.reshape(len(short), k_query)
+        index = widened
+    return np.where(live, index, 0), live
+
+
+class _Snapshot(NamedTuple):
+    main: TreePart
+    buffer: TreePart  # hubs added since the last full build
+
+
+class HubIndex:
+    """Thread-safe k-nearest and radius queries over hub locations, persisted to one .npz file"""
+
+    def __init__(self, path: Optional[str] = None, rebuild_after: int = 256):
+        self.path = path
+        self.rebuild_after = rebuild_after
+        self._hubs: Dict[str, Dict[str, Any]] = {}
+        self._main_position: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._snapshot: _Snapshot
+        self.rebuilds = 0
+        with self._lock:
+            self._rebuild()
+
+    def load(self) -> int:
+        """Load persisted hubs if the file exists; returns the hub count"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+
+        with np.load(self.path, allow_pickle=False) as data:
+            ids = data["hub_ids"].tolist()
+            columns = {field: data[field].tolist() for field in HUB_FIELDS}
+
+        hubs = {
+            hub_id: {field: columns[field][i] for field in HUB_FIELDS}
+            for i, hub_id in enumerate(ids)
+        }
+        with self._lock:
+            self._hubs = hubs
+            self._rebuild()
+        return len(hubs)
+
+    def save(self) -> None:
+        """Write every hub to disk atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            ids = list(self._hubs)
+            hubs = [self._hubs[hub_id] for hub_id in ids]
+
+        columns: Dict[str, Any] = {
+            field: np.array([hub[field] for hub in hubs], dtype=float if field in ("latitude", "longitude") else str)
+            for field in HUB_FIELDS
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, hub_ids=np.array(ids, dtype=str), **columns)
+        os.replace(tmp_path, self.path)
+
+    def upsert(self, hubs: Iterable[Dict[str, Any]]) -> int:
+        """Open hubs or move existing ones; each dict has `hub_id` plus HUB_FIELDS"""
+        count = 0
+        with self._lock:
+            closed = []
+            for hub in hubs:
+                hub_id = hub["hub_id"]
+                if hub_id in self._main_position:
+                    closed.append(self._main_position.pop(hub_id))
+                self._hubs[hub_id] = {field: hub[field] for field in HUB_FIELDS}
+                count += 1
+            self._publish(closed)
+        return count
+
+    def remove(self, hub_ids: Iterable[str]) -> int:
+        """Close hubs; returns how many existed"""
+        removed = 0
+        with self._lock:
+            closed = []
+            for hub_id in hub_ids:
+                if self._hubs.pop(hub_id, None) is None:
+                    continue
+                removed += 1
+                if hub_id in self._main_position:
+                    closed.append(self._main_position.pop(hub_id))
+            self._publish(closed)
+        return removed
+
+    def get(self, hub_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hub = self._hubs.get(hub_id)
+            return None if hub is None else {"hub_id": hub_id, **hub}
+
+    def __len__(self) -> int:
+        return len(self._hubs)
+
+    def coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of every hub"""
+        with self._lock:
+            hubs = list(self._hubs.values())
+        return (
+            np.array([hub["latitude"] for hub in hubs], dtype=float),
+            np.array([hub["longitude"] for hub in hubs], dtype=float)
+        )
+
+    def _publish(self, closed: List[int]) -> None:
+        # Called with the lock held once _hubs and _main_position reflect the change
+        main = self._snapshot.main
+        if closed:
+            alive = main.alive.copy()
+            alive[closed] = False
+            main = main._replace(alive=alive, dead=int(len(alive) - alive.sum()))
+        buffered = [hub_id for hub_id in self._hubs if hub_id not in self._main_position]
+        if len(buffered) > self.rebuild_after or main.dead > max(self.rebuild_after, len(main.ids) // 4):
+            self._rebuild()
+            return
+        buffer = build_part(
+            buffered,
+            np.array([self._hubs[hub_id]["latitude"] for hub_id in buffered], dtype=float),
+            np.array([self._hubs[hub_id]["longitude"] for hub_id in buffered], dtype=float)
+        )
+        self._snapshot = _Snapshot(main, buffer)
+
+    def _rebuild(self) -> None:
+        # Called with the lock held: index every hub in the main tree, empty the buffer
+        ids = list(self._hubs)
+        main = build_part(
+            ids,
+            np.array([self._hubs[hub_id]["latitude"] for hub_id in ids], dtype=float),
+            np.array([self._hubs[hub_id]["longitude"] for hub_id in ids], dtype=float)
+        )
+        self._main_position = {hub_id: i for i, hub_id in enumerate(ids)}
+        self._snapshot = _Snapshot(main, build_part([], np.empty(0), np.empty(0)))
+        self.rebuilds += 1
+
+    def stats(self) -> Dict[str, int]:
+        snapshot = self._snapshot
+        return {
+            "hubs": snapshot.main.live + snapshot.buffer.live,
+            "indexed": snapshot.main.live,
+            "buffered": snapshot.buffer.live,
+            "tombstoned": snapshot.main.dead,
+            "rebuilds": self.rebuilds
+        }
+
+    def nearest(self, lats, lngs, k: int = 1, max_distance_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """The k nearest hubs of each point, nearest first.
+
+        Returns (m, k) hub ids and distances in km; slots without a hub (fewer
+        than k hubs, or none within `max_distance_km`) hold None and NaN.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        m = len(lats)
+        points = unit_vectors(lats, lngs)
+        bound = np.inf if max_distance_km is None else chord_length(max_distance_km)
+
+        candidate_ids, candidate_distance = [], []
+        for part in self._snapshot:
+            if part.live == 0:
+                continue
+            index, valid = part_nearest(part, points, k, bound)
+            distance = haversine_km(lats[:, None], lngs[:, None], part.lat[index], part.lng[index])
+            if max_distance_km is not None:
+                valid &= distance <= max_distance_km
+            candidate_ids.append(part.ids[index])
+            candidate_distance.append(np.where(valid, distance, np.inf))
+
+        ids = np.full((m, k), None, dtype=object)
+        distances = np.full((m, k), np.nan)
+        if not candidate_ids:
+            return ids, distances
+
+        cand_ids = np.concatenate(candidate_ids, axis=1)
+        distance = np.concatenate(candidate_distance, axis=1)
+        width = min(k, distance.shape[1])
+        order = np.argsort(distance, axis=1, kind="stable")[:, :width]
+        best = np.take_along_axis(distance, order, axis=1)
+        hit = np.isfinite(best)
+        nearest_ids = np.take_along_axis(cand_ids, order, axis=1)
+        nearest_ids[~hit] = None
+        ids[:, :width] = nearest_ids
+        distances[:, :width] = np.where(hit, best, np.nan)
+        return ids, distances
+
+    def within(self, lats, lngs, radius_km: float, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every hub within `radius_km` of each point, nearest first.
+
+        Returns flat hub ids and distances plus (m + 1) offsets: the hubs of
+        point i are entries offsets[i]:offsets[i + 1]. `limit` caps the hubs
+        kept per point.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        m = len(lats)
+        points = unit_vectors(lats, lngs)
+
+        rows = [np.array([], dtype=np.intp)]
+        hub_ids = [np.array([], dtype=object)]
+        distances = [np.array([], dtype=float)]
+        for part in self._snapshot:
+            if part.live == 0:
+                continue
+            matches = part.tree.query_ball_point(points, chord_length(radius_km), return_sorted=False)
+            counts = np.fromiter((len(match) for match in matches), dtype=np.intp, count=m)
+            index = np.fromiter((i for match in matches for i in match), dtype=np.intp, count=int(counts.sum()))
+            row = np.repeat(np.arange(m), counts)
+            keep = part.alive[index]
+            row, index = row[keep], index[keep]
+            distance = haversine_km(lats[row], lngs[row], part.lat[index], part.lng[index])
+            inside = distance <= radius_km
+            rows.append(row[inside])
+            hub_ids.append(part.ids[index[inside]])
+            distances.append(distance[inside])
+
+        row = np.concatenate(rows)
+        hub_id = np.concatenate(hub_ids)
+        distance = np.concatenate(distances)
+        order = np.lexsort((distance, row))
+        row, hub_id, distance = row[order], hub_id[order], distance[order]
+        offsets = np.searchsorted(row, np.arange(m + 1))
+        if limit is not None:
+            keep = np.arange(len(row)) - offsets[row] < limit
+            row, hub_id, distance = row[keep], hub_id[keep], distance[keep]
+            offsets = np.searchsorted(row, np.arange(m + 1))
+        return hub_id, distance, offsets
+
+
+def group_offsets(values: np.ndarray, offsets: np.ndarray) -> List[list]:
+    """Split a flat array into per-point lists using `within` offsets"""
+    flat = values.tolist()
+    return [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
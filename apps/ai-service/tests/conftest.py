@@ -0,0 +1,30 @@
+"""Shared fixtures: the app runs against state in a temporary directory.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Same isolation as the benchmark runner: stored models, hubs and history stay out of the working tree
+STATE_DIR = tempfile.mkdtemp(prefix="ai-tests-")
+os.environ.setdefault("FORECAST_REGISTRY_PATH", os.path.join(STATE_DIR, "registry.npz"))
+os.environ.setdefault("HUB_INDEX_PATH", os.path.join(STATE_DIR, "hubs.npz"))
+os.environ.setdefault("HISTORY_STORE_PATH", os.path.join(STATE_DIR, "history"))
+os.environ.setdefault("ROAD_GRAPH_PATH", os.path.join(STATE_DIR, "road_graph.npz"))
+os.environ.setdefault("AI_WARMUP", "lazy")
+os.environ.setdefault("COALESCE_TTL_SECONDS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
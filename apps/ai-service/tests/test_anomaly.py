@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def test_series_anomalies_columnar_matches_records(client):
+    days = np.arange("2024-01-01", "2024-03-01", dtype="datetime64[D]")
+    volumes = np.full(len(days), 100.0)
+    volumes[[10, 40]] = [400.0, 5.0]
+    body = {"dates": [str(day) for day in days], "volumes": volumes.tolist()}
+    assert client.post("/api/history/anomaly-series/observations", json=body).status_code == 200
+
+    request = {"series_id": "anomaly-series", "threshold": 0.5}
+    records = client.post("/api/detect-anomalies", json=request)
+    columns = client.post("/api/detect-anomalies", params={"format": "columnar"}, json=request)
+    assert records.status_code == columns.status_code == 200
+    anomalies = records.json()["anomalies"]
+    assert [a["date"] for a in anomalies] == columns.json()["anomalies"]["date"] == ["2024-01-11", "2024-02-10"]
+    assert columns.json()["total_shipments"] == records.json()["total_shipments"] == len(days)
+    assert columns.json()["recommendations"] == records.json()["recommendations"]
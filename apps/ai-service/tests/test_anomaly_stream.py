@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks import generators
+
+
+def stream_report(client, shipments, **params):
+    body = "".join(json.dumps(s) + "\n" for s in shipments)
+    response = client.post("/api/detect-anomalies/stream", params=params, content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return lines[:-1], lines[-1]
+
+
+@pytest.mark.parametrize("threshold, z_threshold", [(0.1, 2.0), (0.5, 2.0), (3.0, 2.0), (0.1, 3.0), (0.0, 1.0)])
+def test_stream_matches_json_endpoint(client, threshold, z_threshold):
+    shipments = generators.shipments(np.random.default_rng(7), 300, anomaly_rate=0.05)
+    # Some shipments lack a metric, which neither endpoint may flag
+    for shipment in shipments[::17]:
+        del shipment["route"]
+
+    response = client.post("/api/detect-anomalies", json={"shipment_data": shipments, "threshold": threshold, "z_threshold": z_threshold})
+    assert response.status_code == 200
+    expected = response.json()
+
+    streamed, summary = stream_report(client, shipments, threshold=threshold, z_threshold=z_threshold)
+
+    def order(anomaly):
+        return anomaly["shipment_index"], anomaly["metric"]
+
+    streamed, expected_anomalies = sorted(streamed, key=order), sorted(expected["anomalies"], key=order)
+    # Delays come from datetime and datetime64 arithmetic respectively, equal up to rounding
+    assert [a["value"] for a in streamed] == pytest.approx([a["value"] for a in expected_anomalies])
+    assert [{**a, "value": None} for a in streamed] == [{**a, "value": None} for a in expected_anomalies]
+    assert summary["anomaly_count"] == len(expected["anomalies"])
+    assert summary["anomaly_rate"] == expected["anomaly_rate"]
+    assert summary["recommendations"] == expected["recommendations"]
+
+
+def test_stream_rejects_robust_method(client):
+    response = client.post("/api/detect-anomalies/stream", params={"method": "robust"}, content=b"{}\n")
+    assert response.status_code == 400
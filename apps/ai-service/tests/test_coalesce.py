@@ -0,0 +1,128 @@
+import asyncio
+
+import coalesce
+from coalesce import RequestCoalescer
+
+
+class Counter:
+    """A compute function that counts its calls and can be held open"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {"call": self.calls}
+
+
+def test_concurrent_duplicates_share_one_computation():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=0)
+        compute = Counter()
+        compute.release = asyncio.Event()
+        callers = [asyncio.ensure_future(coalescer.run("op", {"a": 1}, compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        results = await asyncio.gather(*callers)
+        return coalescer, compute, results
+
+    coalescer, compute, results = asyncio.run(scenario())
+    assert compute.calls == 1
+    assert all(result is results[0] for result in results)
+    counts = coalescer.stats()["operations"]["op"]
+    assert counts["computed"] == 1 and counts["coalesced"] == 4
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=0)
+        compute = Counter()
+        compute.release = asyncio.Event()
+        leader = asyncio.ensure_future(coalescer.run("op", {"a": 1}, compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(coalescer.run("op", {"a": 1}, compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        compute.release.set()
+        return await follower, compute.calls
+
+    assert asyncio.run(scenario()) == ({"call": 1}, 1)
+
+
+def test_memo_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(coalesce.time, "monotonic", lambda: now[0])
+
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=10)
+        compute = Counter()
+        first = await coalescer.run("op", {"a": 1}, compute)
+        now[0] += 5
+        assert await coalescer.run("op", {"a": 1}, compute) is first
+        now[0] += 6
+        assert await coalescer.run("op", {"a": 1}, compute) == {"call": 2}
+        return coalescer
+
+    coalescer = asyncio.run(scenario())
+    assert coalescer.expirations == 1
+    assert coalescer.stats()["operations"]["op"]["memo_hit"] == 1
+
+
+def test_memo_evicts_least_recently_used():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60, max_entries=2)
+        compute = Counter()
+        await coalescer.run("op", {"key": "a"}, compute)
+        await coalescer.run("op", {"key": "b"}, compute)
+        await coalescer.run("op", {"key": "a"}, compute)  # a is now the most recent
+        await coalescer.run("op", {"key": "c"}, compute)  # evicts b
+        calls = compute.calls
+        await coalescer.run("op", {"key": "a"}, compute)
+        await coalescer.run("op", {"key": "b"}, compute)
+        return coalescer, calls, compute.calls
+
+    coalescer, calls_before, calls_after = asyncio.run(scenario())
+    assert calls_before == 3
+    assert calls_after == 4  # a was memoized, b was recomputed
+    assert coalescer.evictions == 2
+
+
+def test_failures_are_shared_but_not_memoized():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        compute = Counter(error=ValueError("boom"))
+        compute.release = asyncio.Event()
+        callers = [asyncio.ensure_future(coalescer.run("op", {"a": 1}, compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        outcomes = await asyncio.gather(*callers, return_exceptions=True)
+        assert compute.calls == 1
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+        compute.error = None
+        compute.release = None
+        result = await coalescer.run("op", {"a": 1}, compute)
+        return coalescer, compute, result
+
+    coalescer, compute, result = asyncio.run(scenario())
+    assert compute.calls == 2 and result == {"call": 2}
+    assert coalescer.stats()["memo_entries"] == 1
+
+
+def test_operations_are_keyed_separately():
+    async def scenario():
+        coalescer = RequestCoalescer(ttl_seconds=60)
+        compute = Counter()
+        await coalescer.run("forecast", {"a": 1}, compute)
+        await coalescer.run("anomalies", {"a": 1}, compute)
+        return compute.calls
+
+    assert asyncio.run(scenario()) == 2
+    assert coalesce.request_key("op", {"a": 1, "b": 2}) == coalesce.request_key("op", {"b": 2, "a": 1})
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from executor import BoundedExecutor
+
+
+def fail(status_code: int) -> None:
+    raise HTTPException(status_code=status_code, detail="nope")
+
+
+def boom() -> None:
+    raise RuntimeError("boom")
+
+
+def test_successes_and_failures_are_counted_apart():
+    executor = BoundedExecutor(max_workers=2, max_queue=2)
+
+    async def scenario():
+        assert await executor.run(sum, [1, 2, 3]) == 6
+        with pytest.raises(HTTPException) as raised:
+            await executor.run(fail, 404)
+        assert raised.value.status_code == 404
+        with pytest.raises(RuntimeError):
+            await executor.run(boom)
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    stats = executor.stats()
+    assert (stats["completed"], stats["failed"], stats["rejected"], stats["in_flight"]) == (1, 2, 0, 0)
+
+
+def test_rejects_beyond_workers_and_queue():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as raised:
+            await executor.run(sum, [1])
+        assert raised.value.status_code == 429
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(scenario())
+    executor.shutdown()
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["completed"] == 2
@@ -0,0 +1,73 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import main
+
+from test_forecasting import history
+
+
+def columns(num_series: int, days: int = 60):
+    series_ids, dates, volumes = [], [], []
+    for k in range(num_series):
+        for item in history()[:days]:
+            series_ids.append(f"lane-{k}")
+            dates.append(item["date"])
+            volumes.append(item["volume"] + k)
+    return {"series_ids": series_ids, "dates": dates, "volumes": volumes, "forecast_horizon": 7}
+
+
+def by_series(body):
+    return {f["series_id"]: f for f in body["forecasts"]}
+
+
+def test_sharded_batch_matches_single_shard(client, monkeypatch):
+    request = columns(6)
+    single = client.post("/api/forecast-demand/batch", json=request)
+    monkeypatch.setattr(main, "FORECAST_BATCH_SHARD_SIZE", 1)
+    assert len(main.shard_forecast_batch(main.BatchForecastRequest(**request), 4)) == 4
+    sharded = client.post("/api/forecast-demand/batch", json=request)
+    assert single.status_code == sharded.status_code == 200
+    expected, actual = by_series(single.json()), by_series(sharded.json())
+    assert sorted(actual) == [f"lane-{k}" for k in range(6)]
+    for series_id, forecast in expected.items():
+        assert actual[series_id]["predicted_volume"] == pytest.approx(forecast["predicted_volume"])
+        assert actual[series_id]["model_metrics"] == pytest.approx(forecast["model_metrics"])
+
+
+def test_empty_batch(client):
+    response = client.post("/api/forecast-demand/batch", json={"forecast_horizon": 7})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["forecasts"] == [] and body["skipped_series"] == []
+
+
+def test_all_series_skipped(client):
+    response = client.post("/api/forecast-demand/batch", json=columns(3, days=5))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["forecasts"] == []
+    assert sorted(body["skipped_series"]) == ["lane-0", "lane-1", "lane-2"]
+
+
+def test_failed_shard_cancels_siblings():
+    cancelled = []
+
+    async def slow(k):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(k)
+            raise
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("shard failed")
+
+    async def scenario():
+        with pytest.raises(ValueError, match="shard failed"):
+            await main.gather_shards([slow(0), failing(), slow(2)])
+
+    asyncio.run(scenario())
+    assert sorted(cancelled) == [0, 2]
@@ -0,0 +1,30 @@
+import numpy as np
+
+from forecasting import parse_dates
+
+
+def history(offset: str = ""):
+    days = np.arange("2022-01-01", "2022-03-02", dtype="datetime64[D]")
+    volumes = 100 + 20 * ((days.astype(np.int64) + 3) % 7 >= 5)
+    return [{"date": f"{day}T00:00:00{offset}", "volume": float(volume)} for day, volume in zip(days, volumes)]
+
+
+def test_parse_dates_keeps_local_time_of_offset_dates():
+    parsed = parse_dates(["2022-01-01T00:00:00+02:00", "2022-01-02T23:30:00Z", "2022-01-03T01:00:00-05:00", "2022-01-04"])
+    expected = np.array(["2022-01-01T00:00", "2022-01-02T23:30", "2022-01-03T01:00", "2022-01-04T00:00"], dtype="datetime64[us]")
+    np.testing.assert_array_equal(parsed, expected)
+
+
+def test_parse_dates_plain_dates():
+    parsed = parse_dates(["2022-01-01", "2022-01-02T05:00:00", "2022-01-03 06:30"])
+    expected = np.array(["2022-01-01T00:00", "2022-01-02T05:00", "2022-01-03T06:30"], dtype="datetime64[us]")
+    np.testing.assert_array_equal(parsed, expected)
+
+
+def test_forecast_ignores_utc_offsets(client):
+    plain = client.post("/api/forecast-demand", json={"historical_data": history(), "forecast_horizon": 14})
+    shifted = client.post("/api/forecast-demand", json={"historical_data": history("+02:00"), "forecast_horizon": 14})
+    assert plain.status_code == shifted.status_code == 200
+    # Horizon dates start from the current time, so compare everything else
+    for expected, actual in zip(plain.json()["predictions"], shifted.json()["predictions"]):
+        assert {**expected, "date": None} == {**actual, "date": None}
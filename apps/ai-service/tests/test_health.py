@@ -0,0 +1,26 @@
+import main
+
+
+def test_lazy_mode_is_ready_before_subsystems_load(client, monkeypatch):
+    # The test app runs with AI_WARMUP=lazy, so nothing is warmed ahead of traffic
+    assert main.ai_service.subsystems.warmup_state == "disabled"
+    monkeypatch.setattr(main.ai_service.subsystems["hub_assignment"], "state", "cold")
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+    assert response.json()["ai_models"]["hub_assignment"]["state"] == "cold"
+
+
+def test_lazy_mode_reports_failed_subsystems(client, monkeypatch):
+    monkeypatch.setattr(main.ai_service.subsystems["hub_assignment"], "state", "failed")
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "degraded"
+
+
+def test_background_mode_waits_for_warmup(client, monkeypatch):
+    monkeypatch.setattr(main.ai_service.subsystems, "warmup_state", "running")
+    monkeypatch.setattr(main.ai_service.subsystems["hub_assignment"], "state", "warming")
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming"
@@ -0,0 +1,56 @@
+import numpy as np
+
+from history_store import HistoryStore
+
+
+def days(start: str, n: int) -> np.ndarray:
+    return np.arange(np.datetime64(start), np.datetime64(start) + n)
+
+
+def test_read_range_and_backfill(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append("lane", days("2024-01-05", 5), np.arange(5.0))
+    summary = store.append("lane", days("2024-01-01", 6), np.full(6, 9.0))
+    assert summary == {"series_id": "lane", "observations": 9, "first_date": "2024-01-01", "last_date": "2024-01-09"}
+    assert store.rewrites == 1
+
+    dates, volumes = store.read("lane", np.datetime64("2024-01-05"), np.datetime64("2024-01-07"))
+    assert dates.astype(str).tolist() == ["2024-01-05", "2024-01-06", "2024-01-07"]
+    assert volumes.tolist() == [9.0, 9.0, 2.0]  # the backfill wins for the days it repeats
+    assert store.read("missing") is None
+
+
+def test_maps_are_bounded_lru(tmp_path):
+    store = HistoryStore(str(tmp_path), max_mapped=2)
+    for name in ("a", "b", "c"):
+        store.append(name, days("2024-01-01", 3), np.ones(3))
+    held, _ = store.read("a")
+    store.read("b")
+    store.read("a")  # a is now the most recently used
+    store.read("c")
+    assert list(store._mapped) == ["a", "c"]
+    assert store.stats()["mapped_series"] == 2 and store.unmapped > 0
+    # An evicted map stays readable for whoever still holds it
+    assert held.astype(str).tolist() == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def test_series_ids_with_slashes(client):
+    body = {"dates": ["2024-01-01", "2024-01-02"], "volumes": [1.0, 2.0]}
+    response = client.post("/api/history/DE/BER-PL/WAW/observations", json=body)
+    assert response.status_code == 200
+    assert response.json()["series_id"] == "DE/BER-PL/WAW"
+    assert "DE/BER-PL/WAW" in [series["series_id"] for series in client.get("/api/history").json()["series"]]
+
+    stored = client.get("/api/history/DE/BER-PL/WAW")
+    assert stored.status_code == 200
+    assert [item["volume"] for item in stored.json()["observations"]] == [1.0, 2.0]
+    assert client.delete("/api/history/DE/BER-PL/WAW").status_code == 200
+    assert client.get("/api/history/DE/BER-PL/WAW").status_code == 404
+
+
+def test_model_ids_with_slashes(client):
+    observations = [{"date": f"2024-01-{day:02d}", "volume": 100 + day % 7} for day in range(1, 15)]
+    assert client.post("/api/forecast-models/DE/BER/observations", json={"observations": observations}).status_code == 200
+    forecast = client.get("/api/forecast-models/DE/BER/forecast", params={"horizon": 3})
+    assert forecast.status_code == 200 and len(forecast.json()["predictions"]) == 3
+    assert client.delete("/api/forecast-models/DE/BER").status_code == 200
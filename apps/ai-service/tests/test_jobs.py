@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import jobs
+from jobs import JobQueue
+from test_forecasting import history
+
+
+def recorder(order, name, gate=None):
+    async def run(job):
+        if gate is not None:
+            await gate.wait()
+        order.append(name)
+        return name
+    return run
+
+
+async def settle(*jobs_to_wait):
+    for _ in range(100):
+        if all(job.finished for job in jobs_to_wait):
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("jobs did not finish")
+
+
+def test_higher_priority_first_then_fifo():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        order = []
+        submitted = [
+            await queue.submit("op", recorder(order, name), priority)
+            for name, priority in (("a", 0), ("b", 5), ("c", 0), ("d", 5), ("e", -1))
+        ]
+        assert [queue.position(job) for job in submitted] == [2, 0, 3, 1, 4]
+        queue.start()
+        await settle(*submitted)
+        await queue.stop()
+        return order
+
+    assert asyncio.run(scenario()) == ["b", "d", "a", "c", "e"]
+
+
+def test_full_queue_rejects_with_429():
+    async def scenario():
+        queue = JobQueue(max_queue=2)
+        order = []
+        await queue.submit("op", recorder(order, "a"))
+        await queue.submit("op", recorder(order, "b"))
+        with pytest.raises(HTTPException) as rejected:
+            await queue.submit("op", recorder(order, "c"))
+        return queue, rejected.value
+
+    queue, error = asyncio.run(scenario())
+    assert error.status_code == 429 and error.headers["Retry-After"]
+    assert queue.stats()["rejected"] == 1 and queue.stats()["submitted"] == 2
+
+
+def test_cancel_queued_job_frees_its_slot():
+    async def scenario():
+        queue = JobQueue(workers=1, max_queue=1)
+        order = []
+        queued = await queue.submit("op", recorder(order, "cancelled"))
+        queue.cancel(queued.job_id)
+        assert queued.state == "cancelled" and queue.position(queued) is None
+        kept = await queue.submit("op", recorder(order, "kept"))
+        queue.start()
+        await settle(kept)
+        await queue.stop()
+        return queue, order
+
+    queue, order = asyncio.run(scenario())
+    assert order == ["kept"]
+    assert queue.stats()["finished"] == {"succeeded": 1, "failed": 0, "cancelled": 1}
+
+
+def test_cancel_running_job():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        order = []
+        never = asyncio.Event()
+        running = await queue.submit("op", recorder(order, "running", never))
+        after = await queue.submit("op", recorder(order, "after"))
+        queue.start()
+        for _ in range(100):
+            if running.state == "running":
+                break
+            await asyncio.sleep(0)
+        queue.cancel(running.job_id)
+        await settle(running, after)
+        await queue.stop()
+        return running, order
+
+    running, order = asyncio.run(scenario())
+    assert running.state == "cancelled" and running.result is None
+    # The worker survives the cancellation and moves on
+    assert order == ["after"]
+
+
+def test_failed_job_keeps_its_error():
+    async def fail(job):
+        raise HTTPException(status_code=400, detail="bad payload")
+
+    async def scenario():
+        queue = JobQueue()
+        job = await queue.submit("op", fail)
+        queue.start()
+        await settle(job)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.state == "failed" and job.error == {"status_code": 400, "detail": "bad payload"}
+
+
+def test_finished_jobs_expire_by_ttl_and_count(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: now[0])
+
+    async def scenario():
+        queue = JobQueue(result_ttl_seconds=60, max_results=2)
+        order = []
+        finished = []
+        queue.start()
+        for name in ("a", "b", "c"):
+            job = await queue.submit("op", recorder(order, name))
+            await settle(job)
+            finished.append(job)
+            now[0] += 10
+        # Only the newest max_results jobs are kept
+        assert [queue.get(job.job_id) for job in finished] == [None, finished[1], finished[2]]
+        now[0] += 45
+        assert queue.get(finished[1].job_id) is None and queue.get(finished[2].job_id) is finished[2]
+        now[0] += 10
+        assert queue.get(finished[2].job_id) is None
+        await queue.stop()
+        return queue
+
+    assert asyncio.run(scenario()).expired == 3
+
+
+def test_job_endpoints_round_trip(client):
+    response = client.post("/api/jobs", json={"operation": "forecast_demand", "payload": {"historical_data": history(), "forecast_horizon": 7}})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    deadline = time.monotonic() + 10
+    while True:
+        result = client.get(f"/api/jobs/{job_id}/result")
+        if result.status_code != 202 or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert result.status_code == 200
+    assert len(result.json()["predictions"]) == 7
+    assert client.delete(f"/api/jobs/{job_id}").json() == {"discarded": job_id}
+    assert client.get(f"/api/jobs/{job_id}").status_code == 404
+
+    assert client.post("/api/jobs", json={"operation": "nope", "payload": {}}).status_code == 400
+    assert client.post("/api/jobs", json={"operation": "forecast_demand", "payload": {"forecast_horizon": "x"}}).status_code == 422
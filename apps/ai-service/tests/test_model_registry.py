@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+
+from model_registry import ForecastModelRegistry
+
+
+def days(start: str, n: int) -> np.ndarray:
+    return np.arange(np.datetime64(start), np.datetime64(start) + n).astype("datetime64[us]")
+
+
+def test_concurrent_saves_persist_every_series(tmp_path):
+    path = str(tmp_path / "registry.npz")
+    registry = ForecastModelRegistry(path)
+
+    def worker(i: int) -> None:
+        registry.append(f"series-{i}", days("2024-01-01", 30), np.full(30, float(i)))
+        registry.save()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = ForecastModelRegistry(path)
+    assert reloaded.load() == 16
+    assert reloaded.get("series-7").n == 30
+    np.testing.assert_allclose(reloaded.get("series-7").mean[-1], 7.0)
+
+
+def test_save_skips_unchanged_registry(tmp_path):
+    registry = ForecastModelRegistry(str(tmp_path / "registry.npz"))
+    registry.save()
+    assert not (tmp_path / "registry.npz").exists()
+
+    registry.append("a", days("2024-01-01", 7), np.ones(7))
+    registry.save()
+    stamp = (tmp_path / "registry.npz").stat().st_mtime_ns
+    registry.save()
+    assert (tmp_path / "registry.npz").stat().st_mtime_ns == stamp
+
+
+def test_get_returns_a_snapshot(tmp_path):
+    registry = ForecastModelRegistry(str(tmp_path / "registry.npz"))
+    registry.append("a", days("2024-01-01", 7), np.ones(7))
+    snapshot = registry.get("a")
+    registry.append("a", days("2024-01-08", 7), np.full(7, 3.0))
+    assert snapshot.n == 7
+    np.testing.assert_allclose(snapshot.mean[-1], 1.0)
+    assert registry.get("a").n == 14
+
+
+def test_save_soon_batches_writes(tmp_path):
+    path = tmp_path / "registry.npz"
+    registry = ForecastModelRegistry(str(path), save_interval=60.0)
+    registry.append("a", days("2024-01-01", 7), np.ones(7))
+    registry.save_soon()
+    assert path.exists()
+    stamp = path.stat().st_mtime_ns
+
+    # Within the interval the next change waits for a deferred write
+    registry.append("b", days("2024-01-01", 7), np.ones(7))
+    registry.save_soon()
+    assert path.stat().st_mtime_ns == stamp
+
+    registry.close()
+    reloaded = ForecastModelRegistry(str(path))
+    assert reloaded.load() == 2
+
+
+def test_append_rejects_invalid_dates(client):
+    response = client.post("/api/forecast-models/bad-dates/observations", json={"observations": [{"date": "not a date", "volume": 10}]})
+    assert response.status_code == 400
+
+
+def test_append_and_delete_model(client):
+    observations = [{"date": f"2024-01-{day:02d}", "volume": 100 + day} for day in range(1, 15)]
+    response = client.post("/api/forecast-models/roundtrip/observations", json={"observations": observations})
+    assert response.status_code == 200
+    assert response.json()["observations"] == 14
+
+    assert client.delete("/api/forecast-models/roundtrip").status_code == 200
+    assert client.delete("/api/forecast-models/roundtrip").status_code == 404
+
+
+def test_model_forecast_interval_options(client):
+    observations = [{"date": f"2024-01-{day:02d}", "volume": 100 + day % 7} for day in range(1, 29)]
+    assert client.post("/api/forecast-models/intervals/observations", json={"observations": observations}).status_code == 200
+
+    params = {"horizon": 7, "confidence_level": 0.9}
+    first = client.get("/api/forecast-models/intervals/forecast", params=params)
+    assert first.status_code == 200
+    intervals = first.json()["confidence_intervals"]
+    assert all(interval["confidence_level"] == 0.9 for interval in intervals)
+
+    # Validated like ForecastRequest; bootstrap needs observations a stored model does not keep
+    assert client.get("/api/forecast-models/intervals/forecast", params={"confidence_level": 1.5}).status_code == 400
+    bootstrap = client.get("/api/forecast-models/intervals/forecast", params={"interval_method": "bootstrap"})
+    assert bootstrap.status_code == 400
+    assert "observations" in bootstrap.json()["detail"]
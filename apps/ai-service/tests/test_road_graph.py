@@ -0,0 +1,168 @@
+import threading
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+import road_graph
+from geo import haversine_km
+from road_graph import METRICS, RoadGraph, RoadRouter
+
+
+def grid_graph(side: int = 30, seed: int = 0) -> RoadGraph:
+    """Side x side grid about 1 km apart with random detours, speeds and one-way streets"""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(side * side), side)
+    lat, lng = 50 + rows * 0.009, 8 + cols * 0.014
+    ids = np.arange(side * side).reshape(side, side)
+    source = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    target = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    crow = haversine_km(lat[source], lng[source], lat[target], lng[target])
+    return RoadGraph.from_edges(
+        lat, lng, source, target,
+        crow * rng.uniform(1.0, 1.6, len(source)),
+        rng.uniform(30, 120, len(source)),
+        rng.uniform(0.7, 1.5, len(source)),
+        rng.random(len(source)) < 0.1
+    )
+
+
+def reference(graph: RoadGraph, metric: str, sources) -> np.ndarray:
+    # The grid has no parallel edges, so every entry is a single edge
+    n = graph.num_nodes
+    matrix = csr_matrix((graph.weights[metric], (graph.source, graph.target)), shape=(n, n))
+    return dijkstra(matrix, directed=True, indices=sources)
+
+
+def check_path(graph: RoadGraph, route, metric: str) -> None:
+    """Consecutive nodes are joined by edges whose sums give the route's totals"""
+    keys = {(s, t): e for e, (s, t) in enumerate(zip(graph.source.tolist(), graph.target.tolist()))}
+    edges = [keys[(u, v)] for u, v in zip(route.nodes[:-1].tolist(), route.nodes[1:].tolist())]
+    expected = graph.route_of(int(route.nodes[0]), edges, metric)
+    assert route.cost == pytest.approx(expected.cost)
+    assert route.length_km == pytest.approx(expected.length_km)
+    assert route.time_h == pytest.approx(expected.time_h)
+    assert route.emissions_km == pytest.approx(expected.emissions_km)
+
+
+@pytest.mark.parametrize("metric", METRICS)
+def test_shortest_path_matches_dijkstra(metric):
+    graph = grid_graph()
+    rng = np.random.default_rng(1)
+    sources = rng.integers(0, graph.num_nodes, 20)
+    targets = rng.integers(0, graph.num_nodes, 20)
+    expected = reference(graph, metric, sources)
+    for row, (source, target) in enumerate(zip(sources.tolist(), targets.tolist())):
+        route = graph.shortest_path(source, target, metric)
+        if np.isinf(expected[row, target]):
+            assert route is None
+            continue
+        assert route.cost == pytest.approx(expected[row, target], rel=1e-9)
+        assert route.nodes[0] == source and route.nodes[-1] == target
+        check_path(graph, route, metric)
+
+
+@pytest.mark.parametrize("metric", METRICS)
+def test_table_matches_dijkstra(metric, monkeypatch):
+    # Several sources per block, and a last block that is not full
+    monkeypatch.setattr(road_graph, "TABLE_BLOCK_CELLS", 7 * 900)
+    graph = grid_graph()
+    nodes = np.random.default_rng(2).choice(graph.num_nodes, 25, replace=False)
+    table = graph.table(nodes, metric)
+    np.testing.assert_allclose(table.cost, reference(graph, metric, nodes)[:, nodes], rtol=1e-9)
+    for i in range(len(nodes)):
+        for j in range(len(nodes)):
+            route = graph.table_route(table, i, j)
+            if np.isinf(table.cost[i, j]):
+                assert route is None
+                continue
+            assert route.nodes[0] == nodes[i] and route.nodes[-1] == nodes[j]
+            check_path(graph, route, metric)
+
+
+def test_table_over_path_budget_searches_paths():
+    graph = grid_graph()
+    nodes = np.arange(0, graph.num_nodes, 97)
+    full = graph.table(nodes, "time")
+    compact = graph.table(nodes, "time", max_path_nodes=0)
+    assert compact.path_nodes is None
+    np.testing.assert_array_equal(compact.cost, full.cost)
+    route = graph.table_route(compact, 0, len(nodes) - 1)
+    assert route.cost == pytest.approx(full.cost[0, -1])
+
+
+@pytest.mark.parametrize("detour", [road_graph.STOP_SEARCH_DETOUR, 0.1])
+def test_limited_stop_table_is_exact(detour, monkeypatch):
+    # A detour too small to reach every stop falls back to full searches
+    monkeypatch.setattr(road_graph, "STOP_SEARCH_DETOUR", detour)
+    graph = grid_graph()
+    router = RoadRouter(graph)
+    lats, lngs = graph.lat[[5, 140, 333, 870]], graph.lng[[5, 140, 333, 870]]
+    table, access = router.stop_table(lats, lngs, "cost")
+    np.testing.assert_allclose(table.cost, graph.table([5, 140, 333, 870], "cost").cost)
+    np.testing.assert_allclose(access, 0, atol=1e-9)
+
+
+def test_hub_tables_respect_cell_cap():
+    graph = grid_graph(side=10)
+    hubs = [0, 9, 90, 99]
+    router = RoadRouter(graph, max_table_cells=len(hubs) * graph.num_nodes - 1)
+    router.set_hubs(graph.lat[hubs], graph.lng[hubs])
+    assert router.hub_table("time", wait=True) is None
+    assert router.route(graph.lat[0], graph.lng[0], graph.lat[99], graph.lng[99], "time") is not None
+    assert router.stats()["searches"] == 1
+
+    router.max_table_cells = len(hubs) * graph.num_nodes
+    route = router.route(graph.lat[0], graph.lng[0], graph.lat[99], graph.lng[99], "time")
+    assert router.stats()["table_hits"] == 1
+    assert route.cost == pytest.approx(graph.shortest_path(0, 99, "time").cost)
+
+
+def test_concurrent_routes_count_every_lookup():
+    graph = grid_graph(side=10)
+    router = RoadRouter(graph)
+    router.set_hubs(graph.lat[[0, 99]], graph.lng[[0, 99]])
+
+    def worker() -> None:
+        for _ in range(50):
+            router.route(graph.lat[0], graph.lng[0], graph.lat[99], graph.lng[99], "cost")
+            router.route(graph.lat[3], graph.lng[3], graph.lat[57], graph.lng[57], "cost")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = router.stats()
+    assert stats["table_hits"] + stats["searches"] == 800
+    assert stats["table_builds"] == 1
+
+
+def test_service_routes_follow_the_road_graph(client, monkeypatch):
+    import main
+
+    graph = grid_graph(side=10)
+    router = RoadRouter(graph)
+    subsystem = main.ai_service.subsystems["road_routing"]
+    monkeypatch.setattr(subsystem, "_value", router)
+    monkeypatch.setattr(subsystem, "state", "ready")
+
+    def location(node: int) -> "main.Location":
+        return main.Location(latitude=float(graph.lat[node]), longitude=float(graph.lng[node]), address="", city="", country="DE")
+
+    single = main.ai_service.optimize_direct_route(location(0), location(99), "truck", "cost", "route_test")
+    road = router.route(graph.lat[0], graph.lng[0], graph.lat[99], graph.lng[99], "cost")
+    assert single.total_distance == pytest.approx(road.length_km + road.access_km, abs=0.01)
+    assert len(single.route_polyline) == len(road.nodes) + 2
+
+    stops = main.ai_service.optimize_multi_stop_route(location(0), location(99), [location(9), location(90)], "truck", "cost", "route_test")
+    assert sorted(stops.stop_order) == [0, 1]
+    assert len(stops.route_polyline) > 4
+
+    origins, destinations = [location(0), location(5)], [location(99), location(55)]
+    records = main.ai_service.optimize_routes(origins, destinations, "truck", "cost")
+    columns = main.ai_service.optimize_routes(origins, destinations, "truck", "cost", columnar=True)
+    assert records.total_distance[0] == single.total_distance
+    assert [len(polyline) for polyline in records.route_polylines] == np.diff(columns["route_polylines"]["offsets"]).tolist()
+    assert columns["route_polylines"]["lat"][:len(road.nodes) + 2].tolist() == [point["lat"] for point in single.route_polyline]
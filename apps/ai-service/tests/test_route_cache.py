@@ -0,0 +1,40 @@
+import time
+
+from cache import RouteCache
+
+
+def location(country: str = "Germany"):
+    return {"latitude": 52.52, "longitude": 13.405, "address": "a", "city": "Berlin", "country": country}
+
+
+def destination(country: str = "Germany"):
+    return {"latitude": 48.1351, "longitude": 11.582, "address": "b", "city": "Munich", "country": country}
+
+
+def test_cache_hit_shares_route_id_and_refreshes_created_at(client):
+    body = {"origin": location(), "destination": destination(), "vehicle_type": "van", "optimize_for": "time"}
+    first = client.post("/api/optimize-route", json=body).json()
+    time.sleep(0.01)
+    second = client.post("/api/optimize-route", json=body).json()
+    assert second["route_id"] == first["route_id"]
+    assert second["created_at"] > first["created_at"]
+
+
+def test_country_is_part_of_the_key(client):
+    germany = client.post("/api/optimize-route", json={"origin": location(), "destination": destination(), "vehicle_type": "truck", "optimize_for": "cost"}).json()
+    italy = client.post("/api/optimize-route", json={"origin": location("Italy"), "destination": destination("Italy"), "vehicle_type": "truck", "optimize_for": "cost"}).json()
+    assert germany["route_id"] != italy["route_id"]
+    assert germany["total_distance"] != italy["total_distance"]
+
+
+def test_lru_eviction_and_ttl():
+    cache = RouteCache(max_size=2, ttl_seconds=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts b, the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["expirations"] == 1
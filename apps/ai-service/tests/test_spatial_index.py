@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from geo import haversine_km
+from spatial_index import HubIndex, group_offsets
+
+
+def hub(hub_id, lat, lng):
+    return {"hub_id": hub_id, "latitude": float(lat), "longitude": float(lng), "address": "", "city": "", "country": "DE", "hub_type": "depot"}
+
+
+def brute_force(index, lats, lngs):
+    """Hub ids and an (m, n) haversine distance matrix over every live hub"""
+    ids = [hub_id for hub_id in index._hubs]
+    hub_lat = np.array([index._hubs[hub_id]["latitude"] for hub_id in ids])
+    hub_lng = np.array([index._hubs[hub_id]["longitude"] for hub_id in ids])
+    return np.array(ids, dtype=object), haversine_km(lats[:, None], lngs[:, None], hub_lat[None], hub_lng[None])
+
+
+@pytest.fixture
+def churned_index():
+    rng = np.random.default_rng(7)
+    # A small rebuild threshold puts hubs in the main tree, the buffer and tombstones
+    index = HubIndex(rebuild_after=32)
+    index.upsert(hub(f"h{i}", lat, lng) for i, (lat, lng) in enumerate(zip(rng.uniform(45, 55, 200), rng.uniform(0, 15, 200))))
+    index.upsert(hub(f"new{i}", lat, lng) for i, (lat, lng) in enumerate(zip(rng.uniform(45, 55, 10), rng.uniform(0, 15, 10))))
+    index.remove([f"h{i}" for i in range(0, 200, 7)] + ["new3", "missing"])
+    # Moves: existing ids reopen elsewhere
+    index.upsert(hub(f"h{i}", lat, lng) for i, lat, lng in zip(range(1, 40, 5), rng.uniform(45, 55, 8), rng.uniform(0, 15, 8)))
+    stats = index.stats()
+    assert stats["buffered"] > 0 and stats["tombstoned"] > 0
+    return index
+
+
+def test_nearest_matches_brute_force(churned_index):
+    rng = np.random.default_rng(11)
+    lats, lngs = rng.uniform(44, 56, 50), rng.uniform(-1, 16, 50)
+    ids, distances = churned_index.nearest(lats, lngs, k=5)
+    all_ids, matrix = brute_force(churned_index, lats, lngs)
+    order = np.argsort(matrix, axis=1)[:, :5]
+    np.testing.assert_allclose(distances, np.take_along_axis(matrix, order, axis=1))
+    assert ids.tolist() == all_ids[order].tolist()
+
+
+def test_nearest_respects_max_distance(churned_index):
+    rng = np.random.default_rng(12)
+    lats, lngs = rng.uniform(44, 56, 50), rng.uniform(-1, 16, 50)
+    ids, distances = churned_index.nearest(lats, lngs, k=3, max_distance_km=40)
+    _, matrix = brute_force(churned_index, lats, lngs)
+    expected = np.sort(matrix, axis=1)[:, :3]
+    expected[expected > 40] = np.nan
+    np.testing.assert_allclose(distances, expected)
+    assert [[hub_id is None for hub_id in row] for row in ids.tolist()] == np.isnan(distances).tolist()
+
+
+def test_within_matches_brute_force(churned_index):
+    rng = np.random.default_rng(13)
+    lats, lngs = rng.uniform(44, 56, 30), rng.uniform(-1, 16, 30)
+    hub_ids, distances, offsets = churned_index.within(lats, lngs, 80)
+    all_ids, matrix = brute_force(churned_index, lats, lngs)
+    for i, (found, found_distance) in enumerate(zip(group_offsets(hub_ids, offsets), group_offsets(distances, offsets))):
+        inside = np.flatnonzero(matrix[i] <= 80)
+        inside = inside[np.argsort(matrix[i, inside])]
+        assert sorted(found) == sorted(all_ids[inside].tolist())
+        np.testing.assert_allclose(found_distance, matrix[i, inside])
+
+
+def test_removed_and_moved_hubs_are_not_returned(churned_index):
+    lat, lng = churned_index.get("h1")["latitude"], churned_index.get("h1")["longitude"]
+    ids, distances = churned_index.nearest([lat], [lng], k=1)
+    assert ids[0, 0] == "h1" and distances[0, 0] == pytest.approx(0.0, abs=1e-6)
+    hub_ids, _, _ = churned_index.within(np.full(1, 50.0), np.full(1, 7.5), 20000)
+    assert "h0" not in hub_ids.tolist() and "new3" not in hub_ids.tolist()
+    assert len(hub_ids) == len(churned_index)
@@ -0,0 +1,95 @@
+"""Lazily initialized model subsystems with a background warm-up.
+
+Each subsystem wraps a loader that imports its modules, builds its state and
+runs a tiny computation so the first real request does not pay for cold code
+paths. Loaders run at most once: on first use, or ahead of traffic from the
+warm-up task started at application startup. Their progress is what the
+health endpoints report.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class Subsystem:
+    """One model component: cold -> warming -> ready (or failed, retried on next use)"""
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self.state = "cold"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def get(self) -> Any:
+        """Return the loaded state, loading it first (or waiting for a load in progress)"""
+        if self.state == "ready":
+            return self._value
+        with self._lock:
+            if self.state != "ready":
+                self.state = "warming"
+                start = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.loaded_at = time.time()
+                self.error = None
+                self.state = "ready"
+        return self._value
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 4),
+            "error": self.error
+        }
+
+
+class SubsystemRegistry:
+    """Named subsystems in warm-up order"""
+
+    def __init__(self):
+        self._subsystems: "OrderedDict[str, Subsystem]" = OrderedDict()
+        self.warmup_state = "pending"
+        self.warmup_seconds: Optional[float] = None
+
+    def register(self, name: str, loader: Callable[[], Any]) -> Subsystem:
+        subsystem = self._subsystems[name] = Subsystem(name, loader)
+        return subsystem
+
+    def __getitem__(self, name: str) -> Subsystem:
+        return self._subsystems[name]
+
+    def get(self, name: str) -> Any:
+        return self._subsystems[name].get()
+
+    @property
+    def ready(self) -> bool:
+        return all(s.ready for s in self._subsystems.values())
+
+    def warm_up(self) -> None:
+        """Load every subsystem in registration order; failures are recorded, not raised"""
+        self.warmup_state = "running"
+        start = time.perf_counter()
+        for subsystem in self._subsystems.values():
+            try:
+                subsystem.get()
+            except Exception:
+                pass
+        self.warmup_seconds = time.perf_counter() - start
+        self.warmup_state = "complete" if self.ready else "failed"
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: s.status() for name, s in self._subsystems.items()}